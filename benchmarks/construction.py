@@ -0,0 +1,81 @@
+"""
+Per-entry cost of building MediaListEntry objects from a synthetic
+5,000-entry collection: validated pydantic construction, pydantic's
+model_construct path and lazy rows.
+
+Run with: python -m benchmarks.construction
+"""
+
+import time
+from unittest.mock import MagicMock
+
+from anilist_cli.libs.anilist.adapter import AnilistAdapter
+from anilist_cli.libs.anilist.models.lazy_sequence import LazySequence
+from anilist_cli.libs.anilist.models.media_list_entry import MediaListEntry
+from anilist_cli.libs.anilist.models.media_title import MediaTitle
+from anilist_cli.utils.common import fuzzydate_to_date
+
+from .fixtures import media_list_collection
+
+
+def _constructed(adapter: AnilistAdapter, entry: dict) -> MediaListEntry:
+    entry = dict(entry)
+    entry["adapter"] = adapter
+    entry["title"] = MediaTitle.model_construct(**entry.pop("media")["title"])
+    entry["startedAt"] = fuzzydate_to_date(entry["startedAt"])
+    entry["completedAt"] = fuzzydate_to_date(entry["completedAt"])
+    return MediaListEntry.model_construct(**entry)
+
+
+def _best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(entries: int = 5000, repeat: int = 5) -> dict[str, float]:
+    """
+    Time each construction path
+
+    @rtype: dict[str, float]
+    @returns: per-entry cost in microseconds keyed by path name
+    """
+
+    adapter = AnilistAdapter(api=MagicMock())
+    payloads = [
+        entry
+        for media_list in media_list_collection(entries)["data"]["MediaListCollection"][
+            "lists"
+        ]
+        for entry in media_list["entries"]
+    ]
+
+    timings = {
+        "validated": _best_of(
+            repeat, lambda: [adapter._parse_list_entry(entry) for entry in payloads]
+        ),
+        "model_construct": _best_of(
+            repeat, lambda: [_constructed(adapter, entry) for entry in payloads]
+        ),
+        "lazy_first_screen": _best_of(
+            repeat,
+            lambda: LazySequence(payloads, adapter._parse_list_entry)[:50],
+        ),
+        "lazy_all_rows": _best_of(
+            repeat, lambda: list(LazySequence(payloads, adapter._parse_list_entry))
+        ),
+    }
+
+    return {name: seconds / entries * 1e6 for name, seconds in timings.items()}
+
+
+def main() -> None:
+    for name, micros in run().items():
+        print(f"{name:<20} {micros:8.2f} us/entry")
+
+
+if __name__ == "__main__":
+    main()
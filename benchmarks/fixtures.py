@@ -0,0 +1,121 @@
+"""Synthetic AniList responses shaped and sized like real ones."""
+
+import random
+
+STATUSES = ["CURRENT", "PLANNING", "COMPLETED", "DROPPED", "PAUSED", "REPEATING"]
+LIST_NAMES = ["Watching", "Planning", "Completed", "Dropped", "Paused", "Rewatching"]
+
+
+def _fuzzy_date(rng: random.Random) -> dict:
+    if rng.random() < 0.3:
+        return {"year": None, "month": None, "day": None}
+    return {
+        "year": rng.randint(2000, 2025),
+        "month": rng.randint(1, 12),
+        "day": rng.randint(1, 28),
+    }
+
+
+def _title(rng: random.Random, media_id: int) -> dict:
+    words = rng.sample(["no", "Kimi", "Sora", "Tensei", "Shoujo", "Monogatari"], 3)
+    return {
+        "english": f"Series {media_id}" if rng.random() < 0.7 else None,
+        "romaji": " ".join(words) + f" {media_id}",
+    }
+
+
+def media_list_collection(entries: int = 5000, seed: int = 0) -> dict:
+    """
+    GetMediaList response holding the given number of entries spread over
+    the six status lists
+    """
+
+    rng = random.Random(seed)
+    lists = [
+        {"name": name, "status": status, "entries": []}
+        for name, status in zip(LIST_NAMES, STATUSES)
+    ]
+
+    for media_id in range(1, entries + 1):
+        rng.choice(lists)["entries"].append(
+            {
+                "id": 1_000_000 + media_id,
+                "mediaId": media_id,
+                "media": {"title": _title(rng, media_id)},
+                "startedAt": _fuzzy_date(rng),
+                "score": rng.choice([0, 5, 7.5, 8, 10]),
+                "repeat": rng.randint(0, 2),
+                "progress": rng.randint(0, 24),
+                "notes": None,
+                "completedAt": _fuzzy_date(rng),
+            }
+        )
+
+    return {"data": {"MediaListCollection": {"hasNextChunk": False, "lists": lists}}}
+
+
+def _media(rng: random.Random, media_id: int) -> dict:
+    media_type = rng.choice(["ANIME", "MANGA"])
+    anime = media_type == "ANIME"
+    return {
+        "id": media_id,
+        "title": _title(rng, media_id),
+        "status": rng.choice(["FINISHED", "RELEASING", "NOT_YET_RELEASED"]),
+        "popularity": rng.randint(0, 500_000),
+        "averageScore": rng.choice([None, rng.randint(40, 95)]),
+        "chapters": None if anime else rng.randint(1, 300),
+        "episodes": rng.randint(1, 26) if anime else None,
+        "duration": 24 if anime else None,
+        "season": rng.choice(["WINTER", "SPRING", "SUMMER", "FALL"]) if anime else None,
+        "seasonYear": rng.randint(2000, 2025) if anime else None,
+        "volumes": None if anime else rng.randint(1, 30),
+        "format": "TV" if anime else "MANGA",
+        "type": media_type,
+        "mediaListEntry": (
+            {"progress": rng.randint(0, 12), "status": "CURRENT", "score": 0}
+            if rng.random() < 0.3
+            else None
+        ),
+    }
+
+
+def search_page(per_page: int = 50, seed: int = 0) -> dict:
+    """
+    GetMedia response holding one full page of results
+    """
+
+    rng = random.Random(seed)
+    return {
+        "data": {
+            "Page": {
+                "media": [_media(rng, media_id) for media_id in range(1, per_page + 1)],
+                "pageInfo": {
+                    "hasNextPage": True,
+                    "currentPage": 1,
+                    "lastPage": 100,
+                    "perPage": per_page,
+                    "total": 100 * per_page,
+                },
+            }
+        }
+    }
+
+
+def media_info(media_id: int = 1, seed: int = 0) -> dict:
+    """
+    GetExpandedMediaInfo response with a description of realistic length
+    """
+
+    rng = random.Random(seed)
+    media = _media(rng, media_id)
+    media |= {
+        "description": "<b>Synopsis.</b><br>" + "Lorem ipsum dolor sit amet. " * 40,
+        "endDate": _fuzzy_date(rng),
+        "startDate": _fuzzy_date(rng),
+        "favourites": rng.randint(0, 50_000),
+        "genres": rng.sample(
+            ["Action", "Comedy", "Drama", "Slice of Life", "Sci-Fi", "Romance"], 3
+        ),
+        "source": "MANGA",
+    }
+    return {"data": {"Media": media}}
@@ -0,0 +1,375 @@
+"""
+Benchmark suite timing adapter parsing, the session cache and client
+round trips against a local stub of the AniList endpoint. Results are
+written as JSON so runs of different releases can be compared.
+
+Run with: python -m benchmarks.run [--output PATH] [--compare PATH]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from importlib.metadata import version
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+from anilist_cli.libs.anilist import queries
+from anilist_cli.libs.anilist.adapter import (
+    MINIMAL_LIST_ENTRY_FIELDS,
+    MINIMAL_MEDIA_FIELDS,
+    AnilistAdapter,
+)
+from anilist_cli.libs.anilist.client import AnilistClient
+from anilist_cli.libs.anilist.models.enums import (
+    FieldProfile,
+    MediaListStatus,
+    MediaType,
+)
+from anilist_cli.libs.anilist.models.filter import MediaFilter, PageFilter
+from anilist_cli.libs.anilist.queries import get_media, prune
+from anilist_cli.libs.anilist.rate_limiter import RateLimiter
+from anilist_cli.libs.cache.codec import Compression
+from anilist_cli.libs.cache.session_cache import SessionCache
+from tests.stub_server import StubServer
+
+from .fixtures import media_info, media_list_collection, search_page
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _summary(timings: list[float]) -> dict[str, float | int]:
+    return {
+        "rounds": len(timings),
+        "min_us": min(timings) * 1e6,
+        "median_us": statistics.median(timings) * 1e6,
+        "mean_us": statistics.fmean(timings) * 1e6,
+    }
+
+
+def _time(function: Callable[[], object], rounds: int) -> dict[str, float | int]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return _summary(timings)
+
+
+async def _time_async(
+    function: Callable[[], Awaitable[object]], rounds: int
+) -> dict[str, float | int]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await function()
+        timings.append(time.perf_counter() - start)
+    return _summary(timings)
+
+
+def _adapter(response: dict) -> AnilistAdapter:
+    """
+    Adapter whose client answers every request with the given response,
+    so only parsing is timed
+    """
+
+    api = MagicMock()
+    api.user = "bench"
+    api.get_data = AsyncMock(return_value=response)
+    return AnilistAdapter(api=api)
+
+
+def _selected(item: dict, fields: frozenset[str]) -> dict:
+    return {key: value for key, value in item.items() if key in fields}
+
+
+async def bench_profiles(rounds: int) -> dict[str, dict]:
+    """
+    Response size and parsing latency of the full and minimal profiles
+    """
+
+    info = media_info()
+    minimal_info = {
+        "data": {"Media": _selected(info["data"]["Media"], MINIMAL_MEDIA_FIELDS)}
+    }
+    collection = media_list_collection(5000)
+    minimal_collection = json.loads(json.dumps(collection))
+    for media_list in minimal_collection["data"]["MediaListCollection"]["lists"]:
+        media_list["entries"] = [
+            _selected(entry, MINIMAL_LIST_ENTRY_FIELDS)
+            for entry in media_list["entries"]
+        ]
+    statuses = list(MediaListStatus)
+    results = {}
+
+    for name, profile, info_response, list_response in (
+        ("full", FieldProfile.FULL, info, collection),
+        ("minimal", FieldProfile.MINIMAL, minimal_info, minimal_collection),
+    ):
+        info_adapter = _adapter(info_response)
+        list_adapter = _adapter(list_response)
+
+        async def full_list() -> None:
+            for _, _, _, entries in await list_adapter.get_media_list(
+                "bench", MediaType.ANIME, statuses, profile
+            ):
+                list(entries)
+
+        results[f"profile.get_media_info[{name}]"] = await _time_async(
+            lambda: info_adapter.get_media_info(1, profile), rounds
+        ) | {"bytes": len(json.dumps(info_response))}
+        results[f"profile.get_media_list[5000,{name}]+rows"] = await _time_async(
+            full_list, rounds
+        ) | {"bytes": len(json.dumps(list_response))}
+
+    return results
+
+
+async def bench_adapter(rounds: int) -> dict[str, dict]:
+    search = _adapter(search_page(50))
+    info = _adapter(media_info())
+    media_list = _adapter(media_list_collection(5000))
+    statuses = list(MediaListStatus)
+
+    async def full_list() -> None:
+        for _, _, _, entries in await media_list.get_media_list(
+            "bench", MediaType.ANIME, statuses
+        ):
+            list(entries)
+
+    return {
+        "adapter.search[50]": await _time_async(
+            lambda: search.search(MediaFilter()), rounds
+        ),
+        "adapter.get_media_info": await _time_async(
+            lambda: info.get_media_info(1), rounds
+        ),
+        "adapter.get_media_list[5000]": await _time_async(
+            lambda: media_list.get_media_list("bench", MediaType.ANIME, statuses),
+            rounds,
+        ),
+        "adapter.get_media_list[5000]+rows": await _time_async(full_list, rounds),
+    }
+
+
+def bench_cache(rounds: int, directory: str) -> dict[str, dict]:
+    cache = SessionCache(str(Path(directory) / "bench_cache.db"))
+    response = search_page(50)
+    counter = iter(range(10**9))
+
+    cache.set(get_media, {"page": 0}, "bench", response)
+
+    def disk_get() -> None:
+        cache.memory.clear()
+        cache.get(get_media, {"page": 0}, "bench")
+
+    results = {
+        "cache.set": _time(
+            lambda: cache.set(get_media, {"page": next(counter)}, "bench", response),
+            rounds,
+        ),
+        "cache.get[memory]": _time(
+            lambda: cache.get(get_media, {"page": 0}, "bench"), rounds
+        ),
+        "cache.get[disk]": _time(disk_get, rounds),
+        "cache.get[miss]": _time(
+            lambda: cache.get(get_media, {"page": -1}, "bench"), rounds
+        ),
+    }
+
+    cache.close()
+    return results
+
+
+def bench_compression(rounds: int, directory: str) -> dict[str, dict]:
+    """
+    Size and latency of storing large responses with each compression
+    """
+
+    responses = {
+        "media_info": media_info(),
+        "list[5000]": media_list_collection(5000),
+    }
+    results = {}
+
+    for compression in Compression:
+        cache = SessionCache(
+            str(Path(directory) / f"bench_{compression.name}.db"),
+            compression=compression,
+        )
+        name = compression.name.lower()
+
+        for response_name, response in responses.items():
+            counter = iter(range(10**9))
+            cache.set(get_media, {"page": 0}, "bench", response)
+
+            def disk_get() -> None:
+                cache.memory.clear()
+                cache.get(get_media, {"page": 0}, "bench")
+
+            with cache.db as conn:
+                stored = conn.execute(
+                    "SELECT length(data) FROM cache WHERE variables = ?",
+                    ('{"page":0}',),
+                ).fetchone()[0]
+                conn.execute("DELETE FROM cache")
+
+            results[f"cache.set[{response_name},{name}]"] = _time(
+                lambda: cache.set(
+                    get_media, {"page": next(counter)}, "bench", response
+                ),
+                rounds,
+            ) | {"bytes": stored}
+            cache.set(get_media, {"page": 0}, "bench", response)
+            results[f"cache.get[{response_name},{name}]"] = _time(disk_get, rounds)
+
+            with cache.db as conn:
+                conn.execute("DELETE FROM cache")
+
+        cache.close()
+
+    return results
+
+
+def bench_payload(rounds: int) -> dict[str, dict]:
+    """
+    Size and JSON encoding latency of request payloads sending the query
+    documents as written and minified without their unset variables
+    """
+
+    adapter = AnilistAdapter(api=MagicMock())
+    documents = Path(queries.__file__).parent / "queries"
+    requests = {
+        "search": (
+            "get_media.graphql",
+            *adapter._filter_to_graphql(
+                get_media,
+                MediaFilter(search="frieren", type=MediaType.ANIME),
+                PageFilter(perPage=50),
+            ),
+        ),
+        "media_info": (
+            "get_expanded_media_info.graphql",
+            *adapter._media_info_request(1),
+        ),
+        "list": (
+            "get_media_list.graphql",
+            queries.get_media_list,
+            {"userName": "bench", "type": "ANIME", "chunk": 1, "perChunk": 500},
+        ),
+        "update": (
+            "update_entry.graphql",
+            queries.update_entry,
+            {"mediaId": 1, "progress": 5},
+        ),
+    }
+    results = {}
+
+    for name, (document, query, variables) in requests.items():
+        for kind, sent in (
+            ("raw", (documents / document).read_text()),
+            ("pruned", prune(query, variables)),
+        ):
+            payload = {"query": sent, "variables": variables}
+            results[f"payload[{name},{kind}]"] = _time(
+                lambda: json.dumps(payload), rounds
+            ) | {"bytes": len(json.dumps(payload).encode())}
+
+    return results
+
+
+async def bench_client(rounds: int, directory: str) -> dict[str, dict]:
+    async with StubServer(default=(200, search_page(50), {})) as server:
+        client = AnilistClient(
+            cache_path=str(Path(directory) / "bench_client.db"),
+            url=server.url,
+            rate_limiter=RateLimiter(limit=10**6, period=1.0, burst=10**6),
+        )
+        counter = iter(range(10**9))
+
+        try:
+            return {
+                "client.get_data[round_trip]": await _time_async(
+                    lambda: client.get_data(get_media, {"page": next(counter)}),
+                    rounds,
+                ),
+                "client.get_data[cached]": await _time_async(
+                    lambda: client.get_data(get_media, {"page": 0}), rounds
+                ),
+            }
+        finally:
+            await client.close()
+
+
+async def run(rounds: int = 50) -> dict:
+    """
+    Run every benchmark
+
+    @type rounds: int
+    @param rounds: number of timed calls per benchmark
+    @rtype: dict
+    @returns: JSON-serializable report of the run
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = await bench_adapter(rounds)
+        results |= await bench_profiles(rounds)
+        results |= bench_cache(rounds, directory)
+        results |= bench_compression(rounds, directory)
+        results |= bench_payload(rounds)
+        results |= await bench_client(rounds, directory)
+
+    return {
+        "version": version("anilist-cli"),
+        "python": platform.python_version(),
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """
+    Print the median of every benchmark next to the one of a baseline report
+    """
+
+    for name, result in report["results"].items():
+        line = f"{name:<36} {result['median_us']:12.1f} us"
+        if "bytes" in result:
+            line += f" {result['bytes']:10d} B"
+        previous = baseline["results"].get(name)
+        if previous is not None:
+            ratio = result["median_us"] / previous["median_us"]
+            line += f"  {previous['median_us']:12.1f} us  x{ratio:.2f}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="report file, defaults to benchmarks/results/<version>.json",
+    )
+    parser.add_argument("--compare", type=Path, help="baseline report to compare to")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.rounds))
+
+    output = args.output or RESULTS_DIR / f"{report['version']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else {}
+    compare(report, baseline or {"results": {}})
+    print(f"report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,99 @@
+import asyncio
+import logging
 import re
+from collections.abc import AsyncIterator
 from datetime import date
 from enum import Enum
+from functools import partial
 
 from pydantic import validate_call
 
 from ...utils.common import date_to_fuzzydate, fuzzydate_to_date
+from .cache_patches import patch_list_entry
+from .cache_tags import list_tag, media_tag
 from .client import AnilistClient
 from .models.anime import Anime
 from .models.anime_preview import AnimePreview
 from .models.complete_document import CompleteDocument
-from .models.enums import MediaListStatus, MediaType
+from .models.enums import FieldProfile, MediaListStatus, MediaType
 from .models.filter import MediaFilter, MediaListFilter, PageFilter
+from .models.lazy_sequence import LazySequence
 from .models.list_entry_changes import ListEntryChanges
 from .models.manga import Manga
 from .models.manga_preview import MangaPreview
 from .models.media_list_entry import MediaListEntry
+from .models.media_preview import MediaPreview
 from .models.media_title import MediaTitle
-from .queries import get_expanded_media_info, get_media, get_media_list, update_entry
+from .outbox import OutboxEntry, ReplayResult
+from .queries import (
+    build_query,
+    get_expanded_media_info,
+    get_list_entry,
+    get_media,
+    get_media_info_many,
+    get_media_list,
+    update_entry,
+)
+from .rate_limiter import RequestPriority
 
 # regex cleaner to get rid of unwanted html tags
 CLEANR = re.compile("<.*?>")
 
+# fields of a SaveMediaListEntry response set by UpdateEntry variables
+SAVED_FIELDS = {
+    "score": "score",
+    "status": "status",
+    "progress": "progress",
+    "repeat": "repeat",
+    "note": "notes",
+    "startedAt": "startedAt",
+    "completedAt": "completedAt",
+}
+
+# seconds list entry changes wait for more changes before being sent
+OUTBOX_FLUSH_DELAY = 0.05
+
+# maximum number of aliased mutations sent in one request
+MAX_BATCH_MUTATIONS = 20
+
+# number of media requested per page by get_media_info_many, AniList's
+# maximum page size
+MEDIA_INFO_CHUNK = 50
+
+# fields of the media objects selected by each profile, None selecting
+# every field of the query. Every profile keeps what the models require
+MINIMAL_MEDIA_FIELDS = frozenset({"id", "title", "type", "mediaListEntry"})
+MEDIA_PROFILES: dict[FieldProfile, frozenset[str] | None] = {
+    FieldProfile.MINIMAL: MINIMAL_MEDIA_FIELDS,
+    FieldProfile.PREVIEW: MINIMAL_MEDIA_FIELDS
+    | {
+        "status",
+        "popularity",
+        "averageScore",
+        "chapters",
+        "episodes",
+        "duration",
+        "season",
+        "seasonYear",
+        "volumes",
+        "format",
+    },
+    FieldProfile.FULL: None,
+}
+
+# fields of the list entries selected by each profile
+MINIMAL_LIST_ENTRY_FIELDS = frozenset(
+    {"id", "mediaId", "media", "progress", "score", "updatedAt"}
+)
+LIST_ENTRY_PROFILES: dict[FieldProfile, frozenset[str] | None] = {
+    FieldProfile.MINIMAL: MINIMAL_LIST_ENTRY_FIELDS,
+    FieldProfile.PREVIEW: MINIMAL_LIST_ENTRY_FIELDS
+    | {"repeat", "startedAt", "completedAt"},
+    FieldProfile.FULL: None,
+}
+
+logger = logging.getLogger(__name__)
+
 
 class AnilistAdapter:
     """
@@ -28,6 +101,11 @@ class AnilistAdapter:
 
     Attributes:
     api: AnilistClient instance of api class
+    _waiting: dict of the futures of the list entry updates waiting for the
+    next outbox flush by media id
+    _flush_timer: asyncio.TimerHandle | None flushing the outbox
+    _flush_lock: asyncio.Lock letting one outbox flush run at a time
+    _flushes: set of outbox flushes running in the background
     """
 
     def __init__(self, api: AnilistClient):
@@ -35,6 +113,11 @@ class AnilistAdapter:
         Initialize the adapter with an AnilistClient instance to wrap
         """
         self.api = api
+        self._waiting: dict[int, asyncio.Future[dict | None]] = {}
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        self._flushes: set[asyncio.Task] = set()
+        api.add_reconnect_listener(self._schedule_flush)
 
     def _dict_enums_to_strs(self, d: dict) -> None:
         """
@@ -84,6 +167,7 @@ class AnilistAdapter:
         d["score"] = (
             media_list_entry["score"] if media_list_entry["score"] != 0 else None
         )
+        d["updatedAt"] = media_list_entry.get("updatedAt")
 
         del d["mediaListEntry"]
 
@@ -94,16 +178,21 @@ class AnilistAdapter:
         query: str,
         filter: MediaFilter | MediaListFilter,
         page_filter: PageFilter | None = None,
+        fields: frozenset[str] | None = None,
     ) -> tuple:
         """
         Builds a (query, variables) tuple from a filter and optional page filter.
+        The query only declares the variables the filters set, see build_query
 
         @type query: str
         @type filter: MediaFilter | MediaListFilter
         @type page_filter: PageFilter | None
+        @type fields: frozenset[str] | None
         @param query: graphQL query string
         @param filter: a type of filter for media
         @param page_filter: page parameters for the query
+        @param fields: fields of the media objects to select, every field
+        of the query if None
         @rtype: Tuple
         @returns: tuple of (query string, variables dict)
         """
@@ -121,52 +210,219 @@ class AnilistAdapter:
         if page_filter:
             query_variables.update(page_variables)
 
-        return (query, query_variables)
+        return (build_query(query, query_variables, fields), query_variables)
 
     @validate_call
     async def search(
         self,
         filters: MediaFilter,
         page_filter: PageFilter = PageFilter(perPage=20),
+        batch: bool = False,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        profile: FieldProfile = FieldProfile.PREVIEW,
     ) -> tuple:
         """
         Function that queries anilist API for media filtered by filters
 
         @type filters: MediaFilter
         @type page_filter: PageFilter
+        @type batch: bool
+        @type priority: RequestPriority
+        @type profile: FieldProfile
         @param filters: MediaFilter containing media filter key-value pairs
         @param page_filter: PageFilter containing page parameters for the query
+        @param batch: whether the request may be merged with concurrent searches
+        @param priority: scheduling priority of the request under the rate limit
+        @param profile: fields of the media to request, FULL and PREVIEW
+        select the same fields
         @rtype: Tuple
         @returns: Tuple containing dictionaries representing the top 20 \
         media matching the filters and results info
         """
 
         data = await self.api.get_data(
-            *self._filter_to_graphql(get_media, filters, page_filter)
+            *self._filter_to_graphql(
+                get_media, filters, page_filter, MEDIA_PROFILES[profile]
+            ),
+            priority=priority,
+            batch=batch,
         )
 
         if data is None:
             return ([], {})
 
         results_info = data["data"]["Page"]["pageInfo"]
-        data = data["data"]["Page"]["media"]
+        results = [
+            self._parse_preview(entry) for entry in data["data"]["Page"]["media"]
+        ]
 
-        # cleans data
-        for entry in data:
-            entry["adapter"] = self
-            entry["title"] = MediaTitle(**entry["title"])
+        return (results, results_info)
 
-            self._parse_media_list_entry(entry)
+    def _model_fields(self, data: dict) -> dict:
+        """
+        Helper function that starts the keyword arguments of a model from an
+        object of a response. Responses are shared with the cache, so the
+        object is never cleaned in place, only a shallow copy of it
+
+        @type data: dict
+        @param data: media or list entry object of a response
+        @rtype: dict
+        @returns: shallow copy of the object, with the adapter set
+        """
 
-        results = []
+        fields = dict(data)
+        fields["adapter"] = self
+        return fields
 
-        for entry in data:
-            if entry["type"] == "ANIME":
-                results.append(AnimePreview(**entry))
-            else:
-                results.append(MangaPreview(**entry))
+    def _abandon(self, task: asyncio.Task | None) -> None:
+        """
+        Helper function that stops waiting for a request started ahead of
+        time, whose results turned out not to be needed. The request itself
+        is shielded by get_data(), so it keeps running and still fills the
+        cache
 
-        return (results, results_info)
+        @type task: asyncio.Task | None
+        @param task: task waiting for the request, if any
+        """
+
+        if task is not None:
+            task.cancel()
+
+    def _parse_preview(self, entry: dict) -> MediaPreview:
+        """
+        Helper function that builds a MediaPreview from a media object
+
+        @type entry: dict
+        @param entry: media object of a response
+        @rtype: MediaPreview
+        @returns: anime or manga preview
+        """
+
+        entry = self._model_fields(entry)
+        entry["title"] = MediaTitle(**entry["title"])
+
+        self._parse_media_list_entry(entry)
+
+        if entry.get("type") == "ANIME":
+            return AnimePreview(**entry)
+        return MangaPreview(**entry)
+
+    @validate_call
+    async def search_local(
+        self, search: str, media_type: MediaType | None = None, limit: int = 20
+    ) -> list[MediaPreview]:
+        """
+        Function that searches the titles of the media seen in past responses,
+        without the network. Local previews only carry the fields known from
+        those responses and no list entry
+
+        @type search: str
+        @type media_type: MediaType | None
+        @type limit: int
+        @param search: search text, matched as word prefixes
+        @param media_type: type of the media to find, any type if None
+        @param limit: maximum number of media returned
+        @rtype: list[MediaPreview]
+        @returns: the matching media, best matches first
+        """
+
+        media = await self.api.search_titles(
+            search, media_type.name if media_type is not None else None, limit
+        )
+        return [self._parse_preview(entry) for entry in media]
+
+    @validate_call
+    async def search_as_you_type(
+        self, filters: MediaFilter, page_filter: PageFilter = PageFilter(perPage=20)
+    ) -> AsyncIterator[list[MediaPreview]]:
+        """
+        Async generator for searches updated on every keystroke. It first
+        yields the local title matches of the search string, see
+        search_local(), then once search() returns, the local matches with
+        the remote results merged in. Local matches keep their position and
+        are replaced by their remote version, the other remote results follow
+
+        @type filters: MediaFilter
+        @type page_filter: PageFilter
+        @param filters: MediaFilter containing media filter key-value pairs,
+        of which local matches only follow the search string and media type
+        @param page_filter: PageFilter containing page parameters for the query
+        @rtype: AsyncIterator[list[MediaPreview]]
+        @returns: async iterator over the local results, then the merged results
+        """
+
+        remote = asyncio.create_task(self.search(filters, page_filter))
+
+        try:
+            local = []
+            if filters.search_string:
+                local = await self.search_local(
+                    filters.search_string,
+                    filters.media_type,
+                    page_filter.per_page or 20,
+                )
+                if not remote.done():
+                    yield local
+
+            results, _ = await remote
+            by_id = {result.media_id: result for result in results}
+            merged = [by_id.pop(preview.media_id, preview) for preview in local]
+            yield merged + list(by_id.values())
+        finally:
+            self._abandon(remote)
+
+    @validate_call
+    async def search_iter(
+        self,
+        filters: MediaFilter,
+        page_filter: PageFilter = PageFilter(),
+        max_items: int | None = None,
+    ) -> AsyncIterator[MediaPreview]:
+        """
+        Async generator that yields the media matching filters across pages,
+        starting at the page of page_filter. The next page is prefetched
+        while the current one is consumed
+
+        @type filters: MediaFilter
+        @type page_filter: PageFilter
+        @type max_items: int | None
+        @param filters: MediaFilter containing media filter key-value pairs
+        @param page_filter: PageFilter containing the first page and page size
+        @param max_items: maximum number of media to yield, unlimited if None
+        @rtype: AsyncIterator[MediaPreview]
+        @returns: async iterator over the matching media
+        """
+
+        page = page_filter.page or 1
+        yielded = 0
+        next_page: asyncio.Task | None = asyncio.create_task(
+            self.search(filters, PageFilter(page=page, perPage=page_filter.per_page))
+        )
+
+        try:
+            while next_page is not None:
+                results, results_info = await next_page
+                next_page = None
+                page += 1
+
+                if results_info.get("hasNextPage") and (
+                    max_items is None or yielded + len(results) < max_items
+                ):
+                    next_page = asyncio.create_task(
+                        self.search(
+                            filters,
+                            PageFilter(page=page, perPage=page_filter.per_page),
+                            priority=RequestPriority.PREFETCH,
+                        )
+                    )
+
+                for result in results:
+                    if max_items is not None and yielded >= max_items:
+                        return
+                    yield result
+                    yielded += 1
+        finally:
+            self._abandon(next_page)
 
     def _changes_to_graphql(
         self, query: str, media_id: int, changes: ListEntryChanges
@@ -198,37 +454,110 @@ class AnilistAdapter:
 
     @validate_call
     async def update_list_entry(
-        self, media_id: int, changes: ListEntryChanges
+        self, media_id: int, changes: ListEntryChanges, updated_at: int | None = None
     ) -> dict | None:
         """
         Function that applies ListEntryChanges to the media which corresponds to
         the list entry for the logged in user if possible (or creates list entry
-        if it does not exist)
+        if it does not exist). Changes go through the outbox: changes made
+        within OUTBOX_FLUSH_DELAY are merged by media and sent in a single
+        request, see flush_outbox(). Cached responses containing the media or
+        the user's list collection are patched with the saved entry, so lists
+        and media info don't have to be refetched. While offline, the changes
+        stay queued until the API can be reached again
 
         @type media_id: int
         @type changes: ListEntryChanges
+        @type updated_at: int | None
         @param media_id: id of media corresponding to list entry to update
         @param changes: Object representing the changes to apply to the list entry
+        @param updated_at: updatedAt of the list entry the changes were made
+        on, used to detect conflicting edits if the changes have to wait for
+        a reconnect
         @rtype: dict | None
-        @returns dict with updated entry info, or None if the update failed
+        @returns dict with updated entry info, or None if the update failed.
+        Changes queued while offline return the changed entry info
         """
 
-        data = await self.api.authenticated_call(
-            *self._changes_to_graphql(update_entry, media_id, changes)
+        user = self.api.user
+        if self.api.token is None or user is None:
+            return None
+
+        _, variables = self._changes_to_graphql(update_entry, media_id, changes)
+
+        if not self.api.online:
+            await self.api.cache.run(
+                self.api.outbox.add, user, media_id, variables, updated_at
+            )
+            return await self._patch_queued(media_id, variables)
+
+        # waiting before the change is queued, so a flush reading the outbox
+        # after it also resolves this call
+        future = self._waiting.get(media_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._waiting[media_id] = future
+        self._schedule_flush()
+        await self.api.cache.run(
+            self.api.outbox.add, user, media_id, variables, updated_at
         )
 
-        if data is None:
-            return None
+        # shared by every change merged into the same flush
+        data = await asyncio.shield(future)
+        return dict(data) if data is not None else None
 
-        data = data["data"]["SaveMediaListEntry"]
+    async def _patch_queued(self, media_id: int, variables: dict) -> dict:
+        """
+        Helper function that patches the cached responses with a queued
+        UpdateEntry mutation as if it had been saved, so the change shows
+        while offline
 
-        data["list_entry_status"] = data["status"]
-        data["started_at"] = data["startedAt"]
-        data["completed_at"] = data["completedAt"]
+        @type media_id: int
+        @type variables: dict
+        @param media_id: id of media corresponding to list entry to update
+        @param variables: variables of the mutation
+        @rtype: dict
+        @returns: dict with the changed entry info
+        """
+
+        user = self.api.user
+        saved = {
+            field: variables[key]
+            for key, field in SAVED_FIELDS.items()
+            if key in variables
+        }
+        await self.api.cache.patch(
+            {media_tag(media_id), list_tag(user)},
+            partial(
+                patch_list_entry,
+                media_id,
+                user,
+                {"data": {"SaveMediaListEntry": saved}},
+                status_changed="status" in variables,
+            ),
+        )
+
+        return self._saved_entry(dict(saved))
+
+    def _saved_entry(self, data: dict) -> dict:
+        """
+        Helper function that turns a saved list entry into the attributes of
+        a list entry model
+
+        @type data: dict
+        @param data: SaveMediaListEntry object, modified in place
+        @rtype: dict
+        @returns: dict with updated entry info
+        """
 
-        del data["status"]
-        del data["startedAt"]
-        del data["completedAt"]
+        for key, attribute in (
+            ("status", "list_entry_status"),
+            ("startedAt", "started_at"),
+            ("completedAt", "completed_at"),
+            ("updatedAt", "updated_at"),
+        ):
+            if key in data:
+                data[attribute] = data.pop(key)
 
         for key in list(data.keys()):
             if type(data[key]) is dict:
@@ -238,40 +567,359 @@ class AnilistAdapter:
 
         return data
 
+    def _schedule_flush(self) -> None:
+        """
+        Helper function that flushes the outbox in the background after
+        OUTBOX_FLUSH_DELAY, also called when the API can be reached again
+        """
+
+        if self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(
+                OUTBOX_FLUSH_DELAY, self._spawn_flush
+            )
+
+    def _spawn_flush(self) -> None:
+        """
+        Helper function that starts a background flush of the outbox
+        """
+
+        self._flush_timer = None
+        task = asyncio.create_task(self.flush_outbox())
+        self._flushes.add(task)
+        task.add_done_callback(self._flush_done)
+
+    async def close(self) -> None:
+        """
+        Function that cancels the outbox flushes, scheduled or running, and
+        waits for them to stop. The changes they didn't send stay queued,
+        and the update_list_entry() calls waiting for them are cancelled
+        """
+
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        tasks = list(self._flushes)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        waiting, self._waiting = self._waiting, {}
+        for future in waiting.values():
+            future.cancel()
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        """
+        Helper function that logs a failed background flush
+        """
+
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("outbox flush failed", exc_info=task.exception())
+
+    def _edited_since(self, entry: OutboxEntry, data: dict | None) -> bool | None:
+        """
+        Helper function that checks whether the list entry of a queued
+        change was updated on AniList after the change was made
+
+        @type entry: OutboxEntry
+        @type data: dict | None
+        @param entry: queued change
+        @param data: GetListEntry response, None if it failed
+        @rtype: bool | None
+        @returns: whether the list entry was edited elsewhere meanwhile, None
+        if it couldn't be checked
+        """
+
+        if entry.updated_at is None:
+            return False
+        if data is None:
+            return None
+
+        media_list = (data.get("data") or {}).get("MediaList")
+        if media_list is None:
+            # a missing entry is answered with a 404, there is nothing to lose
+            missing = any(
+                error.get("status") == 404 for error in data.get("errors") or []
+            )
+            return False if missing else None
+
+        return (media_list["updatedAt"] or 0) > entry.updated_at
+
+    def _answered(self, data: dict) -> bool:
+        """
+        Helper function that checks whether AniList saved or rejected a
+        queued change, rather than the change not being sent or its request
+        being rejected as a whole
+
+        @type data: dict
+        @param data: UpdateEntry response, see authenticated_batch()
+        @rtype: bool
+        @returns: whether the change can leave the outbox
+        """
+
+        if (data.get("data") or {}).get("SaveMediaListEntry") is not None:
+            return True
+
+        return any(
+            (error.get("path") or [None])[0] == "SaveMediaListEntry"
+            for error in data.get("errors") or []
+        )
+
+    async def flush_outbox(self) -> list[tuple[int, ReplayResult]]:
+        """
+        Function that sends every list entry change in the outbox, as few
+        aliased mutations as possible, and resolves the update_list_entry()
+        calls waiting for them. Changes left over from an earlier flush or
+        made offline are dropped in favour of AniList's version if their
+        entry was edited elsewhere since, and kept queued if that can't be
+        checked. Changes which couldn't be sent stay queued, and flushing
+        stops if the API can't be reached
+
+        @rtype: list[tuple[int, ReplayResult]]
+        @returns: list of (media id, result) tuples of the sent changes
+        """
+
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        async with self._flush_lock:
+            waiting, self._waiting = self._waiting, {}
+            user = self.api.user
+            entries: list[OutboxEntry] = []
+            responses: dict[int, dict] = {}
+            results: list[tuple[int, ReplayResult]] = []
+
+            try:
+                if user is not None:
+                    entries = await self.api.cache.run(self.api.outbox.pending, user)
+                if entries and self.api.online:
+                    results = await self._send_outbox(entries, waiting, responses)
+            finally:
+                sent = {media_id for media_id, _ in results}
+                for entry in entries:
+                    future = waiting.pop(entry.media_id, None)
+                    if future is None or future.done():
+                        continue
+                    if entry.media_id in responses:
+                        future.set_result(self._saved_entry(responses[entry.media_id]))
+                    elif entry.media_id in sent:
+                        future.set_result(None)
+                    else:
+                        future.set_result(
+                            await self._patch_queued(entry.media_id, entry.variables)
+                        )
+                for future in waiting.values():
+                    if not future.done():
+                        future.set_result(None)
+
+            return results
+
+    async def _send_outbox(
+        self,
+        entries: list[OutboxEntry],
+        waiting: dict[int, asyncio.Future[dict | None]],
+        responses: dict[int, dict],
+    ) -> list[tuple[int, ReplayResult]]:
+        """
+        Helper function that checks the queued changes for conflicts and
+        sends the others in batches of MAX_BATCH_MUTATIONS mutations. Only
+        the changes AniList saved or rejected leave the outbox, those which
+        couldn't be sent, e.g. without a valid access token, or were part of
+        a request rejected as a whole stay queued
+
+        @type entries: list[OutboxEntry]
+        @type waiting: dict[int, asyncio.Future[dict | None]]
+        @type responses: dict[int, dict]
+        @param entries: queued changes
+        @param waiting: futures of the update_list_entry() calls being
+        flushed, whose changes are too recent to need a conflict check
+        @param responses: filled with the saved entry of every sent change
+        by media id
+        @rtype: list[tuple[int, ReplayResult]]
+        @returns: list of (media id, result) tuples of the sent changes
+        """
+
+        user = self.api.user
+        stale = [
+            entry
+            for entry in entries
+            if entry.media_id not in waiting and entry.updated_at is not None
+        ]
+        # sent uncached, the cached entries may carry the queued changes, and
+        # one by one, the 404 of a missing entry fails a merged request
+        current = await asyncio.gather(
+            *(
+                self.api.get_uncached(
+                    get_list_entry, {"userName": user, "mediaId": entry.media_id}
+                )
+                for entry in stale
+            )
+        )
+        edited = {
+            entry.media_id: self._edited_since(entry, data)
+            for entry, data in zip(stale, current)
+        }
+        conflicts = [entry for entry in stale if edited[entry.media_id]]
+        results = [(entry.media_id, ReplayResult.CONFLICT) for entry in conflicts]
+        await self.api.cache.run(self.api.outbox.remove, conflicts)
+
+        pending = [
+            entry for entry in entries if edited.get(entry.media_id, False) is False
+        ]
+        for start in range(0, len(pending), MAX_BATCH_MUTATIONS):
+            chunk = pending[start : start + MAX_BATCH_MUTATIONS]
+            saved = await self.api.authenticated_batch(
+                [
+                    (
+                        update_entry,
+                        entry.variables,
+                        {media_tag(entry.media_id), list_tag(user)},
+                        partial(
+                            patch_list_entry,
+                            entry.media_id,
+                            user,
+                            status_changed="status" in entry.variables,
+                        ),
+                    )
+                    for entry in chunk
+                ]
+            )
+            answered = [
+                (entry, data)
+                for entry, data in zip(chunk, saved)
+                if data is not None and self._answered(data)
+            ]
+            if len(answered) < len(chunk):
+                logger.warning(
+                    "%d list entry changes couldn't be sent, they stay queued",
+                    len(chunk) - len(answered),
+                )
+            await self.api.cache.run(
+                self.api.outbox.remove, [entry for entry, _ in answered]
+            )
+            for entry, data in answered:
+                entry_data = (data["data"] or {}).get("SaveMediaListEntry")
+                if entry_data is None:
+                    results.append((entry.media_id, ReplayResult.FAILED))
+                    continue
+                responses[entry.media_id] = dict(entry_data)
+                results.append((entry.media_id, ReplayResult.SAVED))
+
+            if not self.api.online:
+                break
+
+        for media_id, result in results:
+            if result is not ReplayResult.SAVED:
+                logger.warning(
+                    "change to list entry of media %d dropped: %s",
+                    media_id,
+                    result.name,
+                )
+                # the cached entry may still show the dropped change
+                await self.api.cache.invalidate({media_tag(media_id), list_tag(user)})
+
+        return results
+
     @validate_call
-    async def get_media_info(self, id: int) -> CompleteDocument | None:
+    async def get_media_info(
+        self, id: int, profile: FieldProfile = FieldProfile.FULL
+    ) -> CompleteDocument | None:
         """
         Function that gets detailed information on a media entry matching
         the id
 
         @type id: int
+        @type profile: FieldProfile
         @param id: id of media
+        @param profile: fields of the media to request, the fields left out
+        keep the defaults of the document
         @rtype: CompleteDocument
         @returns: document containing detailed information on the matching media
         """
 
-        media_filters = MediaFilter()
-        media_filters["media_id"] = id
-
-        data = await self.api.get_data(
-            *self._filter_to_graphql(get_expanded_media_info, media_filters)
-        )
+        data = await self.api.get_data(*self._media_info_request(id, profile))
 
         if data is None:
             return None
 
-        data = data["data"]["Media"]
+        return self._parse_media_info(data)
+
+    @validate_call
+    async def get_media_info_many(self, ids: list[int]) -> dict[int, CompleteDocument]:
+        """
+        Function that gets detailed information on many media at once. Media
+        missing from the cache are requested MEDIA_INFO_CHUNK at a time, and
+        each of them is cached as if get_media_info() had fetched it
+
+        @type ids: list[int]
+        @param ids: ids of media
+        @rtype: dict[int, CompleteDocument]
+        @returns: documents containing detailed information keyed by media id,
+        in the order of ids, without the media which couldn't be found
+        """
+
+        requests = {id: self._media_info_request(id) for id in dict.fromkeys(ids)}
+        cached = await asyncio.gather(
+            *(
+                self.api.cache.get(query, variables, self.api.user)
+                for query, variables in requests.values()
+            )
+        )
+        found = {id: data for id, data in zip(requests, cached) if data is not None}
+
+        missing = [id for id in requests if id not in found]
+        pages = await asyncio.gather(
+            *(
+                self.api.get_data(
+                    get_media_info_many,
+                    {
+                        "id_in": missing[start : start + MEDIA_INFO_CHUNK],
+                        "perPage": MEDIA_INFO_CHUNK,
+                    },
+                )
+                for start in range(0, len(missing), MEDIA_INFO_CHUNK)
+            )
+        )
+
+        for page in pages:
+            if page is None:
+                continue
+            for media in page["data"]["Page"]["media"]:
+                if media["id"] not in requests:
+                    continue
+                query, variables = requests[media["id"]]
+                data = {"data": {"Media": media}}
+                self.api.prime(query, variables, data)
+                found[media["id"]] = data
+
+        return {id: self._parse_media_info(found[id]) for id in requests if id in found}
+
+    def _parse_media_info(self, data: dict) -> CompleteDocument:
+        """
+        Helper function that builds an Anime or Manga from a response
+        containing a Media object
+
+        @type data: dict
+        @param data: response with a Media root field
+        @rtype: CompleteDocument
+        @returns: document containing detailed information on the media
+        """
 
-        data["adapter"] = self
+        data = self._model_fields(data["data"]["Media"])
         data["title"] = MediaTitle(**data["title"])
-        data["startDate"] = fuzzydate_to_date(data.get("startDate", None))
-        data["endDate"] = fuzzydate_to_date(data.get("endDate", None))
+        data["startDate"] = fuzzydate_to_date(data.get("startDate") or {})
+        data["endDate"] = fuzzydate_to_date(data.get("endDate") or {})
 
         if "description" in data:
             data["description"] = re.sub(CLEANR, "", data["description"])
 
-        for i, genre in enumerate(data["genres"]):
-            data["genres"][i] = "_".join(genre.upper().replace("-", " ").split())
+        if "genres" in data:
+            data["genres"] = [
+                "_".join(genre.upper().replace("-", " ").split())
+                for genre in data["genres"]
+            ]
 
         self._parse_media_list_entry(data)
 
@@ -280,24 +928,75 @@ class AnilistAdapter:
         else:
             return Manga(**data)
 
+    def _media_info_request(
+        self, id: int, profile: FieldProfile = FieldProfile.FULL
+    ) -> tuple:
+        """
+        Helper function that builds the (query, variables) tuple of the
+        expanded info of a media
+
+        @type id: int
+        @type profile: FieldProfile
+        @param id: id of media
+        @param profile: fields of the media to request
+        @rtype: Tuple
+        @returns: tuple of (query string, variables dict)
+        """
+
+        media_filters = MediaFilter()
+        media_filters["media_id"] = id
+
+        return self._filter_to_graphql(
+            get_expanded_media_info, media_filters, fields=MEDIA_PROFILES[profile]
+        )
+
     @validate_call
-    async def get_media_list(
+    async def prefetch_media_info(self, id: int) -> None:
+        """
+        Function that warms the cache with the detailed information of a
+        media at prefetch priority, so get_media_info() answers instantly.
+        Cancelling the call cancels the request if it isn't needed otherwise
+
+        @type id: int
+        @param id: id of media
+        """
+
+        await self.api.prefetch(*self._media_info_request(id))
+
+    def _parse_list_entry(self, entry: dict) -> MediaListEntry:
+        """
+        Helper function that builds a MediaListEntry from a list entry of a
+        MediaListCollection response
+
+        @type entry: dict
+        @param entry: list entry of the response
+        @rtype: MediaListEntry
+        @returns: the list entry object
+        """
+
+        entry = self._model_fields(entry)
+        entry["title"] = MediaTitle(**entry.pop("media")["title"])
+        entry["startedAt"] = fuzzydate_to_date(entry.get("startedAt") or {})
+        entry["completedAt"] = fuzzydate_to_date(entry.get("completedAt") or {})
+
+        return MediaListEntry(**entry)
+
+    async def _get_media_list_chunk(
         self,
         user_name: str,
         media_type: MediaType,
         media_list_status: list[MediaListStatus],
-    ) -> list[tuple]:
+        chunk: int,
+        per_chunk: int,
+        priority: RequestPriority,
+        profile: FieldProfile,
+    ) -> dict | None:
         """
-        Function that requests media lists based on function parameters
+        Helper function that requests one chunk of a MediaListCollection
 
-        @type user_name: str
-        @type media_type: MediaType
-        @type media_list_status: List[MediaListStatus]
-        @param user_name: anilist username
-        @param media_type: anime or manga
-        @param media_list_status: list of media statuses
-        @rtype: List[Tuple]
-        @returns: list of tuples with media list info (length, status, etc.)
+        @rtype: dict | None
+        @returns: the MediaListCollection of the chunk, or None if the
+        request failed
         """
 
         list_filters = MediaListFilter()
@@ -305,37 +1004,132 @@ class AnilistAdapter:
         list_filters["user_name"] = user_name
         list_filters["media_type"] = media_type
         list_filters["status_in"] = media_list_status
+        list_filters["chunk"] = chunk
+        list_filters["per_chunk"] = per_chunk
 
         data = await self.api.get_data(
-            *self._filter_to_graphql(get_media_list, list_filters)
+            *self._filter_to_graphql(
+                get_media_list, list_filters, fields=LIST_ENTRY_PROFILES[profile]
+            ),
+            tags={list_tag(user_name)},
+            priority=priority,
         )
 
         if data is None:
-            return []
-
-        data = data["data"]["MediaListCollection"]["lists"]
-        results = []
-
-        for media_list in data:
-            entries = media_list["entries"]
-            entry_objects = []
-
-            for entry in entries:
-                entry["adapter"] = self
-                entry["title"] = MediaTitle(**entry["media"]["title"])
-                del entry["media"]["title"]
-                entry["startedAt"] = fuzzydate_to_date(entry["startedAt"])
-                entry["completedAt"] = fuzzydate_to_date(entry["completedAt"])
-
-                entry_objects.append(MediaListEntry(**entry))
-
-            results.append(
-                (
-                    media_list["name"],
-                    media_list["status"],
-                    len(entries),
-                    entry_objects,
-                )
+            return None
+
+        return data["data"]["MediaListCollection"]
+
+    @validate_call
+    async def get_media_list_chunks(
+        self,
+        user_name: str,
+        media_type: MediaType,
+        media_list_status: list[MediaListStatus],
+        per_chunk: int = 500,
+        profile: FieldProfile = FieldProfile.FULL,
+    ) -> AsyncIterator[tuple]:
+        """
+        Async generator that requests media lists chunk by chunk, yielding
+        the entries of each list as soon as their chunk arrives. The next
+        chunk is prefetched while the current one is consumed
+
+        @type user_name: str
+        @type media_type: MediaType
+        @type media_list_status: List[MediaListStatus]
+        @type per_chunk: int
+        @type profile: FieldProfile
+        @param user_name: anilist username
+        @param media_type: anime or manga
+        @param media_list_status: list of media statuses
+        @param per_chunk: number of entries per chunk, at most 500
+        @param profile: fields of the list entries to request
+        @rtype: AsyncIterator[Tuple]
+        @returns: async iterator over (list name, status, entries) tuples, a
+        list spanning several chunks is yielded once per chunk. Entries are
+        a LazySequence building each MediaListEntry on first access
+        """
+
+        chunk = 1
+        next_chunk: asyncio.Task | None = asyncio.create_task(
+            self._get_media_list_chunk(
+                user_name,
+                media_type,
+                media_list_status,
+                chunk,
+                per_chunk,
+                RequestPriority.INTERACTIVE,
+                profile,
             )
+        )
 
-        return results
+        try:
+            while next_chunk is not None:
+                collection = await next_chunk
+                next_chunk = None
+
+                if collection is None:
+                    return
+
+                if collection.get("hasNextChunk"):
+                    chunk += 1
+                    next_chunk = asyncio.create_task(
+                        self._get_media_list_chunk(
+                            user_name,
+                            media_type,
+                            media_list_status,
+                            chunk,
+                            per_chunk,
+                            RequestPriority.PREFETCH,
+                            profile,
+                        )
+                    )
+
+                for media_list in collection["lists"]:
+                    yield (
+                        media_list["name"],
+                        media_list["status"],
+                        LazySequence(media_list["entries"], self._parse_list_entry),
+                    )
+        finally:
+            self._abandon(next_chunk)
+
+    @validate_call
+    async def get_media_list(
+        self,
+        user_name: str,
+        media_type: MediaType,
+        media_list_status: list[MediaListStatus],
+        profile: FieldProfile = FieldProfile.FULL,
+    ) -> list[tuple]:
+        """
+        Function that requests media lists based on function parameters,
+        collecting every chunk of the collection
+
+        @type user_name: str
+        @type media_type: MediaType
+        @type media_list_status: List[MediaListStatus]
+        @type profile: FieldProfile
+        @param user_name: anilist username
+        @param media_type: anime or manga
+        @param media_list_status: list of media statuses
+        @param profile: fields of the list entries to request, the fields
+        left out keep the defaults of the entries
+        @rtype: List[Tuple]
+        @returns: list of tuples with media list info (length, status, etc.),
+        entries are a LazySequence building each MediaListEntry on first access
+        """
+
+        lists: dict[str, tuple[str, LazySequence[MediaListEntry]]] = {}
+
+        async for name, status, entries in self.get_media_list_chunks(
+            user_name, media_type, media_list_status, profile=profile
+        ):
+            if name in lists:
+                entries = lists[name][1] + entries
+            lists[name] = (status, entries)
+
+        return [
+            (name, status, len(entries), entries)
+            for name, (status, entries) in lists.items()
+        ]
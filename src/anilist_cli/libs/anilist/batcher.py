@@ -0,0 +1,305 @@
+import asyncio
+import re
+from collections.abc import Awaitable, Callable
+
+from .rate_limiter import RequestPriority
+
+# header of an operation document: type, name and variable declarations
+QUERY_HEADER = re.compile(
+    r"\s*(?P<operation>query|mutation)\s*\w*\s*(?:\((?P<declarations>[^)]*)\))?\s*\{"
+)
+DECLARATION = re.compile(r"\$(\w+)\s*:\s*([^\s,$)]+)")
+VARIABLE = re.compile(r"\$(\w+)")
+ROOT_FIELD = re.compile(r"^\s*(\w+)")
+# alias of a merged query, or one of its renamed variables, in an error
+ALIAS_REFERENCE = re.compile(r"\bq(\d+)(?:_\w+)?\b")
+
+
+def _alias(index: int) -> str:
+    return f"q{index}"
+
+
+def _parse(query: str) -> tuple[str, list[tuple[str, str]], str, str]:
+    """
+    Helper function that splits a single root field operation document into
+    its operation type, variable declarations, selection body and root
+    field name
+    """
+
+    header = QUERY_HEADER.match(query)
+    if header is None:
+        raise ValueError("only query and mutation documents can be batched")
+
+    body = query[header.end() : query.rindex("}")]
+    root = ROOT_FIELD.match(body)
+    if root is None:
+        raise ValueError("query document has no root field")
+
+    declarations = DECLARATION.findall(header.group("declarations") or "")
+    return (header.group("operation"), declarations, body, root.group(1))
+
+
+def merge_queries(queries: list[tuple[str, dict]]) -> tuple[str, dict, list[str]]:
+    """
+    Function that merges several single root field queries into one
+    document. Each root field is aliased q<index> and its variables are
+    renamed q<index>_<name> so the queries can't collide. Mutations can be
+    merged too, as long as they aren't mixed with queries, and are run by
+    the API in order
+
+    @type queries: list[tuple[str, dict]]
+    @param queries: list of (query, variables) tuples, all of the same
+    operation type
+    @rtype: tuple[str, dict, list[str]]
+    @returns: tuple of (merged query, merged variables, root field names)
+    """
+
+    declarations = []
+    selections = []
+    variables = {}
+    roots = []
+    operations = set()
+
+    for index, (query, query_variables) in enumerate(queries):
+        alias = _alias(index)
+        operation, query_declarations, body, root = _parse(query)
+        operations.add(operation)
+
+        declarations += [
+            f"${alias}_{name}: {type_}" for name, type_ in query_declarations
+        ]
+        body = VARIABLE.sub(lambda match: f"${alias}_{match.group(1)}", body)
+        selections.append(ROOT_FIELD.sub(rf"{alias}: \1", body, count=1))
+        variables |= {f"{alias}_{key}": value for key, value in query_variables.items()}
+        roots.append(root)
+
+    if len(operations) > 1:
+        raise ValueError("queries and mutations can't be batched together")
+
+    merged = f"{operations.pop()} Batch"
+    if declarations:
+        merged += f"({' '.join(declarations)})"
+    merged += " {" + "".join(selections) + "}"
+
+    return (merged, variables, roots)
+
+
+def split_response(
+    data: dict, roots: list[str], rejected: bool = False
+) -> list[dict | None]:
+    """
+    Function that splits the response of a merged query back into one
+    response per query, as if each had been sent on its own
+
+    @type data: dict
+    @type roots: list[str]
+    @type rejected: bool
+    @param data: response of the merged query
+    @param roots: root field names returned by merge_queries
+    @param rejected: whether queries which returned errors but no data get
+    a response with no data and their errors, rather than None
+    @rtype: list[dict | None]
+    @returns: list of responses, None for queries which returned no data
+    """
+
+    results = []
+    merged_data = data.get("data") or {}
+    errors = data.get("errors") or []
+
+    for index, root in enumerate(roots):
+        alias = _alias(index)
+        value = merged_data.get(alias)
+        query_errors = [
+            error | {"path": [root, *error["path"][1:]]}
+            for error in errors
+            if error.get("path") and error["path"][0] == alias
+        ]
+        if value is None and not (rejected and query_errors):
+            results.append(None)
+            continue
+
+        result: dict = {"data": None if value is None else {root: value}}
+        if query_errors:
+            result["errors"] = query_errors
+        results.append(result)
+
+    return results
+
+
+def rejected_queries(data: dict, count: int) -> dict[int, list[dict]]:
+    """
+    Function that finds the queries of a merged request its errors point
+    at, by the alias in their path or the renamed variables they mention
+
+    @type data: dict
+    @type count: int
+    @param data: response of the merged query
+    @param count: number of merged queries
+    @rtype: dict[int, list[dict]]
+    @returns: errors of each query they point at, by query index
+    """
+
+    rejected: dict[int, list[dict]] = {}
+    for error in data.get("errors") or []:
+        path = error.get("path") or []
+        references = [str(path[0])] if path else []
+        references += VARIABLE.findall(error.get("message") or "")
+
+        for reference in references:
+            match = ALIAS_REFERENCE.fullmatch(reference)
+            if match is None or int(match.group(1)) >= count:
+                continue
+            errors = rejected.setdefault(int(match.group(1)), [])
+            if error not in errors:
+                errors.append(error)
+
+    return rejected
+
+
+class QueryBatcher:
+    """
+    Collects the queries submitted within a short window and sends them
+    as a single merged request
+
+    Attributes:
+    window: float seconds to wait for more queries after the first one
+    max_size: int number of queries which flushes the batch immediately
+    _post: function posting a JSON payload with a priority
+    _pending: list of (query, variables, priority, future) waiting to be sent
+    _timer: asyncio.TimerHandle flushing the pending queries
+    _sending: set of tasks currently sending a batch
+    """
+
+    def __init__(
+        self,
+        post: Callable[[dict, RequestPriority], Awaitable[dict | None]],
+        window: float = 0.01,
+        max_size: int = 8,
+    ) -> None:
+        """
+        Initialize an empty QueryBatcher
+
+        @type post: Callable[[dict, RequestPriority], Awaitable[dict | None]]
+        @type window: float
+        @type max_size: int
+        @param post: function posting a JSON payload with a priority
+        @param window: seconds to wait for more queries after the first one
+        @param max_size: number of queries which flushes the batch immediately
+        """
+
+        self.window = window
+        self.max_size = max_size
+        self._post = post
+        self._pending: list[
+            tuple[str, dict, RequestPriority, asyncio.Future[dict | None]]
+        ] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._sending: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        query: str,
+        variables: dict,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+    ) -> dict | None:
+        """
+        Queue a query for the next batch and wait for its response
+
+        @type query: str
+        @type variables: dict
+        @type priority: RequestPriority
+        @param query: single root field graphQL query
+        @param variables: key-value variables for the query
+        @param priority: scheduling priority of the request under the rate limit
+        @rtype: dict | None
+        @returns: response of the query as if it had been sent on its own
+        """
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, variables, priority, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    async def close(self) -> None:
+        """
+        Cancel the queries waiting for a batch and the batches being sent,
+        and wait for them to stop
+        """
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        for _, _, _, future in batch:
+            future.cancel()
+
+        tasks = list(self._sending)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _flush(self) -> None:
+        """
+        Private helper that starts sending the pending queries
+        """
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(
+        self,
+        batch: list[tuple[str, dict, RequestPriority, asyncio.Future[dict | None]]],
+    ) -> None:
+        """
+        Private helper that sends a batch and resolves the futures of its
+        queries
+        """
+
+        futures = [future for _, _, _, future in batch]
+        priority = min((priority for _, _, priority, _ in batch), key=lambda p: p.value)
+
+        try:
+            if len(batch) == 1:
+                query, variables, _, _ = batch[0]
+                results = [
+                    await self._post({"query": query, "variables": variables}, priority)
+                ]
+            else:
+                query, variables, roots = merge_queries(
+                    [(query, variables) for query, variables, _, _ in batch]
+                )
+                data = await self._post(
+                    {"query": query, "variables": variables}, priority
+                )
+                results = (
+                    split_response(data, roots)
+                    if data is not None
+                    else [None] * len(batch)
+                )
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as error:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
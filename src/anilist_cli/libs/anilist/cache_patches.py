@@ -0,0 +1,128 @@
+from typing import Any
+
+from .cache_tags import walk_media
+
+
+def _patch_media(node: Any, media_id: int, saved: dict) -> None:
+    """
+    Helper function that updates the mediaListEntry of every media object
+    matching media_id with the fields of a saved list entry
+    """
+
+    for found_id, media in walk_media(node):
+        if found_id != media_id or "mediaListEntry" not in media:
+            continue
+
+        entry = media["mediaListEntry"]
+        if entry is None:
+            media["mediaListEntry"] = {
+                key: saved.get(key)
+                for key in ("progress", "status", "score", "updatedAt")
+            }
+        else:
+            for key in entry:
+                if key in saved:
+                    entry[key] = saved[key]
+
+
+def _patch_collection(
+    collection: dict,
+    media_id: int,
+    saved: dict,
+    variables: dict,
+    status_changed: bool,
+) -> bool:
+    """
+    Helper function that updates the list entries of media_id in a
+    MediaListCollection chunk and moves them to the list matching their new
+    status
+
+    @rtype: bool
+    @returns: whether the collection could be patched
+    """
+
+    lists = collection["lists"]
+    moved = []
+    found = False
+
+    for media_list in lists:
+        entries = media_list["entries"]
+        for entry in [entry for entry in entries if entry["mediaId"] == media_id]:
+            found = True
+            for key in entry:
+                if key in saved:
+                    entry[key] = saved[key]
+
+            # custom lists have no status and keep their entries, as do all
+            # lists when the save left the status alone
+            status = media_list.get("status")
+            if status is not None and status != saved.get("status", status):
+                entries.remove(entry)
+                moved.append(entry)
+
+    if not found:
+        # an entry kept in its list lives in another chunk of the collection,
+        # while a new or moved entry has no cached media data to build a row
+        # from
+        whole = variables.get("chunk", 1) == 1 and not collection.get("hasNextChunk")
+        return not status_changed and not whole
+
+    if not moved:
+        return True
+
+    for media_list in lists:
+        if media_list.get("status") == saved.get("status"):
+            media_list["entries"].extend(moved)
+            return True
+
+    # the entry left the collection only if its new status is filtered out,
+    # otherwise the list for the new status is missing from the cached data
+    status_in = variables.get("status_in")
+    return status_in is not None and saved.get("status") not in status_in
+
+
+def patch_list_entry(
+    media_id: int,
+    user_name: str | None,
+    response: dict,
+    variables: dict,
+    data: Any,
+    status_changed: bool = True,
+) -> Any | None:
+    """
+    Function that applies a SaveMediaListEntry response to a cached
+    response, updating mediaListEntry objects of the media and the viewer's
+    list collection in place
+
+    @type media_id: int
+    @type user_name: str | None
+    @type response: dict
+    @type variables: dict
+    @type data: Any
+    @type status_changed: bool
+    @param media_id: id of the media whose list entry was saved
+    @param user_name: username of the logged in user
+    @param response: SaveMediaListEntry mutation response
+    @param variables: variables of the cached request
+    @param data: private copy of the cached response to patch
+    @param status_changed: whether the mutation may have changed the status
+    of the entry, moving it between the chunks of a collection
+    @rtype: Any | None
+    @returns: the patched response, or None if it has to be evicted
+    """
+
+    saved = response["data"]["SaveMediaListEntry"]
+    root = data.get("data") or {}
+    collection = root.get("MediaListCollection")
+
+    if collection is not None:
+        if variables.get("userName") != user_name:
+            return None
+        if not _patch_collection(
+            collection, media_id, saved, variables, status_changed
+        ):
+            return None
+        return data
+
+    _patch_media(root, media_id, saved)
+    return data
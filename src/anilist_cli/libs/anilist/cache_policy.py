@@ -0,0 +1,99 @@
+import re
+from functools import lru_cache
+from typing import Any
+
+from .cache_tags import walk_media
+
+MINUTE = 60 * 1000
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# time to live of unknown operations, the former cache-wide default
+DEFAULT_TTL = MINUTE
+
+# details of finished media hardly ever change, the viewer's entry in them
+# is patched by list mutations
+MEDIA_INFO_TTL: dict[str | None, int] = {
+    None: HOUR,
+    "FINISHED": 30 * DAY,
+    "CANCELLED": 30 * DAY,
+    "HIATUS": DAY,
+    "NOT_YET_RELEASED": 6 * HOUR,
+    "RELEASING": HOUR,
+}
+
+# time to live in milliseconds by operation name, then by the status of the
+# media in the response, with None as the fallback of the operation. When a
+# response contains several media, the shortest time to live applies
+TTL_POLICY: dict[str, dict[str | None, int]] = {
+    # search and trending pages reorder as popularity changes
+    "GetMedia": {None: 5 * MINUTE},
+    "GetExpandedMediaInfo": MEDIA_INFO_TTL,
+    "GetMediaInfoMany": MEDIA_INFO_TTL,
+    # the viewer's lists are patched or invalidated by list mutations
+    "GetMediaList": {None: DAY},
+}
+
+OPERATION_NAME = re.compile(r"\s*(?:query|mutation)\s+(\w+)")
+
+
+@lru_cache(maxsize=64)
+def operation_name(query: str) -> str | None:
+    """
+    Function that reads the operation name of a graphQL document
+
+    @type query: str
+    @param query: graphQL document
+    @rtype: str | None
+    @returns: the operation name, or None for anonymous operations
+    """
+
+    match = OPERATION_NAME.match(query)
+    return match.group(1) if match else None
+
+
+def media_statuses(data: Any) -> set[str]:
+    """
+    Function that collects the release status of every media object in a
+    graphQL response, see walk_media(). The status of a list entry is the
+    one of the user's list, so list entries are skipped
+
+    @type data: Any
+    @param data: decoded graphQL response
+    @rtype: set[str]
+    @returns: set of media statuses
+    """
+
+    return {
+        media["status"]
+        for _, media in walk_media(data)
+        if "mediaId" not in media and media.get("status")
+    }
+
+
+def ttl_for(query: str, data: Any) -> int:
+    """
+    Function that picks the time to live of a response from TTL_POLICY
+
+    @type query: str
+    @type data: Any
+    @param query: graphQL query of the request
+    @param data: decoded graphQL response
+    @rtype: int
+    @returns: time to live in milliseconds
+    """
+
+    name = operation_name(query)
+    policy = TTL_POLICY.get(name) if name is not None else None
+    if policy is None:
+        return DEFAULT_TTL
+
+    default = policy[None]
+    if len(policy) == 1:
+        return default
+
+    statuses = media_statuses(data)
+    if not statuses:
+        return default
+
+    return min(policy.get(status, default) for status in statuses)
@@ -0,0 +1,68 @@
+from collections.abc import Iterator
+from typing import Any
+
+
+def media_tag(media_id: int) -> str:
+    """
+    Function that names the cache tag of a media entry
+
+    @type media_id: int
+    @param media_id: anilist media id
+    @rtype: str
+    @returns: tag carried by every cached response containing the media
+    """
+
+    return f"media:{media_id}"
+
+
+def list_tag(user_name: str | None) -> str:
+    """
+    Function that names the cache tag of a user's MediaListCollection
+
+    @type user_name: str | None
+    @param user_name: anilist username
+    @rtype: str
+    @returns: tag carried by every cached list collection of the user
+    """
+
+    return f"list:{user_name}"
+
+
+def walk_media(data: Any) -> Iterator[tuple[Any, dict]]:
+    """
+    Function that finds every media entry in a graphQL response. Media
+    objects are recognized by an id next to a title and list entries by
+    their mediaId. The objects found are those of the response, not copies
+
+    @type data: Any
+    @param data: decoded graphQL response
+    @rtype: Iterator[tuple[Any, dict]]
+    @returns: iterator over (media id, media object or list entry) tuples
+    """
+
+    stack = [data]
+
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "mediaId" in node:
+                yield (node["mediaId"], node)
+            elif "id" in node and "title" in node:
+                yield (node["id"], node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def response_tags(data: Any) -> set[str]:
+    """
+    Function that collects the tags of every media entry in a graphQL
+    response, see walk_media()
+
+    @type data: Any
+    @param data: decoded graphQL response
+    @rtype: set[str]
+    @returns: set of media tags the response depends on
+    """
+
+    return {media_tag(media_id) for media_id, _ in walk_media(data)}
@@ -1,14 +1,39 @@
+import asyncio
 import json
 import logging
+import time
+from collections.abc import Callable, Hashable
+from functools import partial
+from typing import Any
 
 import aiohttp
 from pydantic import validate_call
 
-from ..cache.session_cache import SessionCache
-from .queries import get_user
+from ..cache.async_cache import AsyncSessionCache
+from ..cache.session_cache import SessionCache, cache_key
+from .batcher import QueryBatcher, merge_queries, rejected_queries, split_response
+from .cache_policy import ttl_for
+from .cache_tags import response_tags
+from .outbox import Outbox
+from .queries import get_user, prune
+from .rate_limiter import RateLimiter, RequestPriority, parse_retry_after
+from .title_index import TitleIndex
 
 ANILIST_URL = "https://graphql.anilist.co"
 
+# expired responses younger than this are served while being refreshed
+STALE_GRACE = 24 * 60 * 60 * 1000
+
+# expired responses younger than this are kept to be served offline
+OFFLINE_RETENTION = 30 * 24 * 60 * 60 * 1000
+
+# seconds the API is left alone after it could not be reached
+RECONNECT_DELAY = 30.0
+
+# statuses the API answers when it rejects the content of a request, as
+# opposed to the request itself, e.g. 401 for an expired access token
+REJECTED_STATUSES = frozenset({400, 404})
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,27 +47,106 @@ class AnilistClient:
     _session: aiohttp client session used to make API requests
     headers: headers to be sent with API requests
     cache: session cache to store API request responses
-    _v: int denoting the number of anilist mutations made this session
+    _in_flight: dict mapping cache keys to the requests currently fetching them
+    url: str url of the graphQL endpoint
+    rate_limiter: RateLimiter pacing requests to the API
+    max_retries: int number of retries of rate limited or failed requests
+    batcher: QueryBatcher merging batchable queries into single requests
+    _refresh_listeners: list of functions called when a stale response has
+    been refreshed
+    stale_grace: int milliseconds an expired response is served while it
+    is refreshed
+    offline_retention: int milliseconds an expired response is still
+    served while offline
+    offline: bool whether every request is answered from the cache only
+    _unreachable_since: float | None monotonic time the API last could not
+    be reached, None if the last request got through
+    outbox: Outbox list entry changes waiting to be sent to the API
+    _reconnect_listeners: list of functions called when the API can be
+    reached again
+    titles: TitleIndex of the media titles of every response, used from the
+    cache thread
+    _prefetching: set of the cache keys of in-flight requests only wanted by
+    prefetch() calls
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache_path: str = "query_cache.db",
+        url: str = ANILIST_URL,
+        rate_limiter: RateLimiter | None = None,
+        max_retries: int = 3,
+        stale_grace: int = STALE_GRACE,
+        offline_retention: int = OFFLINE_RETENTION,
+        offline: bool = False,
+    ) -> None:
         """
         Initialize the AnilistClient object with no access token,
         a session cache, and a client session
+
+        @type cache_path: str
+        @type url: str
+        @type rate_limiter: RateLimiter | None
+        @type max_retries: int
+        @type stale_grace: int
+        @type offline_retention: int
+        @type offline: bool
+        @param cache_path: path to the cache db disk file
+        @param url: url of the graphQL endpoint
+        @param rate_limiter: rate limiter to use, defaults to AniList's limits
+        @param max_retries: number of retries of rate limited or failed requests
+        @param stale_grace: milliseconds an expired response is still served
+        while it is refreshed in the background, 0 to always wait for the API
+        @param offline_retention: milliseconds an expired response is kept to
+        be served while the API can't be reached
+        @param offline: whether to answer every request from the cache only,
+        without ever reaching the API
         """
 
         self.token: str | None = None
         self.user: str | None = None
         self._session: aiohttp.ClientSession = aiohttp.ClientSession()
         self.headers: dict[str, str] = {}
-        self.cache: SessionCache = SessionCache("query_cache.db")
-        self._v: int = 0
+        self.cache = AsyncSessionCache(
+            SessionCache(cache_path, grace=max(stale_grace, offline_retention))
+        )
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.url = url
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.max_retries = max_retries
+        self.batcher = QueryBatcher(
+            lambda payload, priority: self._post(payload, priority=priority)
+        )
+        self._refresh_listeners: list[Callable[[str, dict, dict], None]] = []
+        self.stale_grace = stale_grace
+        self.offline_retention = offline_retention
+        self.offline = offline
+        self._unreachable_since: float | None = None
+        self.outbox = Outbox(cache_path)
+        self._reconnect_listeners: list[Callable[[], None]] = []
+        self.titles = TitleIndex(cache_path)
+        self._prefetching: set[Hashable] = set()
+
+    @property
+    def online(self) -> bool:
+        """
+        Whether requests are sent to the API. False in offline mode and for
+        RECONNECT_DELAY seconds after the API could not be reached, during
+        which requests are answered from the cache only
+        """
+        if self.offline:
+            return False
+        return (
+            self._unreachable_since is None
+            or time.monotonic() - self._unreachable_since >= RECONNECT_DELAY
+        )
 
     @validate_call
     async def login(self, access_token: str) -> dict | None:
         """
         Attempts to set access token for this session. Checks to see if the
-        token is valid and then returns data about the user.
+        token is valid and then returns data about the user. While offline,
+        the user data of the last login with the same token is used
 
         @type access_token: str
         @param access_token: anilist access token
@@ -50,111 +154,682 @@ class AnilistClient:
         @returns: user info if the access token is valid
         """
         temp_headers = {"Authorization": f"Bearer {access_token}"}
-        data = await self._post({"query": get_user}, headers=temp_headers)
+        data = None
+        if self.online:
+            data = await self._post({"query": get_user}, headers=temp_headers)
+
+        online = data is not None
+        if online:
+            self.cache.set(get_user, {}, access_token, data)
+        elif not self.online:
+            # cached under the token, which is only stored as part of a digest
+            cached = await self.cache.lookup(
+                get_user, {}, access_token, self.offline_retention
+            )
+            data = cached[0] if cached is not None else None
+
         if data is None:
             return None
 
         self.token = access_token
         self.headers = temp_headers
         self.user = data["data"]["Viewer"]["name"]
+        if online:
+            self._notify_reconnect()
         return data["data"]["Viewer"]
 
     @validate_call
-    async def get_data(self, query: str, variables: dict) -> dict | None:
+    async def get_data(
+        self,
+        query: str,
+        variables: dict,
+        tags: set[str] | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        batch: bool = False,
+    ) -> dict | None:
         """
-        Abstraction around get queries
+        Abstraction around get queries. Responses are cached tagged with
+        the media they contain plus any extra tags given. Concurrent calls
+        missing the cache for the same request share a single POST, and
+        batchable queries missing the cache at the same time are merged
+        into one POST. Expired responses within the stale grace are returned
+        immediately and refreshed in the background, see
+        add_refresh_listener(). While offline, or when the request finds the
+        API unreachable, responses expired within the offline retention are
+        returned as is and misses return None
 
         @type query: str
         @type variables: dict
+        @type tags: set[str] | None
+        @type priority: RequestPriority
         @param query: graphQL query request
         @param variables: key-value variables for the query
+        @param tags: extra cache tags the response depends on
+        @param priority: scheduling priority of the request under the rate limit
+        @param batch: whether the query may be merged with other queries, only
+        for documents with a single root field
         @rtype: dict | None
         @returns: full response dict from the AniList API
         """
 
-        cached = self._check_cache(query, variables)
+        key = cache_key(query, variables, self.user)
+        online = self.online
+        cached = await self._check_cache(
+            query, variables, self.stale_grace if online else self.offline_retention
+        )
+
         if cached is not None:
-            return cached
+            data, stale = cached
+            if stale and online and key not in self._in_flight:
+                task = asyncio.create_task(
+                    self._revalidate(query, variables, tags, data)
+                )
+                self._in_flight[key] = task
+                task.add_done_callback(partial(self._forget_in_flight, key))
+            return data
+
+        if not online:
+            return None
+
+        while True:
+            task = self._in_flight.get(key)
+            # a prefetch joined by a caller has to complete
+            self._prefetching.discard(key)
+
+            if task is None or task.done():
+                task = asyncio.create_task(
+                    self._fetch(query, variables, tags, priority, batch)
+                )
+                self._in_flight[key] = task
+                task.add_done_callback(partial(self._forget_in_flight, key))
+
+            try:
+                # shielded so a cancelled caller doesn't cancel the shared request
+                data = await asyncio.shield(task)
+                break
+            except asyncio.CancelledError:
+                # a prefetch cancelled before this call joined it took the
+                # request down, send it again
+                current = asyncio.current_task()
+                if not task.cancelled() or (current and current.cancelling()):
+                    raise
+
+        if data is None and not self.online:
+            # the API became unreachable, fall back to the offline mirror
+            cached = await self._check_cache(query, variables, self.offline_retention)
+            if cached is not None:
+                return cached[0]
+
+        return data
+
+    @validate_call
+    async def prefetch(
+        self, query: str, variables: dict, tags: set[str] | None = None
+    ) -> None:
+        """
+        Warm the cache with the response of a query at prefetch priority,
+        unless a fresh response is cached or the request is in flight already.
+        Cancelling the call cancels the request too, unless get_data() has
+        been called for it meanwhile
+
+        @type query: str
+        @type variables: dict
+        @type tags: set[str] | None
+        @param query: graphQL query request
+        @param variables: key-value variables for the query
+        @param tags: extra cache tags the response depends on
+        """
+
+        key = cache_key(query, variables, self.user)
+        if not self.online or key in self._in_flight:
+            return
+
+        if await self.cache.get(query, variables, self.user) is not None:
+            return
+
+        # the cache lookup yielded, another caller may have started the request
+        if key in self._in_flight:
+            return
+
+        task = asyncio.create_task(
+            self._fetch(query, variables, tags, RequestPriority.PREFETCH)
+        )
+        self._in_flight[key] = task
+        self._prefetching.add(key)
+        task.add_done_callback(partial(self._forget_in_flight, key))
+
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if key in self._prefetching:
+                task.cancel()
+            raise
+
+    async def _fetch(
+        self,
+        query: str,
+        variables: dict,
+        tags: set[str] | None,
+        priority: RequestPriority,
+        batch: bool = False,
+    ) -> dict | None:
+        """
+        Private helper that posts a query and caches the response for the
+        time to live its operation and media statuses call for. The titles
+        of its media are indexed in the background
+
+        @type query: str
+        @type variables: dict
+        @type tags: set[str] | None
+        @type priority: RequestPriority
+        @param query: graphQL query request
+        @param variables: key-value variables for the query
+        @param tags: extra cache tags the response depends on
+        @param priority: scheduling priority of the request under the rate limit
+        @param batch: whether the query may be merged with other queries
+        @rtype: dict | None
+        @returns: full response dict from the AniList API
+        """
 
-        data = await self._post({"query": query, "variables": variables})
+        if batch:
+            data = await self.batcher.submit(query, variables, priority)
+        else:
+            data = await self._post(
+                {"query": query, "variables": variables}, priority=priority
+            )
         if data is None:
             return None
 
-        self.cache.set(query, variables, self.user, data, self._v)
+        self.prime(query, variables, data, tags)
+        self.cache.run_later(self.titles.add_response, data)
         return data
 
+    def prime(
+        self, query: str, variables: dict, data: dict, tags: set[str] | None = None
+    ) -> None:
+        """
+        Cache a response for the time to live its operation and media
+        statuses call for, tagged like get_data() does. Used to store the
+        parts of a larger response under the requests which would fetch them
+        on their own
+
+        @type query: str
+        @type variables: dict
+        @type data: dict
+        @type tags: set[str] | None
+        @param query: graphQL query request
+        @param variables: key-value variables for the query
+        @param data: response of the query, which must not be mutated
+        afterwards
+        @param tags: extra cache tags the response depends on
+        """
+
+        self.cache.set(
+            query,
+            variables,
+            self.user,
+            data,
+            response_tags(data) | (tags or set()),
+            ttl=ttl_for(query, data),
+        )
+
+    @validate_call
+    async def get_uncached(self, query: str, variables: dict) -> dict | None:
+        """
+        Post a query on its own, bypassing the cache, for data which must be
+        current. Returns None without sending anything while offline
+
+        @type query: str
+        @type variables: dict
+        @param query: graphQL query request
+        @param variables: key-value variables for the query
+        @rtype: dict | None
+        @returns: full response dict from the AniList API, a response with
+        no data and an error holding the status if the API rejected the
+        request (e.g. 404 for a missing list entry), or None if it failed
+        """
+
+        if not self.online:
+            return None
+
+        return await self._post(
+            {"query": query, "variables": variables}, rejections=True
+        )
+
     @validate_call
-    async def authenticated_call(self, mutation: str, variables: dict) -> dict | None:
+    async def search_titles(
+        self, text: str, media_type: str | None = None, limit: int = 20
+    ) -> list[dict]:
         """
-        Abstraction around list entry mutations
+        Search the titles of the media of past responses, without the network
+
+        @type text: str
+        @type media_type: str | None
+        @type limit: int
+        @param text: search text, matched as word prefixes
+        @param media_type: ANIME or MANGA, any type if None
+        @param limit: maximum number of media returned
+        @rtype: list[dict]
+        @returns: list of media objects with the fields known locally, best
+        matches first, empty if SQLite has no full-text search
+        """
+
+        if not self.titles.available:
+            return []
+
+        return await self.cache.run(self.titles.search, text, media_type, limit)
+
+    async def _revalidate(
+        self, query: str, variables: dict, tags: set[str] | None, stale: dict
+    ) -> dict | None:
+        """
+        Private helper that refreshes a stale response at prefetch priority
+        and tells the refresh listeners if it changed
+
+        @type query: str
+        @type variables: dict
+        @type tags: set[str] | None
+        @type stale: dict
+        @param query: graphQL query request
+        @param variables: key-value variables for the query
+        @param tags: extra cache tags the response depends on
+        @param stale: the stale response served meanwhile
+        @rtype: dict | None
+        @returns: the fresh response, or None if the request failed
+        """
+
+        data = await self._fetch(query, variables, tags, RequestPriority.PREFETCH)
+        if data is None or data == stale:
+            return data
+
+        for listener in list(self._refresh_listeners):
+            try:
+                listener(query, variables, data)
+            except Exception:
+                logger.exception("cache refresh listener failed")
+
+        return data
+
+    def add_refresh_listener(self, listener: Callable[[str, dict, dict], None]) -> None:
+        """
+        Register a function called with (query, variables, fresh response)
+        when a stale response served by get_data() has been refreshed with
+        different data, so views showing it can be updated
+
+        @type listener: Callable[[str, dict, dict], None]
+        @param listener: function to call on the event loop
+        """
+
+        self._refresh_listeners.append(listener)
+
+    def remove_refresh_listener(
+        self, listener: Callable[[str, dict, dict], None]
+    ) -> None:
+        """
+        Unregister a function registered with add_refresh_listener()
+
+        @type listener: Callable[[str, dict, dict], None]
+        @param listener: function to unregister
+        """
+
+        self._refresh_listeners.remove(listener)
+
+    def add_reconnect_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Register a function called when a user logs in with the API
+        reachable, or a request gets through to the API after it could not
+        be reached, e.g. to replay the outbox
+
+        @type listener: Callable[[], None]
+        @param listener: function to call on the event loop
+        """
+
+        self._reconnect_listeners.append(listener)
+
+    def remove_reconnect_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Unregister a function registered with add_reconnect_listener()
+
+        @type listener: Callable[[], None]
+        @param listener: function to unregister
+        """
+
+        self._reconnect_listeners.remove(listener)
+
+    def _set_reachable(self, reachable: bool) -> None:
+        """
+        Helper function that records whether the API could be reached and
+        tells the reconnect listeners when it can be reached again
+
+        @type reachable: bool
+        @param reachable: whether the last request got a response
+        """
+
+        if not reachable:
+            self._unreachable_since = time.monotonic()
+            return
+
+        if self._unreachable_since is None:
+            return
+
+        self._unreachable_since = None
+        self._notify_reconnect()
+
+    def _notify_reconnect(self) -> None:
+        """
+        Helper function that calls the reconnect listeners
+        """
+
+        for listener in list(self._reconnect_listeners):
+            try:
+                listener()
+            except Exception:
+                logger.exception("reconnect listener failed")
+
+    def _forget_in_flight(self, key: Hashable, task: asyncio.Task) -> None:
+        """
+        Helper function that drops a finished request from the in-flight
+        requests
+
+        @type key: Hashable
+        @type task: asyncio.Task
+        @param key: cache key of the request
+        @param task: the finished request
+        """
+
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            self._prefetching.discard(key)
+
+        # every caller may have been cancelled, mark the error as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    @validate_call
+    async def authenticated_call(
+        self,
+        mutation: str,
+        variables: dict,
+        invalidates: set[str] | None = None,
+        patch: Callable[[dict, dict, Any], Any | None] | None = None,
+    ) -> dict | None:
+        """
+        Abstraction around list entry mutations. On success the cached
+        responses carrying one of the invalidated tags are patched with the
+        mutation response if a patch function is given, otherwise evicted.
+        Without tags the whole cache is evicted. Returns None without
+        sending anything while offline
 
         @type mutation: str
         @type variables: dict
+        @type invalidates: set[str] | None
+        @type patch: Callable[[dict, dict, Any], Any | None] | None
         @param mutation: graphQL mutation request
         @param variables: key-value variables for the mutation
+        @param invalidates: cache tags of the data changed by the mutation
+        @param patch: function taking the mutation response, the variables of
+        a cached request and its data, returning the patched data or None to
+        evict it
         @rtype: dict | None
         @returns: dictionary containing updated data
         """
 
-        if self.token is None:
+        if self.token is None or not self.online:
             return None
 
         data = await self._post({"query": mutation, "variables": variables})
         if data is None:
             return None
 
-        self._v += 1
+        await self._apply_mutation(data, invalidates, patch)
         return data
 
+    @validate_call
+    async def authenticated_batch(
+        self,
+        mutations: list[
+            tuple[
+                str,
+                dict,
+                set[str] | None,
+                Callable[[dict, dict, Any], Any | None] | None,
+            ]
+        ],
+    ) -> list[dict | None]:
+        """
+        Abstraction around several list entry mutations sent as one aliased
+        request, see authenticated_call(). The mutations are run in order and
+        succeed or fail independently
+
+        @type mutations: list[tuple[str, dict, set[str] | None, Callable | None]]
+        @param mutations: list of (mutation, variables, invalidates, patch)
+        tuples, each a single root field mutation
+        @rtype: list[dict | None]
+        @returns: list of the responses of each mutation as if it had been
+        sent on its own. None for the mutations which couldn't be sent, e.g.
+        without a valid access token. A response with no data for those the
+        API rejected, whose errors have the path of the mutation, or no path
+        if the request was rejected as a whole
+        """
+
+        if self.token is None or not self.online:
+            return [None] * len(mutations)
+
+        query, variables, roots = merge_queries(
+            [(mutation, variables) for mutation, variables, _, _ in mutations]
+        )
+        if len(mutations) == 1:
+            query, variables, _, _ = mutations[0]
+        data = await self._post(
+            {"query": query, "variables": variables}, rejections=True
+        )
+        if data is None:
+            return [None] * len(mutations)
+
+        results: list[dict | None]
+        if data.get("data") is not None:
+            results = (
+                [data]
+                if len(mutations) == 1
+                else split_response(data, roots, rejected=True)
+            )
+        elif len(mutations) == 1:
+            # sent on its own, the mutation is what the API rejected
+            results = [_attributed(data["errors"], roots[0])]
+        else:
+            rejected = rejected_queries(data, len(mutations))
+            if not rejected:
+                # no error points at a mutation, the request was rejected
+                return [data for _ in mutations]
+
+            # one invalid mutation fails a whole request, so the others are
+            # sent again without it
+            others = await self.authenticated_batch(
+                [
+                    mutation
+                    for index, mutation in enumerate(mutations)
+                    if index not in rejected
+                ]
+            )
+            return [
+                _attributed(rejected[index], roots[index])
+                if index in rejected
+                else others.pop(0)
+                for index in range(len(mutations))
+            ]
+
+        for result, (_, _, invalidates, patch) in zip(results, mutations):
+            if result is not None and result.get("data") is not None:
+                await self._apply_mutation(result, invalidates, patch)
+        return results
+
+    async def _apply_mutation(
+        self,
+        data: dict,
+        invalidates: set[str] | None,
+        patch: Callable[[dict, dict, Any], Any | None] | None,
+    ) -> None:
+        """
+        Helper function that patches or evicts the cached responses changed
+        by a successful mutation, see authenticated_call()
+
+        @type data: dict
+        @type invalidates: set[str] | None
+        @type patch: Callable[[dict, dict, Any], Any | None] | None
+        @param data: mutation response
+        @param invalidates: cache tags of the data changed by the mutation
+        @param patch: function patching a cached response with the mutation
+        response
+        """
+
+        if invalidates is None:
+            await self.cache.clear()
+        elif patch is None:
+            await self.cache.invalidate(invalidates)
+        else:
+            await self.cache.patch(invalidates, partial(patch, data))
+
     async def close(self) -> None:
         """
-        Function that closes aiohttp client session
+        Function that cancels background refreshes and batched queries and
+        waits for them to stop, then closes aiohttp client session and the
+        cache connections
         """
+        tasks = list(self._in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.batcher.close()
         if not self._session.closed:
             await self._session.close()
+        await self.cache.close()
+        self.outbox.close()
+        self.titles.close()
 
     async def _post(
-        self, payload: dict, headers: dict[str, str] | None = None
+        self,
+        payload: dict,
+        headers: dict[str, str] | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        rejections: bool = False,
     ) -> dict | None:
         """
-        Private helper that makes a POST request and handles status checking
+        Private helper that makes a POST request and handles status checking.
+        Requests are paced by the rate limiter. Rate limited (429) responses
+        are retried once their Retry-After has passed, server errors (5xx)
+        and 429s without a valid Retry-After with jittered backoff. When the
+        API can't be reached, the client goes offline until
+        RECONNECT_DELAY has passed. The query is sent without the variables
+        the payload leaves unset
 
         @type payload: dict
         @type headers: dict[str, str] | None
+        @type priority: RequestPriority
+        @type rejections: bool
         @param payload: JSON payload for the request
         @param headers: request headers, defaults to self.headers if not provided
+        @param priority: scheduling priority of the request under the rate limit
+        @param rejections: whether a request whose content the API rejects
+        (REJECTED_STATUSES) returns a response with no data and its errors,
+        each holding the status, rather than None
         @rtype: dict | None
         @returns: parsed response JSON, or None if the request failed
         """
-        async with self._session.post(
-            ANILIST_URL,
-            json=payload,
-            headers=headers if headers is not None else self.headers,
-        ) as response:
-            if response.status != 200:
-                logger.warning(
-                    "AniList API error %d: %s",
-                    response.status,
-                    await response.text(),
-                )
+
+        payload = payload | {
+            "query": prune(payload["query"], payload.get("variables") or {})
+        }
+
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(priority)
+
+            try:
+                async with self._session.post(
+                    self.url,
+                    json=payload,
+                    headers=headers if headers is not None else self.headers,
+                ) as response:
+                    self._set_reachable(True)
+                    self.rate_limiter.update(response.headers)
+
+                    if response.status == 200:
+                        return await response.json()
+
+                    text = await response.text()
+                    logger.warning("AniList API error %d: %s", response.status, text)
+
+                    if response.status != 429 and response.status < 500:
+                        if not rejections or response.status not in REJECTED_STATUSES:
+                            return None
+                        return _rejection(text, response.status)
+            except (aiohttp.ClientConnectionError, TimeoutError) as error:
+                logger.warning("AniList API unreachable: %s", error)
+                self._set_reachable(False)
                 return None
-            return await response.json()
 
-    def _check_cache(self, query: str, variables: dict) -> dict | None:
+            if attempt == self.max_retries:
+                break
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After", ""))
+            if response.status == 429 and retry_after is not None:
+                # the Retry-After header already paused the limiter
+                continue
+
+            delay = self.rate_limiter.backoff(attempt)
+            if response.status == 429:
+                self.rate_limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+
+        logger.warning("AniList API request failed after %d retries", self.max_retries)
+        return None
+
+    async def _check_cache(
+        self, query: str, variables: dict, grace: int
+    ) -> tuple[dict, bool] | None:
         """
-        Helper function that checks if the request is already in cache
+        Helper function that checks if the request is already in cache,
+        accepting responses expired within the grace
 
         @type query: str
         @type variables: dict
+        @type grace: int
         @param query: graphQL query
         @param variables: variables for graphQL query
-        @rtype: dict | None
-        @returns: None if the cache missed, and the parsed response data if cache hit
+        @param grace: milliseconds an expired response may still be returned
+        @rtype: tuple[dict, bool] | None
+        @returns: None if the cache missed, and a tuple of (parsed response
+        data, whether it is stale) if cache hit
         """
 
-        data = self.cache.get(query, variables, self.user, self._v)
+        return await self.cache.lookup(query, variables, self.user, grace)
 
-        if data is not None:
-            return json.loads(data["data"])
 
-        return None
+def _rejection(text: str, status: int) -> dict:
+    """
+    Helper function that builds the response of a rejected request from its
+    body, keeping the GraphQL errors it holds
+    """
+
+    try:
+        errors = json.loads(text).get("errors")
+    except (ValueError, AttributeError):
+        errors = None
+    if not errors:
+        errors = [{"message": text}]
+
+    return {"data": None, "errors": [error | {"status": status} for error in errors]}
+
+
+def _attributed(errors: list[dict], root: str) -> dict:
+    """
+    Helper function that builds the response of a rejected mutation from
+    the errors pointing at it, given the path of its root field
+    """
+
+    return {
+        "data": None,
+        "errors": [
+            error | {"path": [root, *(error.get("path") or [])[1:]]} for error in errors
+        ],
+    }
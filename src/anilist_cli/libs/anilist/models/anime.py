@@ -18,7 +18,7 @@ class Anime(CompleteDocument):
 
     duration: int | None = Field(default=None)
     season: str | None = Field(default=None)
-    season_year: int | None = Field(alias="seasonYear")
+    season_year: int | None = Field(default=None, alias="seasonYear")
 
     @validate_call
     def add_changes(self, key: str, value: Any) -> bool:
@@ -50,16 +50,23 @@ class Anime(CompleteDocument):
     @validate_call
     async def update_list_entry(self) -> bool:
         """
-        Function that pushes pending changes of this media entry to Anilist
+        Function that pushes pending changes of this media entry to Anilist.
+        Failed changes are kept pending so they can be pushed again
 
         @rtype: bool
-        @returns: whether or not the changes were successfully pushed
+        @returns: whether or not the changes were successfully pushed, or
+        queued to be pushed once AniList can be reached
         """
 
         if self.changes is None:
             return False
 
-        data = await self.adapter.update_list_entry(self.media_id, self.changes)
+        data = await self.adapter.update_list_entry(
+            self.media_id, self.changes, self.updated_at
+        )
+
+        if data is None:
+            return False
 
         # update values with response data from anilist api
         for key in data.keys():
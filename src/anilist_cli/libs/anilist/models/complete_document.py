@@ -10,23 +10,24 @@ from .media_interface import Media
 
 class CompleteDocument(ListEntry, Media):
     """
-    Interface for objects that are like detailed media entries
+    Interface for objects that are like detailed media entries. Fields left
+    out of the requested FieldProfile keep their defaults
 
     Attributes:
     genres: List of MediaGenre strs
-    description: str description of a media entry
+    description: str | None description of a media entry
     start_date: date | None start date of media
     end_date: date | None end date of media
-    favorites: int number of users who favorited a media
+    favorites: int | None number of users who favorited a media
     source: str | None source for the media (ex. light novel)
     """
 
-    genres: list[str]
-    description: str
+    genres: list[str] = Field(default_factory=list)
+    description: str | None = Field(default=None)
     start_date: date | None = Field(default=None, alias="startDate")
     end_date: date | None = Field(default=None, alias="endDate")
-    favorites: int = Field(alias="favourites")
-    source: str | None
+    favorites: int | None = Field(default=None, alias="favourites")
+    source: str | None = Field(default=None)
 
     @abstractmethod
     def add_changes(self, key: str, value: Any) -> bool: ...
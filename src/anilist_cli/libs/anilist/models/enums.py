@@ -154,3 +154,9 @@ class MediaSort(Enum):
     SEARCH_MATCH = 35
     FAVOURITES = 36
     FAVOURITES_DESC = 37
+
+
+class FieldProfile(Enum):
+    MINIMAL = 1
+    PREVIEW = 2
+    FULL = 3
@@ -16,6 +16,8 @@ class MediaListFilter(BaseModel):
     media_type: MediaType | None = Field(default=None, alias="type")
     status_in: list[MediaListStatus] | None = Field(default=None)
     sort_by: list[MediaSort] | None = Field(default=None)
+    chunk: int | None = Field(default=None)
+    per_chunk: int | None = Field(default=None, alias="perChunk")
 
     def __getitem__(self, key):
         return getattr(self, key)
@@ -0,0 +1,63 @@
+from collections.abc import Callable, Sequence
+from typing import Any, overload
+
+
+class LazySequence[T](Sequence[T]):
+    """
+    Read-only sequence holding raw API payloads and building the item of
+    each payload on first access, so rows that are never looked at are
+    never decoded
+
+    Attributes:
+    _payloads: list of raw payloads
+    _items: list of the items built so far, None where not built yet
+    _build: function building an item from its payload
+    """
+
+    __slots__ = ("_payloads", "_items", "_build")
+
+    def __init__(self, payloads: list[Any], build: Callable[[Any], T]) -> None:
+        """
+        Initialize the LazySequence without building any item
+
+        @type payloads: list[Any]
+        @type build: Callable[[Any], T]
+        @param payloads: list of raw payloads
+        @param build: function building an item from its payload
+        """
+
+        self._payloads = payloads
+        self._items: list[T | None] = [None] * len(payloads)
+        self._build = build
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[T]: ...
+
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        item = self._items[index]
+        if item is None:
+            item = self._items[index] = self._build(self._payloads[index])
+
+        return item
+
+    def __add__(self, other: "LazySequence[T]") -> "LazySequence[T]":
+        """
+        Concatenate two sequences sharing the same builder, keeping the
+        items already built
+        """
+
+        merged = LazySequence(self._payloads + other._payloads, self._build)
+        merged._items = self._items + other._items
+        return merged
+
+    def __repr__(self) -> str:
+        return f"LazySequence(len={len(self)})"
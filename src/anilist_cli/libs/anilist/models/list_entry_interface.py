@@ -18,6 +18,7 @@ class ListEntry(ABC, BaseModel):
     repeat: int | None number of repeats of list entry
     score: float | None score of the list entry
     changes: ListEntryChanges | None changes to make to the list entry
+    updated_at: int | None time the list entry was last saved on AniList
     """
 
     adapter: Any
@@ -29,3 +30,4 @@ class ListEntry(ABC, BaseModel):
     started_at: date | None = Field(default=None, alias="startedAt")
     completed_at: date | None = Field(default=None, alias="completedAt")
     changes: ListEntryChanges | None = Field(default=None)
+    updated_at: int | None = Field(default=None, alias="updatedAt")
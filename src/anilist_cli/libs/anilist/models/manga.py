@@ -41,16 +41,23 @@ class Manga(CompleteDocument):
     @validate_call
     async def update_list_entry(self) -> bool:
         """
-        Function that pushes pending changes of this media entry to Anilist
+        Function that pushes pending changes of this media entry to Anilist.
+        Failed changes are kept pending so they can be pushed again
 
         @rtype: bool
-        @returns: whether or not the changes were successfully pushed
+        @returns: whether or not the changes were successfully pushed, or
+        queued to be pushed once AniList can be reached
         """
 
         if self.changes is None:
             return False
 
-        data = await self.adapter.update_list_entry(self.media_id, self.changes)
+        data = await self.adapter.update_list_entry(
+            self.media_id, self.changes, self.updated_at
+        )
+
+        if data is None:
+            return False
 
         # update values with response data from anilist api
         for key in data.keys():
@@ -0,0 +1,169 @@
+import json
+import time
+from collections.abc import Iterable
+from enum import Enum
+from typing import NamedTuple
+
+from ..cache.db import SQLiteWrapper
+
+CREATE_OUTBOX_TABLE = """
+CREATE TABLE IF NOT EXISTS outbox (
+  id INTEGER PRIMARY KEY,
+  user TEXT NOT NULL,
+  media_id INTEGER NOT NULL,
+  variables TEXT NOT NULL,
+  updated_at INTEGER,
+  created INTEGER NOT NULL
+)
+"""
+
+CREATE_OUTBOX_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS outbox_entry ON outbox (user, media_id)
+"""
+
+# a change to an entry already queued is merged into it, keeping the
+# updatedAt the first change was made on
+UPSERT_CHANGE = """
+INSERT INTO outbox (user, media_id, variables, updated_at, created)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user, media_id) DO UPDATE SET
+  variables = json_patch(outbox.variables, excluded.variables),
+  updated_at = coalesce(outbox.updated_at, excluded.updated_at)
+RETURNING id
+"""
+
+SELECT_PENDING = """
+SELECT id, media_id, variables, updated_at FROM outbox
+WHERE user = ? ORDER BY id
+"""
+
+# changes merged into since they were read are kept for the next flush
+DELETE_CHANGE = "DELETE FROM outbox WHERE id = ? AND json(variables) = json(?)"
+
+
+class ReplayResult(Enum):
+    SAVED = 1
+    # the entry was edited elsewhere after the change was queued
+    CONFLICT = 2
+    FAILED = 3
+
+
+class OutboxEntry(NamedTuple):
+    """
+    List entry change waiting in the outbox
+
+    Attributes:
+    id: int position of the change in the outbox
+    media_id: int id of the media whose list entry changed
+    variables: dict variables of the UpdateEntry mutation
+    updated_at: int | None updatedAt of the list entry the change was made
+    on, None if it was unknown
+    """
+
+    id: int
+    media_id: int
+    variables: dict
+    updated_at: int | None
+
+
+class Outbox:
+    """
+    Durable queue of the list entry changes waiting to be sent to AniList,
+    with one merged change per list entry. It is kept in its own table so
+    clearing or migrating the response cache never loses them
+
+    Attributes:
+    db: SQLiteWrapper connection to local db
+    """
+
+    def __init__(self, db_path: str) -> None:
+        """
+        Initialize the Outbox and create its table
+
+        @type db_path: str
+        @param db_path: path to db disk file, which may be shared with the
+        response cache
+        """
+
+        self.db = SQLiteWrapper(db_path)
+
+        with self.db as conn:
+            conn.execute(CREATE_OUTBOX_TABLE)
+            conn.execute(CREATE_OUTBOX_INDEX)
+
+    def add(
+        self, user: str, media_id: int, variables: dict, updated_at: int | None
+    ) -> int:
+        """
+        Queue a list entry change, merging it into the change already
+        queued for the entry if there is one
+
+        @type user: str
+        @type media_id: int
+        @type variables: dict
+        @type updated_at: int | None
+        @param user: username of the user who made the change
+        @param media_id: id of the media whose list entry changed
+        @param variables: variables of the UpdateEntry mutation
+        @param updated_at: updatedAt of the list entry the change was made
+        on, None to send it without checking for conflicting edits
+        @rtype: int
+        @returns: id of the queued change
+        """
+
+        with self.db as conn:
+            return conn.execute(
+                UPSERT_CHANGE,
+                (
+                    user,
+                    media_id,
+                    json.dumps(variables),
+                    updated_at,
+                    round(time.time() * 1000),
+                ),
+            ).fetchone()[0]
+
+    def pending(self, user: str) -> list[OutboxEntry]:
+        """
+        Get the changes queued by a user, oldest first
+
+        @type user: str
+        @param user: username of the user
+        @rtype: list[OutboxEntry]
+        @returns: list of queued changes
+        """
+
+        with self.db as conn:
+            rows = conn.execute(SELECT_PENDING, (user,)).fetchall()
+
+        return [
+            OutboxEntry(
+                row["id"],
+                row["media_id"],
+                json.loads(row["variables"]),
+                row["updated_at"],
+            )
+            for row in rows
+        ]
+
+    def remove(self, entries: Iterable[OutboxEntry]) -> None:
+        """
+        Delete changes which have been sent. Changes merged into since they
+        were read from pending() are kept
+
+        @type entries: Iterable[OutboxEntry]
+        @param entries: the sent changes
+        """
+
+        with self.db as conn:
+            conn.executemany(
+                DELETE_CHANGE,
+                [(entry.id, json.dumps(entry.variables)) for entry in entries],
+            )
+
+    def close(self) -> None:
+        """
+        Close the database connections
+        """
+
+        self.db.close()
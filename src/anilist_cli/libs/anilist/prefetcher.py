@@ -0,0 +1,82 @@
+import asyncio
+from collections.abc import Iterable
+
+from .adapter import AnilistAdapter
+from .models.media_preview import MediaPreview
+
+
+class MediaPrefetcher:
+    """
+    Warms the cache with the detailed information of the first media a view
+    shows, so opening one of them doesn't wait for the API. Requests run at
+    prefetch priority, and are cancelled when the view changes
+
+    Attributes:
+    adapter: AnilistAdapter fetching the media info
+    top_n: int number of media prefetched per view
+    _task: asyncio.Task | None prefetch of the current view
+    """
+
+    def __init__(self, adapter: AnilistAdapter, top_n: int = 5) -> None:
+        """
+        Initialize an idle MediaPrefetcher
+
+        @type adapter: AnilistAdapter
+        @type top_n: int
+        @param adapter: adapter fetching the media info
+        @param top_n: number of media prefetched per view
+        """
+
+        self.adapter = adapter
+        self.top_n = top_n
+        self._task: asyncio.Task | None = None
+
+    def prefetch(self, media: Iterable[MediaPreview | int]) -> None:
+        """
+        Start prefetching the first top_n media of a view in the background,
+        cancelling the prefetch of the previous view. Must be called from
+        the event loop
+
+        @type media: Iterable[MediaPreview | int]
+        @param media: previews or ids of the media shown, in display order
+        """
+
+        self.cancel()
+
+        ids: list[int] = []
+        for item in media:
+            media_id = item.media_id if isinstance(item, MediaPreview) else item
+            if media_id not in ids:
+                ids.append(media_id)
+            if len(ids) == self.top_n:
+                break
+
+        if ids:
+            self._task = asyncio.create_task(self._prefetch(ids))
+            self._task.add_done_callback(self._prefetch_done)
+
+    async def _prefetch(self, ids: list[int]) -> None:
+        """
+        Private helper that prefetches the media, paced by the rate limiter
+        """
+
+        await asyncio.gather(*(self.adapter.prefetch_media_info(id) for id in ids))
+
+    def _prefetch_done(self, task: asyncio.Task) -> None:
+        """
+        Private helper that marks the error of a failed prefetch as
+        retrieved, a failed prefetch only means a slower drill down
+        """
+
+        if not task.cancelled():
+            task.exception()
+
+    def cancel(self) -> None:
+        """
+        Cancel the prefetch in progress, including its requests no other
+        caller waits for
+        """
+
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
@@ -1,8 +1,241 @@
+import re
+from collections.abc import Iterator
+from functools import lru_cache
 from pathlib import Path
 
+from .cache_policy import operation_name
+
+# the documents hold no string literals, so comments and insignificant
+# whitespace and commas can be dropped with regular expressions
+COMMENT = re.compile(r"#[^\n]*")
+WORD_SEPARATOR = re.compile(r"(?<=\w)[\s,]+(?=\w)")
+SEPARATOR = re.compile(r"(?<!\w)[\s,]+|[\s,]+(?!\w)")
+DECLARATIONS = re.compile(r"^(?:query|mutation)[^({]*\(([^)]*)\)")
+DECLARATION = re.compile(r"\$(\w+):([^$=]+)(=)?")
+EMPTY_ARGUMENTS = re.compile(r"\(\)")
+NAME = re.compile(r"\w+")
+
+# path from the root of each operation to the selection of the objects it
+# returns, media or list entries, which build_query can narrow down to the
+# fields a view needs
+SELECTIONS: dict[str, tuple[str, ...]] = {
+    "GetMedia": ("Page", "media"),
+    "GetExpandedMediaInfo": ("Media",),
+    "GetMediaInfoMany": ("Page", "media"),
+    "GetMediaList": ("MediaListCollection", "lists", "entries"),
+}
+
+
+def minify(document: str) -> str:
+    """
+    Function that strips the comments and every whitespace and comma a
+    graphQL document doesn't need to be parsed
+
+    @type document: str
+    @param document: graphQL document without string literals
+    @rtype: str
+    @returns: the equivalent minified document
+    """
+
+    document = COMMENT.sub("", document)
+    document = WORD_SEPARATOR.sub(" ", document)
+    return SEPARATOR.sub("", document)
+
+
+def prune(document: str, variables: dict) -> str:
+    """
+    Function that removes the declarations of the variables left unset
+    from a minified document, along with the arguments they are passed to.
+    An unset variable without a default value leaves its argument unset,
+    so the pruned document asks for the same thing in fewer bytes
+
+    @type document: str
+    @type variables: dict
+    @param document: graphQL document without string literals, whose
+    variables are only used as whole argument values
+    @param variables: variables sent with the document
+    @rtype: str
+    @returns: the pruned document, memoized by the names of the variables
+    """
+
+    return _prune(document, frozenset(variables))
+
+
+@lru_cache(maxsize=256)
+def _prune(document: str, names: frozenset[str]) -> str:
+    """
+    Private helper memoizing prune() by the set of variable names
+    """
+
+    document = minify(document)
+    declarations = DECLARATIONS.match(document)
+    if declarations is None:
+        return document
+
+    unset = [
+        name
+        for name, _, default in DECLARATION.findall(declarations.group(1))
+        if name not in names and not default
+    ]
+    if not unset:
+        return document
+
+    names_pattern = "|".join(unset)
+    document = re.sub(rf"\$(?:{names_pattern}):[^$=)]+", "", document)
+    document = re.sub(rf"\w+:\$(?:{names_pattern})(?!\w)", "", document)
+    return EMPTY_ARGUMENTS.sub("", minify(document))
+
+
+def build_query(
+    document: str, variables: dict, fields: frozenset[str] | None = None
+) -> str:
+    """
+    Function that builds the minimal document of a request from one of the
+    shipped documents: the variables left unset are pruned, and the objects
+    the operation returns only select the given fields. Documents are
+    memoized by the names of the variables and the fields, so a request
+    always gets the same document, and the same cache key
+
+    @type document: str
+    @type variables: dict
+    @type fields: frozenset[str] | None
+    @param document: graphQL document whose operation is in SELECTIONS if
+    fields are given
+    @param variables: variables sent with the document
+    @param fields: fields of the returned objects to select, with their
+    subselections kept as written, or None to keep every field
+    @rtype: str
+    @returns: the minimal document
+    """
+
+    return _build_query(document, frozenset(variables), fields)
+
+
+@lru_cache(maxsize=256)
+def _build_query(
+    document: str, names: frozenset[str], fields: frozenset[str] | None
+) -> str:
+    """
+    Private helper memoizing build_query() by the set of variable names
+    """
+
+    document = _prune(document, names)
+    if fields is None:
+        return document
+
+    start, end = _selection(document)
+    selected = [
+        document[item_start:item_end]
+        for field, item_start, _, item_end in _fields(document, start, end)
+        if field in fields
+    ]
+    return document[: start + 1] + minify(" ".join(selected)) + document[end:]
+
+
+def _selection(document: str) -> tuple[int, int]:
+    """
+    Private helper that finds the selection set of the objects the
+    operation of a minified document returns, see SELECTIONS
+
+    @rtype: tuple[int, int]
+    @returns: positions of the braces opening and closing the selection set
+    """
+
+    operation = operation_name(document)
+    if operation not in SELECTIONS:
+        raise ValueError(f"{operation} has no known selection")
+
+    start = document.index("{")
+    end = _closing(document, start)
+    for name in SELECTIONS[operation]:
+        start = next(
+            selection
+            for field, _, selection, _ in _fields(document, start, end)
+            if field == name
+        )
+        end = _closing(document, start)
+
+    return start, end
+
+
+def _select_as(document: str, source: str) -> str:
+    """
+    Private helper that replaces the selection set of the objects a
+    document returns with the one of another document returning the same
+    objects, so both select the same fields and share their cache entries
+    """
+
+    start, end = _selection(document)
+    source_start, source_end = _selection(source)
+    return (
+        document[:start] + source[source_start : source_end + 1] + document[end + 1 :]
+    )
+
+
+def _fields(document: str, start: int, end: int) -> Iterator[tuple[str, int, int, int]]:
+    """
+    Private helper that walks the fields of the selection set between the
+    braces at start and end of a minified document
+
+    @rtype: Iterator[tuple[str, int, int, int]]
+    @returns: iterator of (field name, start of the field, start of its
+    selection set or -1, end of the field)
+    """
+
+    position = start + 1
+    while position < end:
+        name = NAME.match(document, position)
+        if name is None:
+            raise ValueError(f"unexpected character at {position} of the document")
+
+        item_start = position
+        field = name.group()
+        position = name.end()
+
+        # an alias is followed by the name of the field
+        if document.startswith(":", position):
+            name = NAME.match(document, position + 1)
+            if name is None:
+                raise ValueError(f"alias without a field at {position}")
+            field = name.group()
+            position = name.end()
+
+        if document.startswith("(", position):
+            position = _closing(document, position) + 1
+
+        selection = -1
+        if document.startswith("{", position):
+            selection = position
+            position = _closing(document, position) + 1
+
+        yield (field, item_start, selection, position)
+
+        if document.startswith(" ", position):
+            position += 1
+
+
+def _closing(document: str, start: int) -> int:
+    """
+    Private helper that finds the bracket closing the one at start
+    """
+
+    opening = document[start]
+    closing = ")" if opening == "(" else "}"
+    depth = 0
+
+    for position in range(start, len(document)):
+        if document[position] == opening:
+            depth += 1
+        elif document[position] == closing:
+            depth -= 1
+            if depth == 0:
+                return position
+
+    raise ValueError(f"unbalanced {opening} at {start} of the document")
+
 
 def _load(name: str) -> str:
-    return (Path(__file__).parent / "queries" / name).read_text()
+    return minify((Path(__file__).parent / "queries" / name).read_text())
 
 
 get_user = _load("get_user.graphql")
@@ -10,3 +243,8 @@ get_media = _load("get_media.graphql")
 get_expanded_media_info = _load("get_expanded_media_info.graphql")
 update_entry = _load("update_entry.graphql")
 get_media_list = _load("get_media_list.graphql")
+get_list_entry = _load("get_list_entry.graphql")
+# media fetched in bulk are cached as if fetched by GetExpandedMediaInfo
+get_media_info_many = _select_as(
+    _load("get_media_info_many.graphql"), get_expanded_media_info
+)
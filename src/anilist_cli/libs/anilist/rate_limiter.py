@@ -0,0 +1,196 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+from enum import Enum
+
+
+class RequestPriority(Enum):
+    INTERACTIVE = 1
+    PREFETCH = 2
+
+
+def parse_retry_after(value: str) -> float | None:
+    """
+    Function that parses a Retry-After header, given either in seconds or
+    as an HTTP date
+
+    @type value: str
+    @param value: value of the header
+    @rtype: float | None
+    @returns: seconds to wait, or None if the value can't be parsed
+    """
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RateLimiter:
+    """
+    Token bucket pacing requests to the AniList API. Waiting requests are
+    granted in priority order, and the bucket follows the rate limit
+    headers returned by the API
+
+    Attributes:
+    limit: int number of requests allowed per period
+    period: float length of the rate limit window in seconds
+    burst: int maximum number of tokens the bucket holds
+    backoff_base: float base delay in seconds of the retry backoff
+    backoff_cap: float maximum delay in seconds of the retry backoff
+    _tokens: float tokens currently available
+    _updated: float monotonic time of the last refill
+    _blocked_until: float monotonic time before which nothing is granted
+    _waiters: heap of (priority, sequence number, future) waiting for a token
+    _dispatcher: asyncio.Task granting tokens to waiters
+    """
+
+    def __init__(
+        self,
+        limit: int = 90,
+        period: float = 60.0,
+        burst: int = 10,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+    ) -> None:
+        """
+        Initialize a full RateLimiter
+
+        @type limit: int
+        @type period: float
+        @type burst: int
+        @type backoff_base: float
+        @type backoff_cap: float
+        @param limit: number of requests allowed per period
+        @param period: length of the rate limit window in seconds
+        @param burst: maximum number of requests sent back to back
+        @param backoff_base: base delay in seconds of the retry backoff
+        @param backoff_cap: maximum delay in seconds of the retry backoff
+        """
+
+        self.limit = limit
+        self.period = period
+        self.burst = burst
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._tokens: float = burst
+        self._updated: float = time.monotonic()
+        self._blocked_until: float = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+
+    async def acquire(
+        self, priority: RequestPriority = RequestPriority.INTERACTIVE
+    ) -> None:
+        """
+        Wait until a request may be sent. Requests with a higher priority
+        are granted first, requests with the same priority in arrival order
+
+        @type priority: RequestPriority
+        @param priority: priority of the request
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority.value, next(self._sequence), future))
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # a token granted to a cancelled request goes back to the bucket
+            if future.done() and not future.cancelled():
+                self._tokens = min(self.burst, self._tokens + 1)
+            raise
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """
+        Synchronize the bucket with the rate limit headers of a response
+
+        @type headers: Mapping[str, str]
+        @param headers: response headers
+        """
+
+        if "X-RateLimit-Limit" in headers:
+            self.limit = int(headers["X-RateLimit-Limit"])
+
+        if "X-RateLimit-Remaining" in headers:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            self._refill()
+            self._tokens = min(self._tokens, remaining)
+
+            if remaining <= 0 and "X-RateLimit-Reset" in headers:
+                self.pause(int(headers["X-RateLimit-Reset"]) - time.time())
+
+        retry_after = parse_retry_after(headers.get("Retry-After", ""))
+        if retry_after is not None:
+            self.pause(retry_after)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop granting requests for the given number of seconds
+
+        @type seconds: float
+        @param seconds: length of the pause
+        """
+
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Delay before retrying a failed request, exponential in the attempt
+        number with full jitter
+
+        @type attempt: int
+        @param attempt: number of retries already made
+        @rtype: float
+        @returns: delay in seconds
+        """
+
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+
+    def _refill(self) -> None:
+        """
+        Private helper that adds the tokens earned since the last refill
+        """
+
+        now = time.monotonic()
+        rate = self.limit / self.period
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    async def _dispatch(self) -> None:
+        """
+        Private task granting tokens to waiting requests until none are left
+        """
+
+        while self._waiters:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) * self.period / self.limit)
+                continue
+
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # the waiting request was cancelled
+                continue
+
+            self._tokens -= 1
+            future.set_result(None)
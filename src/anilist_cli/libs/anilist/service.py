@@ -1,9 +1,19 @@
+import asyncio
+from collections.abc import AsyncIterator
+
 from .adapter import AnilistAdapter
 from .models.complete_document import CompleteDocument
-from .models.enums import MediaListStatus, MediaSort, MediaStatus, MediaType
+from .models.enums import (
+    FieldProfile,
+    MediaListStatus,
+    MediaSort,
+    MediaStatus,
+    MediaType,
+)
 from .models.filter import MediaFilter, PageFilter
 from .models.list_entry_changes import ListEntryChanges
 from .models.media_preview import MediaPreview
+from .outbox import ReplayResult
 
 
 class AnilistService:
@@ -23,26 +33,62 @@ class AnilistService:
         self,
         filters: MediaFilter,
         page_filter: PageFilter = PageFilter(perPage=20),
+        batch: bool = False,
+        profile: FieldProfile = FieldProfile.PREVIEW,
     ) -> tuple:
-        return await self._adapter.search(filters, page_filter)
+        return await self._adapter.search(filters, page_filter, batch, profile=profile)
+
+    def search_iter(
+        self,
+        filters: MediaFilter,
+        page_filter: PageFilter = PageFilter(),
+        max_items: int | None = None,
+    ) -> AsyncIterator[MediaPreview]:
+        return self._adapter.search_iter(filters, page_filter, max_items)
 
-    async def get_media_info(self, id: int) -> CompleteDocument | None:
-        return await self._adapter.get_media_info(id)
+    def search_as_you_type(
+        self, filters: MediaFilter, page_filter: PageFilter = PageFilter(perPage=20)
+    ) -> AsyncIterator[list[MediaPreview]]:
+        return self._adapter.search_as_you_type(filters, page_filter)
+
+    async def get_media_info(
+        self, id: int, profile: FieldProfile = FieldProfile.FULL
+    ) -> CompleteDocument | None:
+        return await self._adapter.get_media_info(id, profile)
+
+    async def get_media_info_many(self, ids: list[int]) -> dict[int, CompleteDocument]:
+        return await self._adapter.get_media_info_many(ids)
 
     async def get_media_list(
         self,
         user_name: str,
         media_type: MediaType,
         media_list_status: list[MediaListStatus],
+        profile: FieldProfile = FieldProfile.FULL,
     ) -> list[tuple]:
         return await self._adapter.get_media_list(
-            user_name, media_type, media_list_status
+            user_name, media_type, media_list_status, profile
+        )
+
+    def get_media_list_chunks(
+        self,
+        user_name: str,
+        media_type: MediaType,
+        media_list_status: list[MediaListStatus],
+        per_chunk: int = 500,
+        profile: FieldProfile = FieldProfile.FULL,
+    ) -> AsyncIterator[tuple]:
+        return self._adapter.get_media_list_chunks(
+            user_name, media_type, media_list_status, per_chunk, profile
         )
 
     async def update_list_entry(
-        self, media_id: int, changes: ListEntryChanges
+        self, media_id: int, changes: ListEntryChanges, updated_at: int | None = None
     ) -> dict | None:
-        return await self._adapter.update_list_entry(media_id, changes)
+        return await self._adapter.update_list_entry(media_id, changes, updated_at)
+
+    async def flush_outbox(self) -> list[tuple[int, ReplayResult]]:
+        return await self._adapter.flush_outbox()
 
     # --- presets ---
 
@@ -51,14 +97,14 @@ class AnilistService:
         media_filters = MediaFilter()
         media_filters["media_type"] = media_type
         media_filters["sort_by"] = [MediaSort.TRENDING_DESC]
-        return (await self._adapter.search(media_filters))[0]
+        return (await self._adapter.search(media_filters, batch=True))[0]
 
     async def get_all_time_media(self, media_type: MediaType) -> list[MediaPreview]:
         """Gets top 50 all-time popular media."""
         media_filters = MediaFilter()
         media_filters["media_type"] = media_type
         media_filters["sort_by"] = [MediaSort.POPULARITY_DESC]
-        return (await self._adapter.search(media_filters))[0]
+        return (await self._adapter.search(media_filters, batch=True))[0]
 
     async def get_seasonal_media(self, media_type: MediaType) -> list[MediaPreview]:
         """Gets top 50 currently releasing media."""
@@ -66,7 +112,7 @@ class AnilistService:
         media_filters["media_type"] = media_type
         media_filters["sort_by"] = [MediaSort.TRENDING_DESC]
         media_filters["media_status"] = MediaStatus.RELEASING
-        return (await self._adapter.search(media_filters))[0]
+        return (await self._adapter.search(media_filters, batch=True))[0]
 
     async def get_upcoming_media(self, media_type: MediaType) -> list[MediaPreview]:
         """Gets top 50 not yet released media."""
@@ -74,4 +120,21 @@ class AnilistService:
         media_filters["media_type"] = media_type
         media_filters["sort_by"] = [MediaSort.POPULARITY_DESC]
         media_filters["media_status"] = MediaStatus.NOT_YET_RELEASED
-        return (await self._adapter.search(media_filters))[0]
+        return (await self._adapter.search(media_filters, batch=True))[0]
+
+    async def get_home_media(
+        self, media_type: MediaType
+    ) -> dict[str, list[MediaPreview]]:
+        """Gets every preset at once, sent to AniList as one batched request."""
+        trending, all_time, seasonal, upcoming = await asyncio.gather(
+            self.get_trending_media(media_type),
+            self.get_all_time_media(media_type),
+            self.get_seasonal_media(media_type),
+            self.get_upcoming_media(media_type),
+        )
+        return {
+            "trending": trending,
+            "all_time": all_time,
+            "seasonal": seasonal,
+            "upcoming": upcoming,
+        }
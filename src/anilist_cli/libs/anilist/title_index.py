@@ -0,0 +1,204 @@
+import json
+import logging
+import re
+import sqlite3
+from collections.abc import Iterator
+from typing import Any
+
+from ..cache.db import SQLiteWrapper
+from .cache_tags import walk_media
+
+# the media id is the rowid, prefix indexes make search-as-you-type queries
+# of two or three characters cheap
+CREATE_TITLES_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS media_titles USING fts5(
+  romaji, english, type UNINDEXED, media UNINDEXED,
+  tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+)
+"""
+
+SELECT_MEDIA = (
+    "SELECT rowid, media FROM media_titles "
+    "WHERE rowid IN (SELECT value FROM json_each(?))"
+)
+
+REPLACE_MEDIA = """
+INSERT OR REPLACE INTO media_titles (rowid, romaji, english, type, media)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+SEARCH_TITLES = """
+SELECT media FROM media_titles
+WHERE media_titles MATCH ? AND (? IS NULL OR type = ?)
+ORDER BY rank LIMIT ?
+"""
+
+# fields of a media object kept to build a MediaPreview from, the viewer's
+# list entry is left out since list mutations don't update the index
+PREVIEW_FIELDS = (
+    "id",
+    "title",
+    "status",
+    "popularity",
+    "averageScore",
+    "chapters",
+    "episodes",
+    "duration",
+    "season",
+    "seasonYear",
+    "volumes",
+    "format",
+    "type",
+)
+
+WORD = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+
+def media_objects(data: Any) -> Iterator[dict]:
+    """
+    Function that finds every media object of a graphQL response, see
+    walk_media(). The media of list entries is returned with the id of the
+    entry's mediaId
+
+    @type data: Any
+    @param data: decoded graphQL response
+    @rtype: Iterator[dict]
+    @returns: iterator over the preview fields of each media object
+    """
+
+    for media_id, node in walk_media(data):
+        if "mediaId" in node:
+            if not isinstance(node.get("media"), dict):
+                continue
+            node = node["media"]
+        yield {"id": media_id} | {
+            key: value for key, value in node.items() if key in PREVIEW_FIELDS
+        }
+
+
+def match_expression(text: str) -> str | None:
+    """
+    Function that turns typed text into an FTS5 query matching titles
+    containing every word, the last ones possibly unfinished
+
+    @type text: str
+    @param text: search text
+    @rtype: str | None
+    @returns: the query, or None if the text has no words
+    """
+
+    words = WORD.findall(text.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class TitleIndex:
+    """
+    Full-text index over the romaji and English titles of every media seen
+    in an API response, answering title searches without the network. It
+    is kept in its own table of the cache db and must only be used from the
+    cache thread
+
+    Attributes:
+    db: SQLiteWrapper connection to local db
+    available: bool whether SQLite was built with FTS5, without which the
+    index stays empty and searches find nothing
+    """
+
+    def __init__(self, db_path: str) -> None:
+        """
+        Initialize the TitleIndex and create its table, if SQLite supports
+        FTS5
+
+        @type db_path: str
+        @param db_path: path to db disk file, which may be shared with the
+        response cache
+        """
+
+        self.db = SQLiteWrapper(db_path)
+        self.available = True
+
+        try:
+            with self.db as conn:
+                conn.execute(CREATE_TITLES_TABLE)
+        except sqlite3.OperationalError as error:
+            logger.warning("local title search unavailable: %s", error)
+            self.available = False
+
+    def add_response(self, data: Any) -> None:
+        """
+        Index the media of a graphQL response. Fields missing from a media
+        object are kept from earlier responses
+
+        @type data: Any
+        @param data: decoded graphQL response
+        """
+
+        if not self.available:
+            return
+
+        found: dict[int, dict] = {}
+        for media in media_objects(data):
+            if isinstance(media.get("id"), int) and isinstance(
+                media.get("title"), dict
+            ):
+                found[media["id"]] = found.get(media["id"], {}) | media
+
+        if not found:
+            return
+
+        with self.db as conn:
+            rows = conn.execute(SELECT_MEDIA, (json.dumps(list(found)),)).fetchall()
+            for row in rows:
+                found[row["rowid"]] = json.loads(row["media"]) | found[row["rowid"]]
+
+            conn.executemany(
+                REPLACE_MEDIA,
+                [
+                    (
+                        media_id,
+                        media["title"].get("romaji"),
+                        media["title"].get("english"),
+                        media.get("type"),
+                        json.dumps(media),
+                    )
+                    for media_id, media in found.items()
+                ],
+            )
+
+    def search(
+        self, text: str, media_type: str | None = None, limit: int = 20
+    ) -> list[dict]:
+        """
+        Get the indexed media whose titles match the text, best matches first
+
+        @type text: str
+        @type media_type: str | None
+        @type limit: int
+        @param text: search text, matched as word prefixes
+        @param media_type: ANIME or MANGA, any type if None
+        @param limit: maximum number of media returned
+        @rtype: list[dict]
+        @returns: list of media objects with the preview fields known
+        """
+
+        expression = match_expression(text)
+        if expression is None or not self.available:
+            return []
+
+        with self.db as conn:
+            rows = conn.execute(
+                SEARCH_TITLES, (expression, media_type, media_type, limit)
+            ).fetchall()
+
+        return [json.loads(row["media"]) for row in rows]
+
+    def close(self) -> None:
+        """
+        Close the database connections
+        """
+
+        self.db.close()
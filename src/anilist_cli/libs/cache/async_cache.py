@@ -0,0 +1,323 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Coroutine, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any
+
+from .memory_cache import CacheStats
+from .session_cache import SessionCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSessionCache:
+    """
+    Asynchronous front of a SessionCache for use from an event loop. The
+    memory tier is only used on the loop thread, while sqlite I/O and JSON
+    encoding and decoding run on a single dedicated thread. Writes are
+    buffered and flushed in batches, one transaction per batch
+
+    Attributes:
+    cache: SessionCache wrapped cache
+    flush_delay: float seconds a write is buffered before being flushed
+    flush_size: int number of buffered writes which flushes immediately
+    _executor: ThreadPoolExecutor running the sqlite work in order
+    _pending: dict of buffered ((query, variables, user, data, tags, ttl),
+    expiry_time) by key
+    _timer: asyncio.TimerHandle flushing the buffered writes
+    _tasks: set of flushes currently running
+    _generation: int bumped by every invalidation, so reads and writes
+    started before it don't refill the memory tier with evicted data
+    """
+
+    def __init__(
+        self, cache: SessionCache, flush_delay: float = 0.05, flush_size: int = 32
+    ) -> None:
+        """
+        Initialize the AsyncSessionCache around a SessionCache
+
+        @type cache: SessionCache
+        @type flush_delay: float
+        @type flush_size: int
+        @param cache: cache to wrap, which must not be used directly anymore
+        @param flush_delay: seconds a write is buffered before being flushed
+        @param flush_size: number of buffered writes which flushes immediately
+        """
+
+        self.cache = cache
+        self.flush_delay = flush_delay
+        self.flush_size = flush_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache")
+        self._pending: dict[
+            int,
+            tuple[tuple[str, dict, str | None, Any, frozenset[str], int | None], int],
+        ] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._generation = 0
+
+    @property
+    def stats(self) -> dict[str, CacheStats]:
+        """
+        Hit and miss counters keyed by tier name
+        """
+        return self.cache.stats
+
+    async def run[T](self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Run a function on the cache thread after the sqlite work queued
+        before it, e.g. to use other stores kept in the cache db
+
+        @type function: Callable[..., T]
+        @type args: Any
+        @param function: function to run
+        @param args: arguments of the function
+        @rtype: T
+        @returns: return value of the function
+        """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args))
+
+    def run_later(self, function: Callable[..., Any], *args: Any) -> None:
+        """
+        Run a function on the cache thread in the background, see run().
+        Errors are logged, and close() waits for the function to finish
+
+        @type function: Callable[..., Any]
+        @type args: Any
+        @param function: function to run
+        @param args: arguments of the function
+        """
+
+        self._executor.submit(function, *args).add_done_callback(self._run_done)
+
+    def _run_done(self, future: Future) -> None:
+        """
+        Private helper that logs a failed background function
+        """
+
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("cache thread task failed", exc_info=future.exception())
+
+    async def get(self, query: str, variables: dict, user: str | None) -> Any | None:
+        """
+        Get the data from the cache for the given query, see SessionCache.get
+
+        @type query: str
+        @type variables: dict
+        @type user: str | None
+        @param query: fetch request graphQL query
+        @param variables: dictionary containing graphQL variables
+        @param user: username of logged in user (or None)
+        @rtype: Any | None
+        @returns: the decoded cached data if it exists and is fresh, otherwise
+        None. The returned object is shared between callers and must not be
+        mutated
+        """
+
+        result = await self.lookup(query, variables, user)
+        return result[0] if result is not None else None
+
+    async def lookup(
+        self, query: str, variables: dict, user: str | None, grace: int = 0
+    ) -> tuple[Any, bool] | None:
+        """
+        Get the data from the cache for the given query, optionally accepting
+        recently expired data
+
+        @type query: str
+        @type variables: dict
+        @type user: str | None
+        @type grace: int
+        @param query: fetch request graphQL query
+        @param variables: dictionary containing graphQL variables
+        @param user: username of logged in user (or None)
+        @param grace: milliseconds expired data may still be returned, at
+        most the grace of the wrapped cache
+        @rtype: tuple[Any, bool] | None
+        @returns: tuple of (decoded cached data, whether it is expired), or
+        None on a miss. The returned object is shared between callers and
+        must not be mutated
+        """
+
+        key = cache_key(query, variables, user)
+        grace = min(grace, self.cache.grace)
+
+        now = round(time.time() * 1000)
+
+        # buffered writes are newer than anything in the memory tier
+        if key in self._pending:
+            write, expiry_time = self._pending[key]
+            if now <= expiry_time + grace:
+                return (write[3], now > expiry_time)
+
+        result = self.cache.memory.lookup(key, grace)
+        if result is not None:
+            self.cache.record_access(key)
+            return result
+
+        generation = self._generation
+        entry = await self.run(self.cache.disk_get, key, grace)
+        if entry is None:
+            return None
+
+        if generation == self._generation:
+            self.cache.memory.set(*entry)
+        return (entry.data, now > entry.expiry_time)
+
+    def set(
+        self,
+        query: str,
+        variables: dict,
+        user: str | None,
+        data: Any,
+        tags: Iterable[str] = (),
+        ttl: int | None = None,
+    ) -> None:
+        """
+        Buffer the data for the given query, to be written with the next
+        batch. Must be called from the event loop
+
+        @type query: str
+        @type variables: dict
+        @type user: str | None
+        @type data: Any
+        @type tags: Iterable[str]
+        @type ttl: int | None
+        @param query: fetch request graphQL query
+        @param variables: dictionary containing graphQL variables
+        @param user: username of logged in user (or None)
+        @param data: JSON-serializable data to be cached, which must not be
+        mutated afterwards since the cache keeps a reference to it
+        @param tags: tags naming what the data depends on
+        @param ttl: time to live of the entry in milliseconds, defaulting to
+        the time to live of the wrapped cache
+        """
+
+        key = cache_key(query, variables, user)
+        expiry_time = round(time.time() * 1000) + (
+            ttl if ttl is not None else self.cache.time_to_live
+        )
+        self._pending[key] = (
+            (query, variables, user, data, frozenset(tags), ttl),
+            expiry_time,
+        )
+
+        if len(self._pending) >= self.flush_size:
+            self._spawn(self.flush())
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_delay, lambda: self._spawn(self.flush())
+            )
+
+    def _spawn(self, coroutine: Coroutine[Any, Any, None]) -> None:
+        """
+        Private helper that runs a flush in the background
+        """
+
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        """
+        Private helper that logs a failed background flush
+        """
+
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("cache flush failed", exc_info=task.exception())
+
+    async def flush(self) -> None:
+        """
+        Write every buffered write to the sqlite tier in one transaction
+        """
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        generation = self._generation
+        written = await self.run(
+            self.cache.disk_set, [write for write, _ in batch.values()]
+        )
+
+        if generation == self._generation:
+            for entry in written:
+                self.cache.memory.set(*entry)
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        """
+        Delete every entry tagged with at least one of the given tags from
+        both tiers and the write buffer
+
+        @type tags: Iterable[str]
+        @param tags: tags of the entries to delete
+        """
+
+        tags = frozenset(tags)
+        self._generation += 1
+        self.cache.memory.invalidate(tags)
+        self._pending = {
+            key: pending
+            for key, pending in self._pending.items()
+            if not pending[0][4] & tags
+        }
+
+        await self.run(self.cache.disk_invalidate, tags)
+
+    async def patch(
+        self, tags: Iterable[str], patcher: Callable[[dict, Any], Any | None]
+    ) -> None:
+        """
+        Rewrite every entry within the grace tagged with at least one of the
+        given tags, see SessionCache.patch
+
+        @type tags: Iterable[str]
+        @type patcher: Callable[[dict, Any], Any | None]
+        @param tags: tags of the entries to patch
+        @param patcher: function patching the data of an entry
+        """
+
+        tags = frozenset(tags)
+        self._generation += 1
+        self.cache.memory.invalidate(tags)
+        await self.flush()
+
+        generation = self._generation
+        patched = await self.run(self.cache.disk_patch, tags, patcher)
+
+        if generation == self._generation:
+            for key, entry in patched:
+                self.cache.memory.discard(key)
+                if entry is not None:
+                    self.cache.memory.set(*entry)
+
+    async def clear(self) -> None:
+        """
+        Delete every entry from both tiers and the write buffer
+        """
+
+        self._generation += 1
+        self._pending = {}
+        self.cache.memory.clear()
+        await self.run(self.cache.disk_clear)
+
+    async def close(self) -> None:
+        """
+        Flush the buffered writes, then close the wrapped cache and its thread
+        """
+
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        await self.run(self.cache.close)
+        self._executor.shutdown()
@@ -0,0 +1,63 @@
+import json
+import lzma
+import zlib
+from enum import Enum
+from typing import Any
+
+# encoder and decoder are built once instead of on every dumps/loads call
+_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+_DECODER = json.JSONDecoder()
+
+
+class Compression(Enum):
+    NONE = 0
+    ZLIB = 1
+    LZMA = 2
+
+
+def encode(
+    data: Any, compression: Compression, threshold: int
+) -> tuple[bytes, Compression, int]:
+    """
+    Function that serializes data to compact JSON and compresses it if the
+    JSON is at least threshold bytes long
+
+    @type data: Any
+    @type compression: Compression
+    @type threshold: int
+    @param data: JSON-serializable data
+    @param compression: algorithm used for data above the threshold
+    @param threshold: minimum size in bytes of the JSON to compress
+    @rtype: tuple[bytes, Compression, int]
+    @returns: tuple of (encoded bytes, algorithm applied, size of the JSON)
+    """
+
+    raw = _ENCODER.encode(data).encode()
+
+    if compression is Compression.NONE or len(raw) < threshold:
+        return (raw, Compression.NONE, len(raw))
+
+    if compression is Compression.ZLIB:
+        return (zlib.compress(raw, 3), compression, len(raw))
+
+    return (lzma.compress(raw, preset=1), compression, len(raw))
+
+
+def decode(blob: bytes, compression: Compression) -> Any:
+    """
+    Function that decodes data encoded by encode()
+
+    @type blob: bytes
+    @type compression: Compression
+    @param blob: encoded data
+    @param compression: algorithm the data was compressed with
+    @rtype: Any
+    @returns: the decoded data
+    """
+
+    if compression is Compression.ZLIB:
+        blob = zlib.decompress(blob)
+    elif compression is Compression.LZMA:
+        blob = lzma.decompress(blob)
+
+    return _DECODER.decode(blob.decode())
@@ -1,4 +1,5 @@
 import sqlite3
+import threading
 
 from pydantic import validate_call
 
@@ -6,10 +7,16 @@ from pydantic import validate_call
 class SQLiteWrapper:
     """
     Wrapper for SQLite3 implementing the context manager pattern
-    to manage opening and closing connections
+    to manage transactions on long-lived connections. Each thread gets
+    its own connection which is opened on first use and kept until
+    close() is called, so sqlite3's prepared statement cache is reused
+    across calls
 
     Attributes:
     db_path: str path to db disk file
+    _local: threading.local holding the connection of the current thread
+    _connections: list of every connection opened by this wrapper
+    _lock: threading.Lock guarding _connections
     """
 
     @validate_call
@@ -22,26 +29,58 @@ class SQLiteWrapper:
         @param db_path: path to db disk file
         """
         self.db_path = db_path
-        self.connection: sqlite3.Connection | None = None
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.close()
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL;")
 
-    def __enter__(self):
+    @property
+    def connection(self) -> sqlite3.Connection:
         """
-        Open the connection to the db
+        The connection owned by the calling thread, opened on first access
+
+        @rtype: sqlite3.Connection
+        @returns: connection to the db for the current thread
         """
-        self.connection = sqlite3.connect(self.db_path)
-        self.connection.row_factory = sqlite3.Row
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            # connections never leave their thread, check_same_thread is only
+            # disabled so close() can release them from any thread
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute("PRAGMA foreign_keys=ON;")
+            self._local.connection = conn
+            with self._lock:
+                self._connections.append(conn)
+
+        return conn
 
+    def __enter__(self):
+        """
+        Get the connection of the current thread
+        """
         return self.connection
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """
-        Close the connection to the db if it exists
+        Commit the pending transaction, or roll it back if an exception
+        was raised. The connection itself stays open
         """
-        if self.connection:
-            if exc_type is None:
-                self.connection.commit()
-            self.connection.close()
-            self.connection = None
+        conn = self.connection
+        if exc_type is None:
+            conn.commit()
+        else:
+            conn.rollback()
+
+    def close(self) -> None:
+        """
+        Close every connection opened by this wrapper
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+
+        for conn in connections:
+            conn.close()
+
+        self._local = threading.local()
@@ -0,0 +1,56 @@
+import logging
+import threading
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CacheJanitor:
+    """
+    Daemon thread running a cache sweep at a fixed interval, so expiry and
+    size eviction never run on the read path or the event loop
+
+    Attributes:
+    interval: float seconds between two sweeps
+    _sweep: function sweeping the cache
+    _stopped: threading.Event set once the janitor is stopped
+    _thread: threading.Thread running the sweeps
+    """
+
+    def __init__(self, sweep: Callable[[], None], interval: float = 60.0) -> None:
+        """
+        Initialize and start the CacheJanitor
+
+        @type sweep: Callable[[], None]
+        @type interval: float
+        @param sweep: function sweeping the cache
+        @param interval: seconds between two sweeps
+        """
+
+        self.interval = interval
+        self._sweep = sweep
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="cache-janitor", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        """
+        Private loop sweeping the cache until the janitor is stopped
+        """
+
+        while not self._stopped.wait(self.interval):
+            try:
+                self._sweep()
+            except Exception:
+                # a failed sweep is retried on the next interval
+                logger.exception("cache sweep failed")
+
+    def stop(self) -> None:
+        """
+        Stop the janitor and wait for a sweep in progress to finish
+        """
+
+        self._stopped.set()
+        self._thread.join()
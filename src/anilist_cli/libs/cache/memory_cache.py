@@ -0,0 +1,198 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+
+class CacheStats:
+    """
+    Hit and miss counters of a single cache tier
+
+    Attributes:
+    hits: int number of lookups answered by the tier
+    misses: int number of lookups the tier could not answer
+    """
+
+    def __init__(self) -> None:
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Fraction of lookups that were hits, 0 if there were no lookups
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self) -> str:
+        return f"CacheStats(hits={self.hits}, misses={self.misses})"
+
+
+class MemoryCache:
+    """
+    Bounded in-process LRU cache holding already decoded responses.
+    Entries are evicted least recently used first once either the entry
+    count or the byte budget is exceeded
+
+    Attributes:
+    max_entries: int maximum number of entries held
+    max_bytes: int maximum total size of the entries held
+    size: int current total size of the entries held
+    stats: CacheStats hit and miss counters
+    _entries: OrderedDict mapping keys to (data, size, expiry_time, tags)
+    _tagged: dict mapping each tag to the keys of the entries carrying it
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 32 * 1024**2) -> None:
+        """
+        Initialize an empty MemoryCache
+
+        @type max_entries: int
+        @type max_bytes: int
+        @param max_entries: maximum number of entries held
+        @param max_bytes: maximum total size in bytes of the entries held,
+        as reported by the size passed to set()
+        """
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, tuple[Any, int, int, frozenset[str]]] = (
+            OrderedDict()
+        )
+        self._tagged: dict[str, set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Get the data stored under key and mark it as most recently used.
+        Expired entries are dropped and count as a miss
+
+        @type key: Hashable
+        @param key: cache key
+        @rtype: Any | None
+        @returns: the stored data, or None if it is missing or expired
+        """
+
+        result = self.lookup(key)
+        return result[0] if result is not None else None
+
+    def lookup(self, key: Hashable, grace: int = 0) -> tuple[Any, bool] | None:
+        """
+        Get the data stored under key and mark it as most recently used,
+        accepting entries which expired less than grace milliseconds ago.
+        Entries expired for longer are dropped and count as a miss
+
+        @type key: Hashable
+        @type grace: int
+        @param key: cache key
+        @param grace: milliseconds an expired entry may still be returned
+        @rtype: tuple[Any, bool] | None
+        @returns: tuple of (stored data, whether it is expired), or None if
+        it is missing or expired for longer than grace
+        """
+
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            now = round(time.time() * 1000)
+            if now <= entry[2] + grace:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return (entry[0], now > entry[2])
+
+            self.discard(key)
+
+        self.stats.misses += 1
+        return None
+
+    def set(
+        self,
+        key: Hashable,
+        data: Any,
+        size: int,
+        expiry_time: int,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """
+        Store data under key, evicting least recently used entries until
+        the cache fits its budgets again. Data larger than the byte budget
+        is not stored
+
+        @type key: Hashable
+        @type data: Any
+        @type size: int
+        @type expiry_time: int
+        @type tags: Iterable[str]
+        @param key: cache key
+        @param data: data to store, shared with every caller of get()
+        @param size: size of the data in bytes
+        @param expiry_time: epoch time in milliseconds after which the entry
+        is stale
+        @param tags: tags naming what the data depends on, see invalidate()
+        """
+
+        self.discard(key)
+
+        if size > self.max_bytes:
+            return
+
+        tags = frozenset(tags)
+        self._entries[key] = (data, size, expiry_time, tags)
+        self.size += size
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self.discard(next(iter(self._entries)))
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Remove the entry stored under key if there is one
+
+        @type key: Hashable
+        @param key: cache key
+        """
+
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self.size -= entry[1]
+        for tag in entry[3]:
+            keys = self._tagged[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tagged[tag]
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Remove every entry carrying at least one of the given tags
+
+        @type tags: Iterable[str]
+        @param tags: tags of the entries to remove
+        @rtype: int
+        @returns: number of entries removed
+        """
+
+        keys = set()
+        for tag in tags:
+            keys |= self._tagged.get(tag, set())
+
+        for key in keys:
+            self.discard(key)
+
+        return len(keys)
+
+    def clear(self) -> None:
+        """
+        Remove every entry
+        """
+
+        self._entries.clear()
+        self._tagged.clear()
+        self.size = 0
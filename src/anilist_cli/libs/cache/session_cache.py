@@ -1,149 +1,674 @@
+import hashlib
 import json
-import sqlite3
+import threading
 import time
-from typing import Any
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from typing import Any, NamedTuple
 
+from .codec import Compression, decode, encode
 from .db import SQLiteWrapper
+from .janitor import CacheJanitor
+from .memory_cache import CacheStats, MemoryCache
+
+# bumped whenever the tables below change, an outdated cache is dropped
+SCHEMA_VERSION = 4
+
+# statements are kept as module constants so every call passes the identical
+# string and hits the prepared statement cache of the long-lived connection
+# query documents are stored once, keyed by their digest
+CREATE_QUERIES_TABLE = """
+CREATE TABLE IF NOT EXISTS queries (
+  id INTEGER PRIMARY KEY,
+  document TEXT NOT NULL
+)
+"""
+
+# entries are keyed by the digest of (query, variables, user), see cache_key()
+CREATE_CACHE_TABLE = """
+CREATE TABLE IF NOT EXISTS cache (
+  id INTEGER PRIMARY KEY,
+  query_id INTEGER REFERENCES queries (id),
+  variables TEXT,
+  data BLOB,
+  compression INTEGER DEFAULT 0,
+  size INTEGER,
+  expiry_time INTEGER,
+  last_access INTEGER
+)
+"""
+
+CREATE_EXPIRY_INDEX = """
+CREATE INDEX IF NOT EXISTS cache_expiry ON cache (expiry_time)
+"""
+
+CREATE_LAST_ACCESS_INDEX = """
+CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)
+"""
+
+CREATE_TAGS_TABLE = """
+CREATE TABLE IF NOT EXISTS cache_tags (
+  tag TEXT,
+  entry_id INTEGER REFERENCES cache (id) ON DELETE CASCADE,
+  PRIMARY KEY (tag, entry_id)
+) WITHOUT ROWID
+"""
+
+CREATE_TAGS_INDEX = """
+CREATE INDEX IF NOT EXISTS cache_tags_entry ON cache_tags (entry_id)
+"""
+
+SELECT_ENTRY = """
+SELECT
+  data, compression, size, expiry_time,
+  (SELECT json_group_array(tag) FROM cache_tags WHERE entry_id = cache.id) AS tags
+FROM cache WHERE id = ?
+"""
+
+DELETE_EXPIRED = """
+DELETE FROM cache WHERE expiry_time <= ?
+"""
+
+INSERT_QUERY = """
+INSERT OR IGNORE INTO queries (id, document) VALUES (?, ?)
+"""
+
+# only replaces an existing row when it is stale, so no id is returned when
+# a fresh entry already exists
+UPSERT_ENTRY = """
+INSERT INTO cache (
+  id, query_id, variables, data, compression, size, expiry_time, last_access
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+  data = excluded.data,
+  compression = excluded.compression,
+  size = excluded.size,
+  expiry_time = excluded.expiry_time,
+  last_access = excluded.last_access
+WHERE cache.expiry_time < ?
+RETURNING id
+"""
+
+DELETE_TAGS = """
+DELETE FROM cache_tags WHERE entry_id = ?
+"""
+
+INSERT_TAG = """
+INSERT INTO cache_tags (tag, entry_id) VALUES (?, ?)
+"""
+
+DELETE_TAGGED = """
+DELETE FROM cache WHERE id IN (
+  SELECT entry_id FROM cache_tags WHERE tag IN (SELECT value FROM json_each(?))
+)
+"""
+
+SELECT_TAGGED = """
+SELECT
+  id, variables, data, compression, expiry_time,
+  (SELECT json_group_array(tag) FROM cache_tags WHERE entry_id = cache.id) AS tags
+FROM cache WHERE id IN (
+  SELECT entry_id FROM cache_tags WHERE tag IN (SELECT value FROM json_each(?))
+)
+"""
+
+UPDATE_DATA = """
+UPDATE cache SET data = ?, compression = ?, size = ? WHERE id = ?
+"""
+
+DELETE_ENTRY = """
+DELETE FROM cache WHERE id = ?
+"""
+
+DELETE_ALL = """
+DELETE FROM cache
+"""
+
+UPDATE_LAST_ACCESS = """
+UPDATE cache SET last_access = max(last_access, ?) WHERE id = ?
+"""
+
+# keeps the max_rows most recently accessed entries
+DELETE_OVER_ROWS = """
+DELETE FROM cache WHERE id IN (
+  SELECT id FROM cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+)
+"""
+
+# keeps the most recently accessed entries fitting in max_bytes
+DELETE_OVER_BYTES = """
+DELETE FROM cache WHERE id IN (
+  SELECT id FROM (
+    SELECT id, sum(length(data)) OVER (ORDER BY last_access DESC, id) AS total
+    FROM cache
+  )
+  WHERE total > ?
+)
+"""
+
+DELETE_UNUSED_QUERIES = """
+DELETE FROM queries WHERE id NOT IN (SELECT query_id FROM cache)
+"""
+
+
+def canonical_variables(variables: dict) -> str:
+    """
+    Function that serializes graphQL variables independently of key order
+
+    @type variables: dict
+    @param variables: dictionary containing graphQL variables
+    @rtype: str
+    @returns: compact JSON string with sorted keys
+    """
+
+    return json.dumps(variables, sort_keys=True, separators=(",", ":"))
+
+
+def _digest(*parts: str) -> int:
+    """
+    Helper function that hashes strings into a signed 64 bit integer, the
+    range of a sqlite INTEGER PRIMARY KEY
+    """
+
+    # json and user names never contain NUL, so the parts can't run together
+    digest = hashlib.blake2b("\0".join(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, signed=True)
+
+
+@lru_cache(maxsize=64)
+def query_digest(query: str) -> int:
+    """
+    Function that hashes a query document. Documents are module constants,
+    so the digest is memoized instead of rehashing kilobytes on every lookup
+
+    @type query: str
+    @param query: graphQL query document
+    @rtype: int
+    @returns: signed 64 bit digest of the document
+    """
+
+    return _digest(query)
+
+
+def cache_key(query: str, variables: dict, user: str | None) -> int:
+    """
+    Function that builds the key identifying a request in the cache, a
+    digest of the query, the canonical variables and the user. At 64 bits
+    a collision is negligible for the size of a local cache
+
+    @type query: str
+    @type variables: dict
+    @type user: str | None
+    @param query: fetch request graphQL query
+    @param variables: dictionary containing graphQL variables
+    @param user: username of logged in user (or None)
+    @rtype: int
+    @returns: key equal for every request returning the same data
+    """
+
+    return _digest(
+        str(query_digest(query)), canonical_variables(variables), user if user else ""
+    )
+
+
+class CacheEntry(NamedTuple):
+    """
+    Decoded entry as held by the memory tier, in MemoryCache.set() order
+
+    Attributes:
+    key: int cache key of the entry
+    data: Any decoded response
+    size: int size in bytes of the JSON of the response
+    expiry_time: int expiry time in milliseconds since the epoch
+    tags: frozenset[str] tags of the entry
+    """
+
+    key: int
+    data: Any
+    size: int
+    expiry_time: int
+    tags: frozenset[str]
 
 
 class SessionCache:
     """
     A simple session cache that uses sqlite to simulate a caching
-    database
+    database, fronted by an in-memory LRU tier holding decoded responses.
+    Entries are tagged with what they depend on so mutations can evict
+    only the affected entries. Large responses are stored compressed.
+    Expired entries and entries over the size budget are evicted, least
+    recently accessed first, by a background janitor instead of on reads
 
     Attributes:
     db_path: str path to db disk file
     db: SQLiteWrapper connection to local db
     ttl: int time to live for database entry in milliseconds
+    memory: MemoryCache first tier holding decoded responses
+    compression: Compression algorithm of the stored responses
+    compress_threshold: int minimum JSON size in bytes of a compressed response
+    disk_stats: CacheStats hit and miss counters of the sqlite tier
+    grace: int milliseconds expired entries are kept for stale lookups
+    max_rows: int | None maximum number of entries kept on disk
+    max_bytes: int | None maximum total stored size of the entries on disk
+    janitor: CacheJanitor | None thread running sweep() periodically
+    _accessed: dict of the access times not written to disk yet by entry key
+    _accessed_lock: threading.Lock guarding _accessed
     """
 
-    def __init__(self, db_path: str, ttl: int = 60000) -> None:
+    def __init__(
+        self,
+        db_path: str,
+        ttl: int = 60000,
+        memory_entries: int = 512,
+        memory_bytes: int = 32 * 1024**2,
+        compression: Compression = Compression.ZLIB,
+        compress_threshold: int = 4096,
+        max_rows: int | None = 10000,
+        max_bytes: int | None = 256 * 1024**2,
+        sweep_interval: float | None = 60.0,
+        grace: int = 0,
+    ) -> None:
         """
         Initialize the SessionCache object with a database connection
         and create a table to cache results
 
         @type db_path: str
         @type ttl: int
+        @type memory_entries: int
+        @type memory_bytes: int
+        @type compression: Compression
+        @type compress_threshold: int
+        @type max_rows: int | None
+        @type max_bytes: int | None
+        @type sweep_interval: float | None
+        @type grace: int
         @param db_path: path to db disk file
         @param ttl: time to live for database entry in milliseconds,
         defaulting to 1 minute
+        @param memory_entries: maximum number of responses in the memory tier
+        @param memory_bytes: maximum encoded size of the responses in the
+        memory tier
+        @param compression: algorithm used to compress stored responses
+        @param compress_threshold: minimum size in bytes of the JSON of a
+        response for it to be compressed, smaller ones aren't worth it
+        @param max_rows: maximum number of entries kept on disk, unbounded
+        if None
+        @param max_bytes: maximum total stored size in bytes of the entries
+        kept on disk, unbounded if None
+        @param sweep_interval: seconds between two background sweeps, no
+        janitor is started if None
+        @param grace: milliseconds expired entries are kept and may still be
+        returned by lookups accepting stale data, see disk_get()
         """
 
         self.db_path = db_path
         self.db = SQLiteWrapper(self.db_path)
         self.time_to_live = ttl
+        self.memory = MemoryCache(memory_entries, memory_bytes)
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.disk_stats = CacheStats()
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self._accessed: dict[int, int] = {}
+        self._accessed_lock = threading.Lock()
         self._create_cache_table()
+        self.janitor = (
+            CacheJanitor(self.sweep, sweep_interval)
+            if sweep_interval is not None
+            else None
+        )
+
+    @property
+    def stats(self) -> dict[str, CacheStats]:
+        """
+        Hit and miss counters keyed by tier name
+        """
+        return {"memory": self.memory.stats, "disk": self.disk_stats}
 
     def _create_cache_table(self) -> None:
         """
-        Private function to create the cache table if it doesn't exist
+        Private function to create the cache tables if they don't exist,
+        dropping tables left behind by an older schema version
         """
 
         with self.db as conn:
-            cursor = conn.cursor()
-            query = """
-CREATE TABLE IF NOT EXISTS cache (
-  query TEXT,
-  variables TEXT,
-  user TEXT DEFAULT '',
-  data BLOB,
-  expiry_time INTEGER,
-  version INTEGER,
-  PRIMARY KEY (query, variables, user)
-)
-"""
-            cursor.execute(query)
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS cache_tags")
+                conn.execute("DROP TABLE IF EXISTS cache")
+                conn.execute("DROP TABLE IF EXISTS queries")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+            conn.execute(CREATE_QUERIES_TABLE)
+            conn.execute(CREATE_CACHE_TABLE)
+            conn.execute(CREATE_TAGS_TABLE)
+            conn.execute(CREATE_TAGS_INDEX)
+            conn.execute(CREATE_EXPIRY_INDEX)
+            conn.execute(CREATE_LAST_ACCESS_INDEX)
 
-    def get(
-        self, query: str, variables: dict, user: str | None, version: int
-    ) -> sqlite3.Row | None:
+    def get(self, query: str, variables: dict, user: str | None) -> Any | None:
         """
-        Get the data from the cache for the given url and query. If the
-        queried result is expired or has an invalid version number, all
-        invalid database entries are deleted and the function returns None
+        Get the data from the cache for the given url and query. The memory
+        tier is checked first, then the sqlite table. Expired entries miss
+        and are left for sweep() to delete, and the access time of hits is
+        buffered until the next sweep, so reads never write to the database
 
         @type query: str
         @type variables: dict
         @type user: str | None
-        @type version: int
         @param query: fetch request graphQL query
         @param variables: dictionary containing graphQL variables
         @param user: username of logged in user (or None)
-        @param version: number denoting version since last data mutation
-        @rtype: sqlite3.Row | None
-        @returns: the cached row if it exists and is fresh, otherwise None.
-        Side effect: if the matched entry is stale (expired or wrong version),
-        all expired and version-mismatched entries are deleted before returning
-        None. This is intentional lazy eviction — stale data is never returned
-        to the caller.
+        @rtype: Any | None
+        @returns: the decoded cached data if it exists and is fresh, otherwise
+        None. The returned object is shared between callers and must not be
+        mutated
         """
 
-        with self.db as conn:
-            cursor = conn.cursor()
-            sql_query = """
-SELECT query, variables, user, data, expiry_time, version FROM cache
-WHERE query = ? AND variables = ? AND user = ?
-"""
+        key = cache_key(query, variables, user)
 
-            cursor.execute(
-                sql_query, (query, json.dumps(variables), user if user else "")
-            )
+        data = self.memory.get(key)
+        if data is not None:
+            self.record_access(key)
+            return data
 
-            result = cursor.fetchone()
+        entry = self.disk_get(key)
+        if entry is None:
+            return None
 
-            if result:
-                expired = round(time.time() * 1000) > result["expiry_time"]
-                unmatching_version = result["version"] != version
-                if expired or unmatching_version:
-                    delete_query = """
-DELETE FROM cache WHERE expiry_time <= ? OR version != ?
-"""
-                    cursor.execute(delete_query, (round(time.time() * 1000), version))
-                else:
-                    return result
+        self.memory.set(*entry)
+        return entry.data
 
     def set(
-        self, query: str, variables: dict, user: str | None, data: Any, version: int
+        self,
+        query: str,
+        variables: dict,
+        user: str | None,
+        data: Any,
+        tags: Iterable[str] = (),
+        ttl: int | None = None,
     ) -> bool:
         """
-        Set the data in the cache for the given url and query if it does not
-        already exist.
+        Set the data in the cache for the given url and query if a fresh
+        entry does not already exist. Stale entries are replaced in place.
 
         @type query: str
         @type variables: dict
         @type user: str | None
         @type data: Any
-        @type version: int
+        @type tags: Iterable[str]
+        @type ttl: int | None
         @param query: fetch request graphQL query
         @param variables: dictionary containing graphQL variables
         @param user: username of logged in user (or None)
-        @param data: JSON-serializable data to be cached
-        @param version: number denoting version since last data mutation
+        @param data: JSON-serializable data to be cached, which must not be
+        mutated afterwards since the memory tier keeps a reference to it
+        @param tags: tags naming what the data depends on, see invalidate()
+        @param ttl: time to live of the entry in milliseconds, defaulting to
+        the time to live of the cache
         @rtype: bool
         @returns: True if the data was set, False if the data already exists
         """
 
-        if self.get(query, variables, user, version) is not None:
-            return False
+        written = self.disk_set([(query, variables, user, data, tags, ttl)])
+        for entry in written:
+            self.memory.set(*entry)
+
+        return bool(written)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """
+        Delete every entry tagged with at least one of the given tags from
+        both tiers
+
+        @type tags: Iterable[str]
+        @param tags: tags of the entries to delete
+        """
+
+        tags = list(tags)
+        self.memory.invalidate(tags)
+        self.disk_invalidate(tags)
+
+    def patch(
+        self, tags: Iterable[str], patcher: Callable[[dict, Any], Any | None]
+    ) -> None:
+        """
+        Rewrite every entry within the grace tagged with at least one of the
+        given tags in both tiers, so stale data served meanwhile doesn't show
+        outdated values. The patcher receives the variables of the entry and
+        a private decoded copy of its data, and returns the patched data or
+        None if the entry can't be patched and has to be evicted. Expiry
+        times and tags are kept
+
+        @type tags: Iterable[str]
+        @type patcher: Callable[[dict, Any], Any | None]
+        @param tags: tags of the entries to patch
+        @param patcher: function patching the data of an entry
+        """
+
+        # entries only left in memory can't be patched, so they go too
+        tags = list(tags)
+        self.memory.invalidate(tags)
+
+        for _, entry in self.disk_patch(tags, patcher):
+            if entry is not None:
+                self.memory.set(*entry)
+
+    def clear(self) -> None:
+        """
+        Delete every entry from both tiers
+        """
+
+        self.memory.clear()
+        self.disk_clear()
+
+    def record_access(self, key: int) -> None:
+        """
+        Buffer the access time of an entry until the next sweep
+
+        @type key: int
+        @param key: cache key of the entry
+        """
+
+        with self._accessed_lock:
+            self._accessed[key] = round(time.time() * 1000)
+
+    def disk_get(self, key: int, grace: int = 0) -> CacheEntry | None:
+        """
+        Read and decode an entry from the sqlite tier only
+
+        @type key: int
+        @type grace: int
+        @param key: cache key of the entry
+        @param grace: milliseconds an expired entry may still be returned,
+        at most the grace of the cache
+        @rtype: CacheEntry | None
+        @returns: the entry, or None if it is missing or expired for longer
+        than grace
+        """
+
+        result = self.db.connection.execute(SELECT_ENTRY, (key,)).fetchone()
+        now = round(time.time() * 1000)
+
+        if result is None or now > result["expiry_time"] + grace:
+            self.disk_stats.misses += 1
+            return None
+
+        self.disk_stats.hits += 1
+        self.record_access(key)
+        return CacheEntry(
+            key,
+            decode(result["data"], Compression(result["compression"])),
+            result["size"],
+            result["expiry_time"],
+            frozenset(json.loads(result["tags"])),
+        )
+
+    def disk_set(
+        self,
+        entries: list[tuple[str, dict, str | None, Any, Iterable[str], int | None]],
+    ) -> list[CacheEntry]:
+        """
+        Write several responses to the sqlite tier only, in one transaction.
+        A response is skipped if a fresh entry already exists
+
+        @type entries: list[tuple[str, dict, str | None, Any, Iterable[str],
+        int | None]]
+        @param entries: list of (query, variables, user, data, tags, ttl)
+        tuples, see set()
+        @rtype: list[CacheEntry]
+        @returns: list of the entries written
+        """
+
+        written = []
+
+        with self.db as conn:
+            now = round(time.time() * 1000)
+
+            for query, variables, user, data, tags, ttl in entries:
+                expiry_time = now + (ttl if ttl is not None else self.time_to_live)
+                query_id = query_digest(query)
+                variables_json = canonical_variables(variables)
+                key = _digest(str(query_id), variables_json, user if user else "")
+                encoded, compression, size = encode(
+                    data, self.compression, self.compress_threshold
+                )
+
+                conn.execute(INSERT_QUERY, (query_id, query))
+                result = conn.execute(
+                    UPSERT_ENTRY,
+                    (
+                        key,
+                        query_id,
+                        variables_json,
+                        encoded,
+                        compression.value,
+                        size,
+                        expiry_time,
+                        now,
+                        now,
+                    ),
+                ).fetchone()
+
+                if result is None:
+                    continue
+
+                tags = frozenset(tags)
+                conn.execute(DELETE_TAGS, (key,))
+                conn.executemany(INSERT_TAG, [(tag, key) for tag in tags])
+                written.append(CacheEntry(key, data, size, expiry_time, tags))
+
+        return written
+
+    def disk_invalidate(self, tags: Iterable[str]) -> None:
+        """
+        Delete every entry tagged with at least one of the given tags from
+        the sqlite tier only
+
+        @type tags: Iterable[str]
+        @param tags: tags of the entries to delete
+        """
+
+        with self.db as conn:
+            conn.execute(DELETE_TAGGED, (json.dumps(list(tags)),))
+
+    def disk_patch(
+        self, tags: Iterable[str], patcher: Callable[[dict, Any], Any | None]
+    ) -> list[tuple[int, CacheEntry | None]]:
+        """
+        Rewrite the entries tagged with at least one of the given tags in
+        the sqlite tier only, see patch()
+
+        @type tags: Iterable[str]
+        @type patcher: Callable[[dict, Any], Any | None]
+        @param tags: tags of the entries to patch
+        @param patcher: function patching the data of an entry
+        @rtype: list[tuple[int, CacheEntry | None]]
+        @returns: list of (key, patched entry) tuples of every matched entry,
+        with None for the entries that were deleted
+        """
+
+        patched: list[tuple[int, CacheEntry | None]] = []
+
+        with self.db as conn:
+            now = round(time.time() * 1000)
+            rows = conn.execute(SELECT_TAGGED, (json.dumps(list(tags)),)).fetchall()
+
+            for row in rows:
+                key = row["id"]
+                data = None
+
+                if now <= row["expiry_time"] + self.grace:
+                    data = patcher(
+                        json.loads(row["variables"]),
+                        decode(row["data"], Compression(row["compression"])),
+                    )
+
+                if data is None:
+                    conn.execute(DELETE_ENTRY, (key,))
+                    patched.append((key, None))
+                    continue
+
+                encoded, compression, size = encode(
+                    data, self.compression, self.compress_threshold
+                )
+                conn.execute(UPDATE_DATA, (encoded, compression.value, size, key))
+                patched.append(
+                    (
+                        key,
+                        CacheEntry(
+                            key,
+                            data,
+                            size,
+                            row["expiry_time"],
+                            frozenset(json.loads(row["tags"])),
+                        ),
+                    )
+                )
+
+        return patched
+
+    def disk_clear(self) -> None:
+        """
+        Delete every entry from the sqlite tier only
+        """
 
         with self.db as conn:
-            cursor = conn.cursor()
-            sql_query = """
-INSERT INTO cache (query, variables, user, data, expiry_time, version)
-VALUES (?, ?, ?, ?, ?, ?)
-"""
-            expiry_time = round(time.time() * 1000) + self.time_to_live
-
-            cursor.execute(
-                sql_query,
-                (
-                    query,
-                    json.dumps(variables),
-                    user if user else "",
-                    json.dumps(data),
-                    expiry_time,
-                    version,
-                ),
+            conn.execute(DELETE_ALL)
+
+    def sweep(self) -> None:
+        """
+        Write the buffered access times, then delete entries expired for
+        longer than the grace and the least recently accessed entries over
+        the row and byte budgets from the sqlite tier. Called periodically
+        by the janitor
+        """
+
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+
+        with self.db as conn:
+            conn.executemany(
+                UPDATE_LAST_ACCESS, [(now, key) for key, now in accessed.items()]
             )
+            conn.execute(DELETE_EXPIRED, (round(time.time() * 1000) - self.grace,))
+
+            if self.max_rows is not None:
+                conn.execute(DELETE_OVER_ROWS, (self.max_rows,))
+            if self.max_bytes is not None:
+                conn.execute(DELETE_OVER_BYTES, (self.max_bytes,))
+
+            conn.execute(DELETE_UNUSED_QUERIES)
 
-        return True
+    def close(self) -> None:
+        """
+        Stop the janitor, run a last sweep so short sessions stay within
+        budget too, and close the connections held by the cache
+        """
+        if self.janitor is not None:
+            self.janitor.stop()
+        self.sweep()
+        self.memory.clear()
+        self.db.close()
@@ -1,6 +1,7 @@
 from anilist_cli.libs.anilist.adapter import AnilistAdapter
 from anilist_cli.libs.anilist.auth_service import AuthService
 from anilist_cli.libs.anilist.client import AnilistClient
+from anilist_cli.libs.anilist.prefetcher import MediaPrefetcher
 from anilist_cli.libs.anilist.service import AnilistService
 
 
@@ -10,7 +11,10 @@ class RuntimeState:
         self.adapter = AnilistAdapter(self.client)
         self.service = AnilistService(self.adapter)
         self.auth_service = AuthService(self.client)
+        self.prefetcher = MediaPrefetcher(self.adapter)
         self.username: str | None = None
 
     async def close(self) -> None:
+        self.prefetcher.cancel()
+        await self.adapter.close()
         await self.client.close()
@@ -0,0 +1,36 @@
+from anilist_cli.libs.anilist.models.lazy_sequence import LazySequence
+
+
+def _tracked(payloads):
+    built = []
+
+    def build(payload):
+        built.append(payload)
+        return payload * 10
+
+    return LazySequence(payloads, build), built
+
+
+def test_items_are_built_on_first_access_only():
+    sequence, built = _tracked([1, 2, 3])
+    assert len(sequence) == 3
+    assert built == []
+    assert sequence[1] == 20
+    assert sequence[1] == 20
+    assert built == [2]
+
+
+def test_iteration_and_slicing_build_items():
+    sequence, built = _tracked([1, 2, 3])
+    assert list(sequence) == [10, 20, 30]
+    assert sequence[-2:] == [20, 30]
+    assert built == [1, 2, 3]
+
+
+def test_concatenation_keeps_built_items():
+    first, built = _tracked([1, 2])
+    second, _ = _tracked([3])
+    first[0]
+    merged = first + second
+    assert list(merged) == [10, 20, 30]
+    assert built == [1, 2, 3]
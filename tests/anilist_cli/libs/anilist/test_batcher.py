@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+
+from anilist_cli.libs.anilist.batcher import QueryBatcher, merge_queries, split_response
+from anilist_cli.libs.anilist.client import AnilistClient
+from anilist_cli.libs.anilist.queries import get_media, update_entry
+from anilist_cli.libs.anilist.rate_limiter import RequestPriority
+from tests.stub_server import StubServer
+
+PAGE_QUERY = """query GetPage($page: Int, $type: MediaType) {
+  Page(page: $page) {
+    media(type: $type) { id }
+  }
+}"""
+
+
+def test_merge_queries_aliases_roots_and_renames_variables():
+    query, variables, roots = merge_queries(
+        [(PAGE_QUERY, {"page": 1, "type": "ANIME"}), (PAGE_QUERY, {"page": 2})]
+    )
+    assert roots == ["Page", "Page"]
+    assert variables == {"q0_page": 1, "q0_type": "ANIME", "q1_page": 2}
+    assert query.startswith(
+        "query Batch($q0_page: Int $q0_type: MediaType "
+        "$q1_page: Int $q1_type: MediaType)"
+    )
+    assert "q0: Page(page: $q0_page)" in query
+    assert "q1: Page(page: $q1_page)" in query
+    assert "media(type: $q1_type)" in query
+
+
+def test_merge_queries_handles_repo_documents():
+    query, _, roots = merge_queries([(get_media, {}), (get_media, {})])
+    assert roots == ["Page", "Page"]
+    assert query.count("$q1_sort") == 2
+    assert query.count("{") == query.count("}")
+
+
+def test_merge_queries_merges_mutations():
+    query, variables, roots = merge_queries(
+        [(update_entry, {"mediaId": 1, "progress": 4}), (update_entry, {"mediaId": 2})]
+    )
+    assert roots == ["SaveMediaListEntry", "SaveMediaListEntry"]
+    assert variables == {"q0_mediaId": 1, "q0_progress": 4, "q1_mediaId": 2}
+    assert query.startswith("mutation Batch($q0_mediaId: Int")
+    assert "q1: SaveMediaListEntry(" in query
+    assert query.count("{") == query.count("}")
+
+
+def test_merge_queries_rejects_queries_mixed_with_mutations():
+    with pytest.raises(ValueError):
+        merge_queries([(get_media, {}), (update_entry, {})])
+
+
+def test_split_response_restores_each_response():
+    data = {
+        "data": {"q0": {"media": [1]}, "q1": None},
+        "errors": [{"message": "not found", "path": ["q1", "media"]}],
+    }
+    first, second = split_response(data, ["Page", "Page"])
+    assert first == {"data": {"Page": {"media": [1]}}}
+    assert second is None
+
+
+def test_split_response_keeps_errors_of_each_query():
+    data = {
+        "data": {"q0": {"media": [1]}},
+        "errors": [{"message": "partial", "path": ["q0", "media", 0]}],
+    }
+    (result,) = split_response(data, ["Page"])
+    assert result["errors"] == [{"message": "partial", "path": ["Page", "media", 0]}]
+
+
+def test_batcher_merges_queries_submitted_within_window():
+    payloads = []
+
+    async def post(payload, priority):
+        payloads.append((payload, priority))
+        return {"data": {"q0": {"media": [1]}, "q1": {"media": [2]}}}
+
+    async def main():
+        batcher = QueryBatcher(post, window=0.01)
+        return await asyncio.gather(
+            batcher.submit(PAGE_QUERY, {"page": 1}, RequestPriority.PREFETCH),
+            batcher.submit(PAGE_QUERY, {"page": 2}, RequestPriority.INTERACTIVE),
+        )
+
+    first, second = asyncio.run(main())
+    assert len(payloads) == 1
+    assert payloads[0][1] is RequestPriority.INTERACTIVE
+    assert first == {"data": {"Page": {"media": [1]}}}
+    assert second == {"data": {"Page": {"media": [2]}}}
+
+
+def test_batcher_sends_single_query_unmerged():
+    payloads = []
+
+    async def post(payload, priority):
+        payloads.append(payload)
+        return {"data": {"Page": {}}}
+
+    async def main():
+        return await QueryBatcher(post).submit(PAGE_QUERY, {"page": 1})
+
+    assert asyncio.run(main()) == {"data": {"Page": {}}}
+    assert payloads == [{"query": PAGE_QUERY, "variables": {"page": 1}}]
+
+
+def test_batcher_flushes_when_full():
+    payloads = []
+
+    async def post(payload, priority):
+        payloads.append(payload)
+        return None
+
+    async def main():
+        batcher = QueryBatcher(post, window=60, max_size=2)
+        return await asyncio.gather(
+            batcher.submit(PAGE_QUERY, {"page": 1}),
+            batcher.submit(PAGE_QUERY, {"page": 2}),
+        )
+
+    assert asyncio.run(main()) == [None, None]
+    assert len(payloads) == 1
+
+
+def test_batcher_propagates_errors():
+    async def post(payload, priority):
+        raise RuntimeError("offline")
+
+    async def main():
+        return await QueryBatcher(post).submit(PAGE_QUERY, {})
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+
+def test_close_cancels_pending_and_sending_batches():
+    payloads = []
+
+    async def post(payload, priority):
+        payloads.append(payload)
+        await asyncio.sleep(60)
+
+    async def main():
+        batcher = QueryBatcher(post, window=60, max_size=2)
+        sending = asyncio.gather(
+            batcher.submit(PAGE_QUERY, {"page": 1}),
+            batcher.submit(PAGE_QUERY, {"page": 2}),
+            return_exceptions=True,
+        )
+        pending = asyncio.ensure_future(batcher.submit(PAGE_QUERY, {"page": 3}))
+        await asyncio.sleep(0.01)
+        await batcher.close()
+        return await sending, await asyncio.gather(pending, return_exceptions=True)
+
+    sent, pending = asyncio.run(main())
+    assert all(isinstance(result, asyncio.CancelledError) for result in sent)
+    assert isinstance(pending[0], asyncio.CancelledError)
+    assert len(payloads) == 1
+
+
+def test_client_caches_each_batched_query(tmp_path):
+    merged = {"data": {"q0": {"media": [{"id": 1}]}, "q1": {"media": [{"id": 2}]}}}
+
+    async def main():
+        async with StubServer(default=(200, merged, {})) as server:
+            client = AnilistClient(
+                cache_path=str(tmp_path / "cache.db"), url=server.url
+            )
+            try:
+                await asyncio.gather(
+                    client.get_data(PAGE_QUERY, {"page": 1}, batch=True),
+                    client.get_data(PAGE_QUERY, {"page": 2}, batch=True),
+                )
+                cached = await client.cache.get(PAGE_QUERY, {"page": 2}, None)
+            finally:
+                await client.close()
+            return server.requests, cached
+
+    requests, cached = asyncio.run(main())
+    assert len(requests) == 1
+    assert cached == {"data": {"Page": {"media": [{"id": 2}]}}}
@@ -0,0 +1,154 @@
+from anilist_cli.libs.anilist.cache_patches import patch_list_entry
+
+SAVED = {
+    "data": {
+        "SaveMediaListEntry": {
+            "score": 9.0,
+            "status": "COMPLETED",
+            "progress": 12,
+            "repeat": 0,
+            "notes": None,
+            "updatedAt": 1700000000,
+            "startedAt": {"day": 1, "month": 1, "year": 2024},
+            "completedAt": {"day": 2, "month": 2, "year": 2024},
+        }
+    }
+}
+
+
+def _collection(user_lists: list) -> dict:
+    return {
+        "data": {"MediaListCollection": {"hasNextChunk": False, "lists": user_lists}}
+    }
+
+
+def _media(media_id: int, entry: dict | None) -> dict:
+    return {"id": media_id, "title": {"romaji": "t"}, "mediaListEntry": entry}
+
+
+def _entry(media_id: int) -> dict:
+    return {"id": 100 + media_id, "mediaId": media_id, "progress": 3, "score": 0}
+
+
+def test_patch_updates_media_list_entry_of_media():
+    data = {
+        "data": {
+            "Page": {
+                "media": [
+                    _media(1, {"progress": 3, "status": "CURRENT"}),
+                    _media(2, {"progress": 3, "status": "CURRENT"}),
+                ]
+            }
+        }
+    }
+    patched = patch_list_entry(1, "user", SAVED, {}, data)
+    media = patched["data"]["Page"]["media"]
+    assert media[0]["mediaListEntry"] == {"progress": 12, "status": "COMPLETED"}
+    assert media[1]["mediaListEntry"] == {"progress": 3, "status": "CURRENT"}
+
+
+def test_patch_creates_missing_media_list_entry():
+    data = {"data": {"Media": _media(1, None)}}
+    patched = patch_list_entry(1, "user", SAVED, {"id": 1}, data)
+    assert patched["data"]["Media"]["mediaListEntry"] == {
+        "progress": 12,
+        "status": "COMPLETED",
+        "score": 9.0,
+        "updatedAt": 1700000000,
+    }
+
+
+def test_patch_updates_entry_in_place_when_status_is_unchanged():
+    data = _collection([{"status": "COMPLETED", "entries": [_entry(1), _entry(2)]}])
+    patched = patch_list_entry(1, "user", SAVED, {"userName": "user"}, data)
+    entry = patched["data"]["MediaListCollection"]["lists"][0]["entries"][0]
+    assert entry["progress"] == 12
+    assert entry["score"] == 9.0
+
+
+def test_patch_moves_entry_to_list_of_new_status():
+    data = _collection(
+        [
+            {"status": "CURRENT", "entries": [_entry(1), _entry(2)]},
+            {"status": "COMPLETED", "entries": []},
+        ]
+    )
+    patched = patch_list_entry(1, "user", SAVED, {"userName": "user"}, data)
+    current, completed = patched["data"]["MediaListCollection"]["lists"]
+    assert [entry["mediaId"] for entry in current["entries"]] == [2]
+    assert [entry["mediaId"] for entry in completed["entries"]] == [1]
+
+
+def test_patch_drops_entry_moved_outside_status_filter():
+    data = _collection([{"status": "CURRENT", "entries": [_entry(1)]}])
+    variables = {"userName": "user", "status_in": ["CURRENT"]}
+    patched = patch_list_entry(1, "user", SAVED, variables, data)
+    assert patched["data"]["MediaListCollection"]["lists"][0]["entries"] == []
+
+
+def test_patch_evicts_when_list_of_new_status_is_missing():
+    data = _collection([{"status": "CURRENT", "entries": [_entry(1)]}])
+    assert patch_list_entry(1, "user", SAVED, {"userName": "user"}, data) is None
+
+
+def test_patch_evicts_when_entry_is_new():
+    data = _collection([{"status": "COMPLETED", "entries": [_entry(2)]}])
+    assert patch_list_entry(1, "user", SAVED, {"userName": "user"}, data) is None
+
+
+def test_patch_evicts_collection_of_other_user():
+    data = _collection([{"status": "COMPLETED", "entries": [_entry(1)]}])
+    assert patch_list_entry(1, "user", SAVED, {"userName": "other"}, data) is None
+
+
+def _chunks() -> list[tuple[dict, dict]]:
+    return [
+        (
+            {"userName": "user", "chunk": chunk, "perChunk": 2},
+            {
+                "data": {
+                    "MediaListCollection": {
+                        "hasNextChunk": chunk < 3,
+                        "lists": [{"status": "CURRENT", "entries": entries}],
+                    }
+                }
+            },
+        )
+        for chunk, entries in enumerate(
+            [[_entry(1), _entry(2)], [_entry(3), _entry(4)], [_entry(5)]], start=1
+        )
+    ]
+
+
+def test_progress_save_keeps_the_chunks_without_the_entry():
+    saved = {"data": {"SaveMediaListEntry": {"progress": 7}}}
+
+    patched = [
+        patch_list_entry(3, "user", saved, variables, data, status_changed=False)
+        for variables, data in _chunks()
+    ]
+
+    assert None not in patched
+    lists = [data["data"]["MediaListCollection"]["lists"][0] for data in patched]
+    progress = [[entry["progress"] for entry in item["entries"]] for item in lists]
+    assert progress == [[3, 3], [7, 3], [3]]
+
+
+def test_status_save_evicts_the_chunks_without_the_entry():
+    saved = {"data": {"SaveMediaListEntry": {"progress": 7, "status": "CURRENT"}}}
+
+    patched = [
+        patch_list_entry(3, "user", saved, variables, data)
+        for variables, data in _chunks()
+    ]
+
+    assert [data is None for data in patched] == [True, False, True]
+
+
+def test_progress_save_of_a_new_entry_evicts_a_whole_collection():
+    data = _collection([{"status": "CURRENT", "entries": [_entry(2)]}])
+    saved = {"data": {"SaveMediaListEntry": {"progress": 7}}}
+
+    variables = {"userName": "user"}
+
+    assert patch_list_entry(1, "user", saved, variables, data, False) is None
@@ -0,0 +1,59 @@
+from anilist_cli.libs.anilist.cache_policy import (
+    DAY,
+    DEFAULT_TTL,
+    HOUR,
+    MINUTE,
+    operation_name,
+    ttl_for,
+)
+from anilist_cli.libs.anilist.queries import (
+    get_expanded_media_info,
+    get_media,
+    get_media_list,
+)
+
+
+def _media(status):
+    return {"data": {"Media": {"id": 1, "title": {"romaji": "a"}, "status": status}}}
+
+
+def test_operation_name_of_the_shipped_queries():
+    assert operation_name(get_media) == "GetMedia"
+    assert operation_name(get_expanded_media_info) == "GetExpandedMediaInfo"
+    assert operation_name(get_media_list) == "GetMediaList"
+    assert operation_name("query { Viewer { name } }") is None
+
+
+def test_finished_media_details_live_for_days():
+    assert ttl_for(get_expanded_media_info, _media("FINISHED")) == 30 * DAY
+
+
+def test_releasing_media_details_refresh_hourly():
+    assert ttl_for(get_expanded_media_info, _media("RELEASING")) == HOUR
+
+
+def test_unknown_status_falls_back_to_the_operation_default():
+    assert ttl_for(get_expanded_media_info, _media(None)) == HOUR
+
+
+def test_shortest_time_to_live_of_mixed_media_applies():
+    data = {
+        "data": {
+            "Page": {
+                "media": [
+                    _media("FINISHED")["data"]["Media"],
+                    _media("RELEASING")["data"]["Media"] | {"id": 2},
+                ]
+            }
+        }
+    }
+    assert ttl_for(get_expanded_media_info, data) == HOUR
+
+
+def test_pages_ignore_media_status():
+    data = {"data": {"Page": {"media": [_media("FINISHED")["data"]["Media"]]}}}
+    assert ttl_for(get_media, data) == 5 * MINUTE
+
+
+def test_unknown_operations_use_the_default():
+    assert ttl_for("query { Viewer { name } }", {"data": {}}) == DEFAULT_TTL
@@ -0,0 +1,53 @@
+from anilist_cli.libs.anilist.cache_tags import (
+    list_tag,
+    media_tag,
+    response_tags,
+    walk_media,
+)
+
+
+def test_media_and_list_tags():
+    assert media_tag(1) == "media:1"
+    assert list_tag("user") == "list:user"
+
+
+def test_response_tags_collects_media_ids():
+    response = {
+        "data": {
+            "Page": {
+                "media": [
+                    {"id": 1, "title": {"romaji": "a"}},
+                    {"id": 2, "title": {"romaji": "b"}},
+                ],
+                "pageInfo": {"total": 2},
+            }
+        }
+    }
+    assert response_tags(response) == {"media:1", "media:2"}
+
+
+def test_response_tags_uses_media_id_of_list_entries():
+    response = {
+        "data": {
+            "MediaListCollection": {
+                "lists": [{"entries": [{"id": 50, "mediaId": 3, "media": {}}]}]
+            }
+        }
+    }
+    assert response_tags(response) == {"media:3"}
+
+
+def test_response_tags_of_response_without_media():
+    assert response_tags({"data": {"Viewer": {"name": "user"}}}) == set()
+
+
+def test_walk_media_yields_the_objects_of_the_response():
+    media = {"id": 1, "title": {"romaji": "t"}}
+    entry = {"mediaId": 2, "media": {"title": {"romaji": "u"}}}
+    data = {"data": {"Page": {"media": [media]}, "List": {"entries": [entry]}}}
+
+    found = sorted(walk_media(data), key=lambda item: item[0])
+
+    assert [media_id for media_id, _ in found] == [1, 2]
+    assert found[0][1] is media
+    assert found[1][1] is entry
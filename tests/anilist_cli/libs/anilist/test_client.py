@@ -0,0 +1,423 @@
+import asyncio
+
+from anilist_cli.libs.anilist.cache_policy import DAY
+from anilist_cli.libs.anilist.client import AnilistClient
+from anilist_cli.libs.anilist.rate_limiter import RequestPriority
+from tests.stub_server import StubServer
+
+QUERY = "query GetMedia { Page { media { id } } }"
+RESPONSE = {"data": {"Page": {"media": [{"id": 1, "title": {}}]}}}
+
+
+def _run(tmp_path, scenario):
+    async def main():
+        client = AnilistClient(cache_path=str(tmp_path / "cache.db"))
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
+
+
+def _slow_post(calls: list):
+    async def post(payload, headers=None, priority=None):
+        calls.append(payload)
+        await asyncio.sleep(0.01)
+        return RESPONSE
+
+    return post
+
+
+def test_concurrent_identical_requests_share_one_post(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client._post = _slow_post(calls)
+        return await asyncio.gather(
+            client.get_data(QUERY, {"page": 1, "perPage": 20}),
+            client.get_data(QUERY, {"perPage": 20, "page": 1}),
+        )
+
+    first, second = _run(tmp_path, scenario)
+    assert len(calls) == 1
+    assert first == second == RESPONSE
+
+
+def test_different_requests_are_not_coalesced(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client._post = _slow_post(calls)
+        await asyncio.gather(
+            client.get_data(QUERY, {"page": 1}), client.get_data(QUERY, {"page": 2})
+        )
+
+    _run(tmp_path, scenario)
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_request(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client._post = _slow_post(calls)
+        first = asyncio.create_task(client.get_data(QUERY, {"page": 1}))
+        second = asyncio.create_task(client.get_data(QUERY, {"page": 1}))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert _run(tmp_path, scenario) == RESPONSE
+    assert len(calls) == 1
+
+
+def test_in_flight_request_is_forgotten_once_done(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client._post = _slow_post(calls)
+        await client.get_data(QUERY, {"page": 1})
+        return client._in_flight
+
+    assert _run(tmp_path, scenario) == {}
+
+
+def test_stale_response_is_served_then_refreshed(tmp_path):
+    calls = []
+    refreshed = []
+    stale = {"data": {"Page": {"media": []}}}
+
+    async def scenario(client):
+        client.cache.set(QUERY, {"page": 1}, None, stale, ttl=-1000)
+        client._post = _slow_post(calls)
+        client.add_refresh_listener(
+            lambda query, variables, data: refreshed.append((variables, data))
+        )
+
+        served = await client.get_data(QUERY, {"page": 1})
+        assert calls == []
+        await asyncio.sleep(0.05)
+        return served, await client.get_data(QUERY, {"page": 1})
+
+    served, fresh = _run(tmp_path, scenario)
+    assert served == stale
+    assert fresh == RESPONSE
+    assert len(calls) == 1
+    assert refreshed == [({"page": 1}, RESPONSE)]
+
+
+def test_stale_grace_of_zero_waits_for_the_api(tmp_path):
+    calls = []
+
+    async def main():
+        client = AnilistClient(cache_path=str(tmp_path / "cache.db"), stale_grace=0)
+        client.cache.set(QUERY, {"page": 1}, None, {"data": {}}, ttl=-1000)
+        client._post = _slow_post(calls)
+        try:
+            return await client.get_data(QUERY, {"page": 1})
+        finally:
+            await client.close()
+
+    assert asyncio.run(main()) == RESPONSE
+    assert len(calls) == 1
+
+
+def test_offline_mode_serves_expired_responses_without_posting(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client.offline = True
+        client.cache.set(QUERY, {"page": 1}, None, RESPONSE, ttl=-2 * 24 * 3600 * 1000)
+        client._post = _slow_post(calls)
+        return (
+            await client.get_data(QUERY, {"page": 1}),
+            await client.get_data(QUERY, {"page": 2}),
+        )
+
+    assert _run(tmp_path, scenario) == (RESPONSE, None)
+    assert calls == []
+
+
+def test_unreachable_api_switches_to_cached_responses(tmp_path):
+    async def scenario(client):
+        # nothing listens on the discard port
+        client.url = "http://127.0.0.1:9/"
+        client.cache.set(QUERY, {"page": 1}, None, RESPONSE, ttl=-1000)
+        assert await client.get_data(QUERY, {"page": 2}) is None
+        return client.online, await client.get_data(QUERY, {"page": 1})
+
+    assert _run(tmp_path, scenario) == (False, RESPONSE)
+
+
+def test_request_finding_the_api_unreachable_falls_back_to_the_cache(tmp_path):
+    async def scenario(client):
+        client.url = "http://127.0.0.1:9/"
+        client.cache.set(QUERY, {"page": 1}, None, RESPONSE, ttl=-2 * DAY)
+        return await client.get_data(QUERY, {"page": 1})
+
+    assert _run(tmp_path, scenario) == RESPONSE
+
+
+def test_reconnect_listeners_are_told_when_the_api_is_back(tmp_path):
+    reconnected = []
+
+    async def scenario(client):
+        client.add_reconnect_listener(lambda: reconnected.append(True))
+        client.url = "http://127.0.0.1:9/"
+        await client.get_data(QUERY, {"page": 1})
+        assert reconnected == []
+
+        async with StubServer(default=(200, RESPONSE, {})) as server:
+            client.url = server.url
+            client._unreachable_since = 0.0
+            return await client.get_data(QUERY, {"page": 1})
+
+    assert _run(tmp_path, scenario) == RESPONSE
+    assert reconnected == [True]
+
+
+def test_login_tells_reconnect_listeners(tmp_path):
+    reconnected = []
+
+    async def scenario(client):
+        client.add_reconnect_listener(lambda: reconnected.append(client.user))
+        async with StubServer(
+            default=(200, {"data": {"Viewer": {"name": "user"}}}, {})
+        ) as server:
+            client.url = server.url
+            await client.login("token")
+
+    _run(tmp_path, scenario)
+    assert reconnected == ["user"]
+
+
+def test_login_uses_the_last_user_data_while_offline(tmp_path):
+    viewer = {"name": "user"}
+
+    async def scenario(client):
+        async with StubServer(
+            default=(200, {"data": {"Viewer": viewer}}, {})
+        ) as server:
+            client.url = server.url
+            await client.login("token")
+
+        client.offline = True
+        client.user = None
+        return await client.login("token"), await client.login("other"), client.user
+
+    assert _run(tmp_path, scenario) == (viewer, None, "user")
+
+
+def test_authenticated_batch_sends_one_aliased_mutation(tmp_path):
+    mutation = "mutation M($id: Int) { SaveMediaListEntry(mediaId: $id) { progress } }"
+    response = {
+        "data": {"q0": {"progress": 4}, "q1": None},
+        "errors": [{"message": "not found", "path": ["q1"]}],
+    }
+
+    async def scenario(client):
+        async with StubServer(default=(200, response, {})) as server:
+            client.url = server.url
+            client.token = "token"
+            results = await client.authenticated_batch(
+                [
+                    (mutation, {"id": 1}, {"media:1"}, None),
+                    (mutation, {"id": 2}, {"media:2"}, None),
+                ]
+            )
+            return results, server.requests
+
+    results, requests = _run(tmp_path, scenario)
+    assert results == [
+        {"data": {"SaveMediaListEntry": {"progress": 4}}},
+        {
+            "data": None,
+            "errors": [{"message": "not found", "path": ["SaveMediaListEntry"]}],
+        },
+    ]
+    assert len(requests) == 1
+    assert requests[0]["variables"] == {"q0_id": 1, "q1_id": 2}
+
+
+def _batch(tmp_path, responses) -> tuple[list, list]:
+    mutation = "mutation M($id:Int){SaveMediaListEntry(mediaId:$id){progress}}"
+
+    async def scenario(client):
+        async with StubServer(responses) as server:
+            client.url = server.url
+            client.token = "token"
+            results = await client.authenticated_batch(
+                [
+                    (mutation, {"id": 1}, {"media:1"}, None),
+                    (mutation, {"id": 2}, {"media:2"}, None),
+                ]
+            )
+            return results, server.requests
+
+    return _run(tmp_path, scenario)
+
+
+def test_rejected_mutation_is_left_out_of_the_batch(tmp_path):
+    saved = {"data": {"SaveMediaListEntry": {"progress": 4}}}
+    invalid = {"message": 'Variable "$q1_id" got invalid value', "status": 400}
+
+    results, requests = _batch(
+        tmp_path, [(400, {"data": None, "errors": [invalid]}, {}), (200, saved, {})]
+    )
+
+    assert results == [
+        saved,
+        {"data": None, "errors": [invalid | {"path": ["SaveMediaListEntry"]}]},
+    ]
+    assert [request["variables"] for request in requests] == [
+        {"q0_id": 1, "q1_id": 2},
+        {"id": 1},
+    ]
+
+
+def test_batch_rejected_as_a_whole_is_not_resent(tmp_path):
+    rejected = {"data": None, "errors": [{"message": "syntax error", "status": 400}]}
+
+    results, requests = _batch(tmp_path, [(400, rejected, {})])
+
+    assert results == [rejected, rejected]
+    assert len(requests) == 1
+
+
+def test_unauthorized_batch_returns_no_responses(tmp_path):
+    unauthorized = {"errors": [{"message": "Invalid token", "status": 401}]}
+
+    results, requests = _batch(tmp_path, [(401, unauthorized, {})])
+
+    assert results == [None, None]
+    assert len(requests) == 1
+
+
+def test_failed_batch_returns_no_responses(tmp_path):
+    mutation = "mutation M($id:Int){SaveMediaListEntry(mediaId:$id){progress}}"
+
+    async def scenario(client):
+        async with StubServer(default=(500, {}, {})) as server:
+            client.url = server.url
+            client.token = "token"
+            client.max_retries = 0
+            return await client.authenticated_batch(
+                [
+                    (mutation, {"id": 1}, {"media:1"}, None),
+                    (mutation, {"id": 2}, {"media:2"}, None),
+                ]
+            )
+
+    assert _run(tmp_path, scenario) == [None, None]
+
+
+def test_fetched_titles_are_searchable_locally(tmp_path):
+    response = {
+        "data": {"Page": {"media": [{"id": 1, "title": {"romaji": "Frieren"}}]}}
+    }
+
+    async def scenario(client):
+        async with StubServer(default=(200, response, {})) as server:
+            client.url = server.url
+            await client.get_data(QUERY, {"page": 1})
+        return await client.search_titles("fri")
+
+    assert _run(tmp_path, scenario) == [{"id": 1, "title": {"romaji": "Frieren"}}]
+
+
+def test_prefetch_warms_the_cache_at_prefetch_priority(tmp_path):
+    priorities = []
+
+    async def scenario(client):
+        async def post(payload, headers=None, priority=None):
+            priorities.append(priority)
+            return RESPONSE
+
+        client._post = post
+        await client.prefetch(QUERY, {"page": 1})
+        await client.prefetch(QUERY, {"page": 1})
+        return await client.get_data(QUERY, {"page": 1})
+
+    assert _run(tmp_path, scenario) == RESPONSE
+    assert priorities == [RequestPriority.PREFETCH]
+
+
+def test_cancelled_prefetch_cancels_its_request(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client._post = _slow_post(calls)
+        prefetch = asyncio.create_task(client.prefetch(QUERY, {"page": 1}))
+        while not client._prefetching:
+            await asyncio.sleep(0)
+        prefetch.cancel()
+        await asyncio.sleep(0.05)
+        return await client.cache.get(QUERY, {"page": 1}, None)
+
+    assert _run(tmp_path, scenario) is None
+
+
+def test_cancelled_prefetch_keeps_a_request_joined_by_get_data(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client._post = _slow_post(calls)
+        prefetch = asyncio.create_task(client.prefetch(QUERY, {"page": 1}))
+        while not client._prefetching:
+            await asyncio.sleep(0)
+        opened = asyncio.create_task(client.get_data(QUERY, {"page": 1}))
+        while client._prefetching:
+            await asyncio.sleep(0)
+        prefetch.cancel()
+        return await opened
+
+    assert _run(tmp_path, scenario) == RESPONSE
+    assert len(calls) == 1
+
+
+def test_get_data_resends_a_request_whose_prefetch_was_cancelled(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client._post = _slow_post(calls)
+        prefetch = asyncio.create_task(client.prefetch(QUERY, {"page": 1}))
+        while not client._prefetching:
+            await asyncio.sleep(0)
+        # still looking up the cache when the prefetch goes away
+        opened = asyncio.create_task(client.get_data(QUERY, {"page": 1}))
+        await asyncio.sleep(0)
+        prefetch.cancel()
+        return await opened
+
+    assert _run(tmp_path, scenario) == RESPONSE
+
+
+def test_primed_response_is_served_without_a_request(tmp_path):
+    calls = []
+
+    async def scenario(client):
+        client._post = _slow_post(calls)
+        client.prime(QUERY, {"page": 1}, {"data": {"Page": {"media": []}}})
+        return await client.get_data(QUERY, {"page": 1})
+
+    assert _run(tmp_path, scenario) == {"data": {"Page": {"media": []}}}
+    assert calls == []
+
+
+def test_unset_variables_are_not_sent(tmp_path):
+    document = (
+        "query GetMedia($page: Int, $search: String) "
+        "{ Page(page: $page) { media(search: $search) { id } } }"
+    )
+
+    async def scenario(client):
+        async with StubServer(default=(200, RESPONSE, {})) as server:
+            client.url = server.url
+            await client.get_data(document, {"page": 1})
+            return server.requests
+
+    requests = _run(tmp_path, scenario)
+    assert requests[0]["query"] == (
+        "query GetMedia($page:Int){Page(page:$page){media{id}}}"
+    )
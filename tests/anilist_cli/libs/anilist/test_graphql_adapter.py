@@ -1,10 +1,22 @@
+import asyncio
+import copy
 from datetime import date
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from anilist_cli.libs.anilist.adapter import AnilistAdapter
-from anilist_cli.libs.anilist.models.enums import MediaListStatus
+from anilist_cli.libs.anilist.client import AnilistClient
+from anilist_cli.libs.anilist.models.enums import (
+    FieldProfile,
+    MediaListStatus,
+    MediaType,
+)
+from anilist_cli.libs.anilist.models.filter import MediaFilter, PageFilter
+from anilist_cli.libs.anilist.models.list_entry_changes import ListEntryChanges
+from anilist_cli.libs.anilist.outbox import Outbox, ReplayResult
+from anilist_cli.libs.anilist.queries import get_media
+from tests.stub_server import StubServer
 
 
 @pytest.fixture
@@ -46,6 +58,20 @@ def test_dict_dates_to_fuzzy_leaves_non_dates_unchanged(adapter):
     assert d == {"progress": 10, "score": 8.5}
 
 
+# --- _filter_to_graphql ---
+
+def test_filter_to_graphql_only_declares_set_filters(adapter):
+    query, variables = adapter._filter_to_graphql(
+        get_media, MediaFilter(search="frieren"), PageFilter(page=2)
+    )
+
+    assert variables == {"search": "frieren", "page": 2, "perPage": 50}
+    assert query.startswith(
+        "query GetMedia($page:Int$perPage:Int$search:String)"
+        "{Page(page:$page perPage:$perPage){media(search:$search)"
+    )
+
+
 # --- _parse_media_list_entry ---
 
 def test_parse_media_list_entry_flattens_entry(adapter):
@@ -81,3 +107,557 @@ def test_parse_media_list_entry_none_value_leaves_dict_unchanged(adapter):
     assert "list_entry_status" not in d
 
 
+# --- cached payloads ---
+
+def test_search_does_not_mutate_response(adapter):
+    entry = {
+        "id": 1,
+        "title": {"english": "Frieren", "romaji": "Sousou no Frieren"},
+        "type": "ANIME",
+        "mediaListEntry": {"status": "CURRENT", "progress": 5, "score": 0},
+    }
+    response = {"data": {"Page": {"pageInfo": {}, "media": [entry]}}}
+    snapshot = copy.deepcopy(response)
+    adapter.api.get_data = AsyncMock(return_value=response)
+
+    results, _ = asyncio.run(adapter.search(MediaFilter()))
+
+    assert results[0].progress == 5
+    assert response == snapshot
+
+
+# --- search_iter ---
+
+def _page_response(page: int, last_page: int, per_page: int = 2) -> dict:
+    media = [
+        {"id": (page - 1) * per_page + i, "title": {"romaji": "t"}, "type": "ANIME"}
+        for i in range(per_page)
+    ]
+    page_info = {"currentPage": page, "hasNextPage": page < last_page}
+    return {"data": {"Page": {"pageInfo": page_info, "media": media}}}
+
+
+def _paged_api(adapter, last_page: int) -> list:
+    pages = []
+
+    async def get_data(query, variables, **kwargs):
+        pages.append(variables["page"])
+        return _page_response(variables["page"], last_page)
+
+    adapter.api.get_data = get_data
+    return pages
+
+
+def _collect(iterator) -> list:
+    async def main():
+        return [preview.media_id async for preview in iterator]
+
+    return asyncio.run(main())
+
+
+def test_search_iter_yields_across_pages(adapter):
+    pages = _paged_api(adapter, last_page=3)
+    ids = _collect(adapter.search_iter(MediaFilter(), PageFilter(perPage=2)))
+    assert ids == [0, 1, 2, 3, 4, 5]
+    assert pages == [1, 2, 3]
+
+
+def test_search_iter_stops_at_max_items(adapter):
+    pages = _paged_api(adapter, last_page=10)
+    ids = _collect(adapter.search_iter(MediaFilter(), PageFilter(perPage=2), 3))
+    assert ids == [0, 1, 2]
+    assert pages == [1, 2]
+
+
+def test_search_iter_prefetches_next_page(adapter):
+    pages = _paged_api(adapter, last_page=3)
+
+    async def main():
+        iterator = adapter.search_iter(MediaFilter(), PageFilter(perPage=2))
+        await anext(iterator)
+        await asyncio.sleep(0)
+        await iterator.aclose()
+
+    asyncio.run(main())
+    assert pages == [1, 2]
+
+
+# --- get_media_list chunks ---
+
+def _list_entry(media_id: int) -> dict:
+    return {
+        "id": 100 + media_id,
+        "mediaId": media_id,
+        "media": {"title": {"romaji": "t"}},
+        "startedAt": {"year": None, "month": None, "day": None},
+        "completedAt": {"year": 2024, "month": 1, "day": 2},
+        "score": 0,
+        "repeat": 0,
+        "progress": 1,
+        "notes": None,
+    }
+
+
+def _chunked_api(adapter, chunks: list[list[tuple[str, str, list[int]]]]) -> list:
+    requested = []
+
+    async def get_data(query, variables, **kwargs):
+        requested.append((variables["chunk"], variables["perChunk"]))
+        lists = [
+            {"name": name, "status": status, "entries": [_list_entry(i) for i in ids]}
+            for name, status, ids in chunks[variables["chunk"] - 1]
+        ]
+        has_next = variables["chunk"] < len(chunks)
+        collection = {"hasNextChunk": has_next, "lists": lists}
+        return {"data": {"MediaListCollection": collection}}
+
+    adapter.api.get_data = get_data
+    return requested
+
+
+def test_get_media_list_chunks_yields_each_chunk(adapter):
+    requested = _chunked_api(
+        adapter,
+        [[("Watching", "CURRENT", [1, 2])], [("Watching", "CURRENT", [3])]],
+    )
+
+    async def main():
+        return [
+            (name, status, [entry.media_id for entry in entries])
+            async for name, status, entries in adapter.get_media_list_chunks(
+                "user", MediaType.ANIME, [MediaListStatus.CURRENT], per_chunk=2
+            )
+        ]
+
+    assert asyncio.run(main()) == [
+        ("Watching", "CURRENT", [1, 2]),
+        ("Watching", "CURRENT", [3]),
+    ]
+    assert requested == [(1, 2), (2, 2)]
+
+
+def test_get_media_list_merges_chunks(adapter):
+    _chunked_api(
+        adapter,
+        [
+            [("Watching", "CURRENT", [1, 2]), ("Completed", "COMPLETED", [4])],
+            [("Completed", "COMPLETED", [5, 6])],
+        ],
+    )
+
+    results = asyncio.run(
+        adapter.get_media_list(
+            "user",
+            MediaType.ANIME,
+            [MediaListStatus.CURRENT, MediaListStatus.COMPLETED],
+        )
+    )
+
+    assert [(name, status, length) for name, status, length, _ in results] == [
+        ("Watching", "CURRENT", 2),
+        ("Completed", "COMPLETED", 3),
+    ]
+    completed = results[1][3]
+    assert [entry.media_id for entry in completed] == [4, 5, 6]
+    assert completed[0].completed_at == date(2024, 1, 2)
+    assert completed[0].started_at is None
+
+
+# --- list entry outbox ---
+
+def _outbox_api(adapter, tmp_path, online: bool = True) -> list:
+    batches = []
+
+    async def authenticated_batch(mutations):
+        batches.append([variables for _, variables, _, _ in mutations])
+        return [
+            _rejected(["SaveMediaListEntry"])
+            if variables.get("progress") == -1
+            else _saved(variables)
+            for _, variables, _, _ in mutations
+        ]
+
+    async def run(function, *args):
+        return function(*args)
+
+    adapter.api.online = online
+    adapter.api.user = "user"
+    adapter.api.outbox = Outbox(str(tmp_path / "cache.db"))
+    adapter.api.cache.run = run
+    adapter.api.cache.patch = AsyncMock()
+    adapter.api.cache.invalidate = AsyncMock()
+    adapter.api.authenticated_batch = authenticated_batch
+    return batches
+
+
+def _saved(variables: dict) -> dict:
+    entry = {"progress": variables.get("progress"), "updatedAt": 200}
+    return {"data": {"SaveMediaListEntry": entry}}
+
+
+def _rejected(path: list | None = None) -> dict:
+    error = {"message": "invalid", "status": 400}
+    if path is not None:
+        error["path"] = path
+    return {"data": None, "errors": [error]}
+
+
+def _update(adapter, *updates) -> list:
+    async def main():
+        return await asyncio.gather(
+            *(
+                adapter.update_list_entry(media_id, ListEntryChanges(progress=progress))
+                for media_id, progress in updates
+            )
+        )
+
+    return asyncio.run(main())
+
+
+def test_concurrent_updates_are_sent_in_one_request(adapter, tmp_path):
+    batches = _outbox_api(adapter, tmp_path)
+
+    results = _update(adapter, *((media_id, 4) for media_id in range(10)))
+
+    assert len(batches) == 1
+    assert [variables["mediaId"] for variables in batches[0]] == list(range(10))
+    assert results == [{"progress": 4, "updated_at": 200}] * 10
+    assert adapter.api.outbox.pending("user") == []
+
+
+def test_updates_to_the_same_entry_are_merged(adapter, tmp_path):
+    batches = _outbox_api(adapter, tmp_path)
+
+    async def main():
+        return await asyncio.gather(
+            adapter.update_list_entry(1, ListEntryChanges(progress=4)),
+            adapter.update_list_entry(1, ListEntryChanges(score=8.0)),
+        )
+
+    first, second = asyncio.run(main())
+
+    assert batches == [[{"mediaId": 1, "progress": 4, "score": 8.0}]]
+    assert first == second == {"progress": 4, "updated_at": 200}
+
+
+def test_failed_updates_are_reported_per_entry(adapter, tmp_path):
+    _outbox_api(adapter, tmp_path)
+
+    assert _update(adapter, (1, 4), (2, -1)) == [
+        {"progress": 4, "updated_at": 200},
+        None,
+    ]
+    adapter.api.cache.invalidate.assert_awaited_once_with({"media:2", "list:user"})
+    assert adapter.api.outbox.pending("user") == []
+
+
+def test_updates_stay_queued_when_the_request_fails(adapter, tmp_path):
+    _outbox_api(adapter, tmp_path)
+
+    async def failed(mutations):
+        return [None] * len(mutations)
+
+    adapter.api.authenticated_batch = failed
+
+    assert _update(adapter, (1, 4), (2, 5)) == [{"progress": 4}, {"progress": 5}]
+    assert [entry.media_id for entry in adapter.api.outbox.pending("user")] == [1, 2]
+    adapter.api.cache.invalidate.assert_not_awaited()
+
+
+def test_update_list_entry_is_queued_while_offline(adapter, tmp_path):
+    batches = _outbox_api(adapter, tmp_path, online=False)
+
+    data = asyncio.run(
+        adapter.update_list_entry(1, ListEntryChanges(progress=4), updated_at=100)
+    )
+
+    assert data == {"progress": 4}
+    assert [
+        (entry.media_id, entry.variables, entry.updated_at)
+        for entry in adapter.api.outbox.pending("user")
+    ] == [(1, {"progress": 4, "mediaId": 1}, 100)]
+    assert batches == []
+    adapter.api.cache.patch.assert_awaited_once()
+
+
+def test_update_list_entry_is_queued_when_the_connection_drops(adapter, tmp_path):
+    _outbox_api(adapter, tmp_path)
+
+    async def lost(mutations):
+        adapter.api.online = False
+        return [None] * len(mutations)
+
+    adapter.api.authenticated_batch = lost
+
+    assert _update(adapter, (1, 4)) == [{"progress": 4}]
+    assert [entry.media_id for entry in adapter.api.outbox.pending("user")] == [1]
+
+
+def test_updates_stay_queued_when_the_request_is_rejected(adapter, tmp_path):
+    _outbox_api(adapter, tmp_path)
+
+    async def rejected(mutations):
+        return [_rejected() for _ in mutations]
+
+    adapter.api.authenticated_batch = rejected
+
+    assert _update(adapter, (1, 4), (2, 5)) == [{"progress": 4}, {"progress": 5}]
+    assert [entry.media_id for entry in adapter.api.outbox.pending("user")] == [1, 2]
+
+
+def test_updates_stay_queued_when_the_token_is_rejected(tmp_path):
+    unauthorized = {"errors": [{"message": "Invalid token", "status": 401}]}
+
+    async def main():
+        async with StubServer(default=(401, unauthorized, {})) as server:
+            client = AnilistClient(
+                cache_path=str(tmp_path / "cache.db"), url=server.url
+            )
+            client.token = "token"
+            client.user = "user"
+            adapter = AnilistAdapter(client)
+            try:
+                results = await asyncio.gather(
+                    adapter.update_list_entry(1, ListEntryChanges(progress=4)),
+                    adapter.update_list_entry(2, ListEntryChanges(progress=5)),
+                )
+                pending = client.outbox.pending("user")
+            finally:
+                await adapter.close()
+                await client.close()
+            return results, pending, server.requests
+
+    results, pending, requests = asyncio.run(main())
+    assert results == [{"progress": 4}, {"progress": 5}]
+    assert [entry.media_id for entry in pending] == [1, 2]
+    assert len(requests) == 1
+
+
+def test_close_cancels_the_scheduled_flush(adapter, tmp_path):
+    batches = _outbox_api(adapter, tmp_path)
+
+    async def main():
+        update = asyncio.ensure_future(
+            adapter.update_list_entry(1, ListEntryChanges(progress=4))
+        )
+        await asyncio.sleep(0)
+        await adapter.close()
+        await asyncio.sleep(0.1)
+        return await asyncio.gather(update, return_exceptions=True)
+
+    [result] = asyncio.run(main())
+    assert isinstance(result, asyncio.CancelledError)
+    assert batches == []
+    assert [entry.media_id for entry in adapter.api.outbox.pending("user")] == [1]
+
+
+def test_flush_outbox_sends_changes_left_unchanged_elsewhere(adapter, tmp_path):
+    batches = _outbox_api(adapter, tmp_path)
+    adapter.api.outbox.add("user", 1, {"mediaId": 1, "progress": 4}, 100)
+    adapter.api.get_uncached = AsyncMock(
+        return_value={"data": {"MediaList": {"updatedAt": 100}}}
+    )
+
+    assert asyncio.run(adapter.flush_outbox()) == [(1, ReplayResult.SAVED)]
+    assert batches == [[{"mediaId": 1, "progress": 4}]]
+    assert adapter.api.outbox.pending("user") == []
+
+
+def test_flush_outbox_drops_changes_to_entries_edited_elsewhere(adapter, tmp_path):
+    batches = _outbox_api(adapter, tmp_path)
+    adapter.api.outbox.add("user", 1, {"mediaId": 1, "progress": 4}, 100)
+    adapter.api.get_uncached = AsyncMock(
+        return_value={"data": {"MediaList": {"updatedAt": 150}}}
+    )
+
+    assert asyncio.run(adapter.flush_outbox()) == [(1, ReplayResult.CONFLICT)]
+    assert batches == []
+    assert adapter.api.outbox.pending("user") == []
+    adapter.api.cache.invalidate.assert_awaited_once_with({"media:1", "list:user"})
+
+
+def test_flush_outbox_sends_changes_to_entries_missing_elsewhere(adapter, tmp_path):
+    batches = _outbox_api(adapter, tmp_path)
+    adapter.api.outbox.add("user", 1, {"mediaId": 1, "progress": 4}, 100)
+    adapter.api.get_uncached = AsyncMock(
+        return_value={"data": None, "errors": [{"message": "", "status": 404}]}
+    )
+
+    assert asyncio.run(adapter.flush_outbox()) == [(1, ReplayResult.SAVED)]
+    assert batches == [[{"mediaId": 1, "progress": 4}]]
+
+
+def test_flush_outbox_keeps_changes_it_cannot_check(adapter, tmp_path):
+    batches = _outbox_api(adapter, tmp_path)
+    adapter.api.outbox.add("user", 1, {"mediaId": 1, "progress": 4}, 100)
+    adapter.api.outbox.add("user", 2, {"mediaId": 2, "progress": 5}, 100)
+    adapter.api.get_uncached = AsyncMock(
+        side_effect=[None, {"data": {"MediaList": {"updatedAt": 100}}}]
+    )
+
+    assert asyncio.run(adapter.flush_outbox()) == [(2, ReplayResult.SAVED)]
+    assert batches == [[{"mediaId": 2, "progress": 5}]]
+    assert [entry.media_id for entry in adapter.api.outbox.pending("user")] == [1]
+
+
+# --- search_as_you_type ---
+
+def test_search_as_you_type_yields_local_hits_then_merged_results(adapter):
+    local = {"id": 1, "title": {"romaji": "Frieren"}, "type": "ANIME"}
+    remote = [
+        {"id": 2, "title": {"romaji": "Frieren 2"}, "type": "ANIME"},
+        {"id": 1, "title": {"romaji": "Frieren"}, "type": "ANIME", "popularity": 10},
+    ]
+    adapter.api.search_titles = AsyncMock(return_value=[local])
+
+    async def get_data(query, variables, **kwargs):
+        await asyncio.sleep(0.01)
+        return {"data": {"Page": {"pageInfo": {}, "media": remote}}}
+
+    adapter.api.get_data = get_data
+
+    async def main():
+        return [
+            [(preview.media_id, preview.popularity) for preview in results]
+            async for results in adapter.search_as_you_type(
+                MediaFilter(search="fri", type=MediaType.ANIME)
+            )
+        ]
+
+    assert asyncio.run(main()) == [[(1, None)], [(1, 10), (2, None)]]
+    adapter.api.search_titles.assert_awaited_once_with("fri", "ANIME", 20)
+
+
+# --- get_media_info_many ---
+
+def _media(id: int) -> dict:
+    return {
+        "id": id,
+        "title": {"romaji": f"t{id}"},
+        "type": "ANIME",
+        "description": "<br>d",
+        "favourites": 0,
+        "source": "ORIGINAL",
+        "genres": [],
+        "seasonYear": None,
+    }
+
+
+def _media_info_many_api(adapter, cached: set[int]) -> list:
+    requests = []
+
+    async def cache_get(query, variables, user):
+        if variables["id"] in cached:
+            return {"data": {"Media": _media(variables["id"])}}
+        return None
+
+    async def get_data(query, variables, **kwargs):
+        requests.append(variables)
+        media = [_media(id) for id in variables["id_in"] if id != 404]
+        return {"data": {"Page": {"media": media}}}
+
+    adapter.api.cache.get = cache_get
+    adapter.api.get_data = get_data
+    return requests
+
+
+def test_get_media_info_many_requests_chunks_of_50(adapter):
+    requests = _media_info_many_api(adapter, cached=set())
+
+    documents = asyncio.run(adapter.get_media_info_many(list(range(1, 61))))
+
+    assert list(documents) == list(range(1, 61))
+    assert documents[7].description == "d"
+    assert [len(variables["id_in"]) for variables in requests] == [50, 10]
+    assert adapter.api.prime.call_count == 60
+    adapter.api.prime.assert_any_call(
+        *adapter._media_info_request(7), {"data": {"Media": _media(7)}}
+    )
+
+
+def test_get_media_info_many_skips_cached_and_missing_media(adapter):
+    requests = _media_info_many_api(adapter, cached={2})
+
+    documents = asyncio.run(adapter.get_media_info_many([3, 2, 404, 3]))
+
+    assert list(documents) == [3, 2]
+    assert requests == [{"id_in": [3, 404], "perPage": 50}]
+    assert adapter.api.prime.call_count == 1
+
+
+# --- field profiles ---
+
+def test_minimal_search_only_requests_the_minimal_fields(adapter):
+    response = {
+        "data": {
+            "Page": {
+                "pageInfo": {},
+                "media": [{"id": 1, "title": {"romaji": "a"}, "type": "ANIME"}],
+            }
+        }
+    }
+    adapter.api.get_data = AsyncMock(return_value=response)
+
+    results, _ = asyncio.run(
+        adapter.search(MediaFilter(), profile=FieldProfile.MINIMAL)
+    )
+
+    query = adapter.api.get_data.await_args.args[0]
+    assert "media{id title{english romaji}type mediaListEntry{" in query
+    assert "popularity" not in query.split("pageInfo")[0]
+    assert results[0].media_id == 1
+    assert results[0].popularity is None
+
+
+def test_minimal_media_info_keeps_the_document_defaults(adapter):
+    media = {"id": 1, "title": {"romaji": "a"}, "type": "ANIME"}
+    adapter.api.get_data = AsyncMock(return_value={"data": {"Media": media}})
+
+    document = asyncio.run(adapter.get_media_info(1, FieldProfile.MINIMAL))
+
+    query = adapter.api.get_data.await_args.args[0]
+    assert "description" not in query
+    assert (document.genres, document.description, document.season_year) == (
+        [],
+        None,
+        None,
+    )
+
+
+def test_full_media_info_requests_every_field(adapter):
+    full, _ = adapter._media_info_request(1)
+    preview, _ = adapter._media_info_request(1, FieldProfile.PREVIEW)
+
+    assert "description" in full
+    assert "description" not in preview
+    assert "episodes" in preview
+
+
+def test_minimal_media_list_entries_have_no_dates(adapter):
+    entry = {
+        "id": 10,
+        "mediaId": 1,
+        "media": {"type": "ANIME", "title": {"romaji": "a"}},
+        "progress": 3,
+        "score": 0,
+        "updatedAt": 5,
+    }
+    collection = {
+        "hasNextChunk": False,
+        "lists": [{"name": "Watching", "status": "CURRENT", "entries": [entry]}],
+    }
+    adapter.api.get_data = AsyncMock(
+        return_value={"data": {"MediaListCollection": collection}}
+    )
+
+    results = asyncio.run(
+        adapter.get_media_list(
+            "user", MediaType.ANIME, [MediaListStatus.CURRENT], FieldProfile.MINIMAL
+        )
+    )
+
+    query = adapter.api.get_data.await_args.args[0]
+    assert "startedAt" not in query
+    assert "notes" not in query
+    (parsed,) = results[0][3]
+    assert (parsed.progress, parsed.started_at, parsed.notes) == (3, None, None)
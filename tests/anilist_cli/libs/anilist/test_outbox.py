@@ -0,0 +1,68 @@
+from anilist_cli.libs.anilist.outbox import Outbox, OutboxEntry
+
+
+def test_pending_changes_are_returned_oldest_first(tmp_path):
+    outbox = Outbox(str(tmp_path / "cache.db"))
+    outbox.add("user", 2, {"mediaId": 2, "progress": 1}, 100)
+    outbox.add("user", 1, {"mediaId": 1, "progress": 5}, None)
+
+    assert [(entry.media_id, entry.variables) for entry in outbox.pending("user")] == [
+        (2, {"mediaId": 2, "progress": 1}),
+        (1, {"mediaId": 1, "progress": 5}),
+    ]
+    outbox.close()
+
+
+def test_pending_changes_are_per_user(tmp_path):
+    outbox = Outbox(str(tmp_path / "cache.db"))
+    outbox.add("user", 1, {"mediaId": 1}, None)
+
+    assert outbox.pending("other") == []
+    outbox.close()
+
+
+def test_changes_to_the_same_entry_are_merged(tmp_path):
+    outbox = Outbox(str(tmp_path / "cache.db"))
+    first = outbox.add("user", 1, {"mediaId": 1, "progress": 4, "score": 7.0}, 100)
+    second = outbox.add("user", 1, {"mediaId": 1, "progress": 5}, 200)
+
+    assert first == second
+    assert outbox.pending("user") == [
+        OutboxEntry(first, 1, {"mediaId": 1, "progress": 5, "score": 7.0}, 100)
+    ]
+    outbox.close()
+
+
+def test_removed_changes_are_not_pending(tmp_path):
+    outbox = Outbox(str(tmp_path / "cache.db"))
+    outbox.add("user", 1, {"mediaId": 1}, None)
+    outbox.add("user", 2, {"mediaId": 2}, 100)
+    outbox.remove(outbox.pending("user")[:1])
+
+    assert [entry.media_id for entry in outbox.pending("user")] == [2]
+    outbox.close()
+
+
+def test_changes_merged_into_after_being_read_are_kept(tmp_path):
+    outbox = Outbox(str(tmp_path / "cache.db"))
+    outbox.add("user", 1, {"mediaId": 1, "progress": 4}, None)
+    sent = outbox.pending("user")
+    outbox.add("user", 1, {"mediaId": 1, "progress": 5}, None)
+    outbox.remove(sent)
+
+    assert [entry.variables for entry in outbox.pending("user")] == [
+        {"mediaId": 1, "progress": 5}
+    ]
+    outbox.close()
+
+
+def test_changes_survive_reopening(tmp_path):
+    outbox = Outbox(str(tmp_path / "cache.db"))
+    change = outbox.add("user", 1, {"mediaId": 1, "score": 8.5}, 100)
+    outbox.close()
+
+    outbox = Outbox(str(tmp_path / "cache.db"))
+    assert outbox.pending("user") == [
+        OutboxEntry(change, 1, {"mediaId": 1, "score": 8.5}, 100)
+    ]
+    outbox.close()
@@ -0,0 +1,49 @@
+import asyncio
+from unittest.mock import MagicMock
+
+from anilist_cli.libs.anilist.prefetcher import MediaPrefetcher
+
+
+def _prefetcher(top_n: int = 3) -> tuple[MediaPrefetcher, list, list]:
+    started = []
+    cancelled = []
+
+    async def prefetch_media_info(media_id):
+        started.append(media_id)
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(media_id)
+            raise
+
+    adapter = MagicMock()
+    adapter.prefetch_media_info = prefetch_media_info
+    return MediaPrefetcher(adapter, top_n=top_n), started, cancelled
+
+
+def test_prefetches_the_first_distinct_media():
+    prefetcher, started, _ = _prefetcher()
+
+    async def main():
+        prefetcher.prefetch([4, 4, 5, 6, 7])
+        await asyncio.sleep(0.01)
+        prefetcher.cancel()
+
+    asyncio.run(main())
+    assert started == [4, 5, 6]
+
+
+def test_new_view_cancels_the_previous_prefetch():
+    prefetcher, started, cancelled = _prefetcher()
+
+    async def main():
+        prefetcher.prefetch([1, 2])
+        await asyncio.sleep(0.01)
+        prefetcher.prefetch([3])
+        await asyncio.sleep(0.01)
+        prefetcher.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert started == [1, 2, 3]
+    assert cancelled == [1, 2, 3]
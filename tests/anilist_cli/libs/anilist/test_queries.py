@@ -0,0 +1,99 @@
+import pytest
+
+from anilist_cli.libs.anilist.batcher import merge_queries
+from anilist_cli.libs.anilist.queries import (
+    _selection,
+    build_query,
+    get_expanded_media_info,
+    get_media,
+    get_media_info_many,
+    get_media_list,
+    get_user,
+    minify,
+    prune,
+    update_entry,
+)
+
+DOCUMENT = """
+query GetMedia($page: Int, $search: String, $sort: [MediaSort] = [POPULARITY]) {
+  # comments are dropped
+  Page(page: $page) {
+    media(search: $search, sort: $sort) {
+      id
+      title { romaji }
+    }
+  }
+}
+"""
+
+
+def test_minify_keeps_only_the_spaces_between_names():
+    assert minify(DOCUMENT) == (
+        "query GetMedia($page:Int$search:String$sort:[MediaSort]=[POPULARITY])"
+        "{Page(page:$page){media(search:$search sort:$sort){id title{romaji}}}}"
+    )
+
+
+def test_shipped_queries_are_minified():
+    assert "\n" not in get_media
+    assert minify(get_media) == get_media
+
+
+def test_prune_drops_unset_variables_and_their_arguments():
+    assert prune(DOCUMENT, {"search": "frieren"}) == (
+        "query GetMedia($search:String$sort:[MediaSort]=[POPULARITY])"
+        "{Page{media(search:$search sort:$sort){id title{romaji}}}}"
+    )
+
+
+def test_prune_keeps_variables_set_to_null():
+    assert "$mediaId" in prune(update_entry, {"mediaId": None})
+
+
+def test_prune_of_merged_queries_keeps_each_query_variables():
+    query, variables, _ = merge_queries(
+        [(get_media, {"page": 1}), (get_media, {"page": 2, "search": "a"})]
+    )
+    pruned = prune(query, variables)
+
+    assert "$q0_search" not in pruned
+    assert "media(search:$q1_search)" in pruned
+    assert pruned.count("Page(page:") == 2
+
+
+def test_build_query_selects_the_given_media_fields():
+    query = build_query(get_media, {"search": "a"}, frozenset({"id", "title"}))
+
+    assert query == (
+        "query GetMedia($search:String){Page{media(search:$search)"
+        "{id title{english romaji}}pageInfo{hasNextPage currentPage lastPage "
+        "perPage total}}}"
+    )
+
+
+def test_build_query_selects_the_fields_of_list_entries():
+    query = build_query(
+        get_media_list, {"userName": "a"}, frozenset({"mediaId", "media"})
+    )
+
+    assert "entries{mediaId media{type title{english romaji}}}name" in query
+
+
+def test_build_query_is_memoized():
+    first = build_query(get_media, {"page": 1, "search": "a"}, frozenset({"id"}))
+    second = build_query(get_media, {"search": "b", "page": 2}, frozenset({"id"}))
+
+    assert first is second
+
+
+def test_build_query_rejects_fields_of_unknown_operations():
+    with pytest.raises(ValueError):
+        build_query(get_user, {}, frozenset({"id"}))
+
+
+def test_bulk_media_info_selects_the_fields_of_media_info():
+    def selection(document):
+        start, end = _selection(document)
+        return document[start : end + 1]
+
+    assert selection(get_media_info_many) == selection(get_expanded_media_info)
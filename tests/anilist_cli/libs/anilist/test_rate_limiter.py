@@ -0,0 +1,159 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+from anilist_cli.libs.anilist.client import AnilistClient
+from anilist_cli.libs.anilist.rate_limiter import (
+    RateLimiter,
+    RequestPriority,
+    parse_retry_after,
+)
+from tests.stub_server import StubServer
+
+OK = (200, {"data": {"Viewer": {"name": "user"}}}, {})
+
+
+def _rate_limited(retry_after: str = "0") -> tuple[int, dict, dict]:
+    return (
+        429,
+        {"errors": [{"message": "Too Many Requests."}]},
+        {"Retry-After": retry_after, "X-RateLimit-Remaining": "0"},
+    )
+
+
+def _post_through_stub(tmp_path, responses, max_retries=3):
+    async def main():
+        async with StubServer(responses, default=OK) as server:
+            client = AnilistClient(
+                cache_path=str(tmp_path / "cache.db"),
+                url=server.url,
+                rate_limiter=RateLimiter(limit=1000, period=1.0, backoff_base=0.001),
+                max_retries=max_retries,
+            )
+            try:
+                data = await client._post({"query": "query { Viewer { name } }"})
+                return data, server
+            finally:
+                await client.close()
+
+    return asyncio.run(main())
+
+
+def test_request_is_retried_after_429_sequence(tmp_path):
+    data, server = _post_through_stub(tmp_path, [_rate_limited(), _rate_limited()])
+    assert data == OK[1]
+    assert len(server.requests) == 3
+
+
+def test_request_gives_up_after_max_retries(tmp_path):
+    data, server = _post_through_stub(tmp_path, [_rate_limited()] * 5, max_retries=2)
+    assert data is None
+    assert len(server.requests) == 3
+
+
+def test_server_errors_are_retried(tmp_path):
+    data, server = _post_through_stub(tmp_path, [(500, {}, {})])
+    assert data == OK[1]
+    assert len(server.requests) == 2
+
+
+def test_client_errors_are_not_retried(tmp_path):
+    data, server = _post_through_stub(tmp_path, [(400, {}, {})])
+    assert data is None
+    assert len(server.requests) == 1
+
+
+def test_retry_after_pauses_requests(tmp_path):
+    start = time.monotonic()
+    _post_through_stub(tmp_path, [_rate_limited("1")])
+    assert time.monotonic() - start >= 1
+
+
+def test_bucket_paces_requests_beyond_burst():
+    async def main():
+        limiter = RateLimiter(limit=100, period=1.0, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    # two requests pass immediately, the next two wait 10ms each
+    assert asyncio.run(main()) >= 0.015
+
+
+def test_interactive_requests_are_granted_before_prefetch():
+    async def main():
+        limiter = RateLimiter(limit=100, period=1.0, burst=1)
+        await limiter.acquire()
+        order = []
+
+        async def request(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+
+        await asyncio.gather(
+            request("prefetch", RequestPriority.PREFETCH),
+            request("interactive", RequestPriority.INTERACTIVE),
+        )
+        return order
+
+    assert asyncio.run(main()) == ["interactive", "prefetch"]
+
+
+def test_remaining_header_drains_bucket():
+    limiter = RateLimiter(burst=10)
+    limiter.update({"X-RateLimit-Limit": "30", "X-RateLimit-Remaining": "2"})
+    assert limiter.limit == 30
+    assert limiter._tokens == 2
+
+
+def test_backoff_is_capped():
+    limiter = RateLimiter(backoff_base=1.0, backoff_cap=5.0)
+    assert all(0 <= limiter.backoff(10) <= 5.0 for _ in range(100))
+
+
+def test_retry_after_replaces_the_backoff(tmp_path):
+    async def main():
+        async with StubServer([_rate_limited("0")], default=OK) as server:
+            client = AnilistClient(
+                cache_path=str(tmp_path / "cache.db"), url=server.url
+            )
+            client.rate_limiter.backoff = lambda attempt: 5.0
+            start = time.monotonic()
+            try:
+                data = await client._post({"query": "query { Viewer { name } }"})
+            finally:
+                await client.close()
+            return data, time.monotonic() - start
+
+    data, elapsed = asyncio.run(main())
+    assert data == OK[1]
+    assert elapsed < 1
+
+
+def test_refunded_token_does_not_exceed_burst():
+    async def main():
+        limiter = RateLimiter(burst=2)
+        request = asyncio.create_task(limiter.acquire())
+        # let the request queue and the dispatcher grant it
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        limiter._tokens = limiter.burst
+        request.cancel()
+        await asyncio.gather(request, return_exceptions=True)
+        return limiter._tokens
+
+    assert asyncio.run(main()) == 2
+
+
+def test_retry_after_is_parsed_as_seconds_or_http_date():
+    assert parse_retry_after("2.5") == 2.5
+    assert 0 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0
+    assert parse_retry_after("soon") is None
+
+
+def test_unparsable_retry_after_falls_back_to_the_backoff(tmp_path):
+    data, server = _post_through_stub(tmp_path, [_rate_limited("soon")])
+    assert data == OK[1]
+    assert len(server.requests) == 2
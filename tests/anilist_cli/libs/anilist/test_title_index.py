@@ -0,0 +1,87 @@
+import pytest
+
+from anilist_cli.libs.anilist import title_index
+from anilist_cli.libs.anilist.title_index import TitleIndex, match_expression
+
+FRIEREN = {
+    "id": 1,
+    "title": {
+        "romaji": "Sousou no Frieren",
+        "english": "Frieren: Beyond Journey's End",
+    },
+    "type": "ANIME",
+    "format": "TV",
+    "mediaListEntry": {"progress": 3},
+}
+POKEMON = {"id": 2, "title": {"romaji": "Pokémon", "english": None}, "type": "MANGA"}
+
+
+def _page(*media) -> dict:
+    return {"data": {"Page": {"pageInfo": {}, "media": list(media)}}}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = TitleIndex(str(tmp_path / "cache.db"))
+    yield index
+    index.close()
+
+
+def test_match_expression_matches_word_prefixes():
+    assert match_expression("Sousou no fri") == '"sousou"* "no"* "fri"*'
+    assert match_expression(" :- ") is None
+
+
+def test_search_matches_unfinished_words(index):
+    index.add_response(_page(FRIEREN, POKEMON))
+    assert [media["id"] for media in index.search("frie")] == [1]
+    assert [media["id"] for media in index.search("beyond jour")] == [1]
+    assert index.search("frieren zzz") == []
+
+
+def test_search_ignores_diacritics(index):
+    index.add_response(_page(FRIEREN, POKEMON))
+    assert [media["id"] for media in index.search("pokemon")] == [2]
+
+
+def test_search_filters_by_type(index):
+    index.add_response(_page(FRIEREN, POKEMON))
+    assert index.search("pokemon", "ANIME") == []
+    assert [media["id"] for media in index.search("pokemon", "MANGA")] == [2]
+
+
+def test_indexed_media_leaves_out_the_list_entry(index):
+    index.add_response(_page(FRIEREN))
+    assert index.search("frieren") == [
+        {key: value for key, value in FRIEREN.items() if key != "mediaListEntry"}
+    ]
+
+
+def test_list_entries_are_indexed_by_media_id(index):
+    entry = {
+        "id": 100,
+        "mediaId": 1,
+        "media": {"type": "ANIME", "title": FRIEREN["title"]},
+    }
+    collection = {"data": {"MediaListCollection": {"lists": [{"entries": [entry]}]}}}
+    index.add_response(_page(FRIEREN))
+    index.add_response(collection)
+
+    # the fields only the search response had are kept
+    assert index.search("frieren")[0]["format"] == "TV"
+    assert index.search("frieren")[0]["id"] == 1
+
+
+def test_index_without_fts5_finds_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        title_index,
+        "CREATE_TITLES_TABLE",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS media_titles USING missing_module()",
+    )
+    index = TitleIndex(str(tmp_path / "cache.db"))
+    try:
+        index.add_response(_page(FRIEREN))
+        assert not index.available
+        assert index.search("frie") == []
+    finally:
+        index.close()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+
+from anilist_cli.libs.cache.async_cache import AsyncSessionCache
+from anilist_cli.libs.cache.session_cache import SessionCache
+
+QUERY = "query { Page { media { id } } }"
+
+
+def _cache(tmp_path, **kwargs):
+    return AsyncSessionCache(
+        SessionCache(str(tmp_path / "cache.db"), sweep_interval=None), **kwargs
+    )
+
+
+def _disk_rows(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), sweep_interval=None)
+    with cache.db as conn:
+        rows = conn.execute("SELECT count(*) FROM cache").fetchone()[0]
+    cache.close()
+    return rows
+
+
+def test_buffered_write_is_readable_before_flush(tmp_path):
+    async def main():
+        cache = _cache(tmp_path, flush_delay=60)
+        cache.set(QUERY, {"page": 1}, None, {"data": 1})
+        try:
+            return await cache.get(QUERY, {"page": 1}, None), _disk_rows(tmp_path)
+        finally:
+            await cache.close()
+
+    assert asyncio.run(main()) == ({"data": 1}, 0)
+    assert _disk_rows(tmp_path) == 1
+
+
+def test_writes_are_flushed_in_one_batch(tmp_path):
+    async def main():
+        cache = _cache(tmp_path, flush_delay=0.01)
+        batches = []
+        disk_set = cache.cache.disk_set
+        cache.cache.disk_set = lambda entries: (
+            batches.append(entries) or disk_set(entries)
+        )
+
+        for page in range(5):
+            cache.set(QUERY, {"page": page}, None, {"data": page})
+        await asyncio.sleep(0.05)
+        await cache.close()
+        return batches
+
+    batches = asyncio.run(main())
+    assert [len(batch) for batch in batches] == [5]
+    assert _disk_rows(tmp_path) == 5
+
+
+def test_full_buffer_flushes_immediately(tmp_path):
+    async def main():
+        cache = _cache(tmp_path, flush_delay=60, flush_size=2)
+        cache.set(QUERY, {"page": 1}, None, {"data": 1})
+        cache.set(QUERY, {"page": 2}, None, {"data": 2})
+        await asyncio.sleep(0.05)
+        rows = _disk_rows(tmp_path)
+        await cache.close()
+        return rows
+
+    assert asyncio.run(main()) == 2
+
+
+def test_disk_reads_run_off_the_event_loop_thread(tmp_path):
+    SessionCache(str(tmp_path / "cache.db"), sweep_interval=None).set(
+        QUERY, {"page": 1}, None, {"data": 1}
+    )
+
+    async def main():
+        cache = _cache(tmp_path)
+        threads = []
+        disk_get = cache.cache.disk_get
+        cache.cache.disk_get = lambda key, grace: (
+            threads.append(threading.current_thread()) or disk_get(key, grace)
+        )
+        try:
+            data = await cache.get(QUERY, {"page": 1}, None)
+            # the second read is answered by the memory tier
+            await cache.get(QUERY, {"page": 1}, None)
+        finally:
+            await cache.close()
+        return data, threads
+
+    data, threads = asyncio.run(main())
+    assert data == {"data": 1}
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
+
+
+def test_invalidate_drops_buffered_and_stored_entries(tmp_path):
+    async def main():
+        cache = _cache(tmp_path, flush_delay=60)
+        cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+        await cache.flush()
+        cache.set(QUERY, {"page": 2}, None, {"data": 2}, {"media:1"})
+        cache.set(QUERY, {"page": 3}, None, {"data": 3}, {"media:3"})
+        await cache.invalidate({"media:1"})
+        try:
+            return [await cache.get(QUERY, {"page": page}, None) for page in (1, 2, 3)]
+        finally:
+            await cache.close()
+
+    assert asyncio.run(main()) == [None, None, {"data": 3}]
+
+
+def test_patch_reaches_buffered_entries(tmp_path):
+    async def main():
+        cache = _cache(tmp_path, flush_delay=60)
+        cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+        cache.set(QUERY, {"page": 2}, None, {"data": 2}, {"media:1"})
+        await cache.patch(
+            {"media:1"},
+            lambda variables, data: None if variables["page"] == 2 else {"data": 10},
+        )
+        try:
+            return [await cache.get(QUERY, {"page": page}, None) for page in (1, 2)]
+        finally:
+            await cache.close()
+
+    assert asyncio.run(main()) == [{"data": 10}, None]
@@ -0,0 +1,32 @@
+import pytest
+
+from anilist_cli.libs.cache.codec import Compression, decode, encode
+
+DATA = {"data": {"Media": {"description": "Lorem ipsum dolor sit amet. " * 100}}}
+
+
+@pytest.mark.parametrize("compression", list(Compression))
+def test_round_trip(compression):
+    blob, applied, _ = encode(DATA, compression, 0)
+    assert applied is compression
+    assert decode(blob, applied) == DATA
+
+
+@pytest.mark.parametrize("compression", [Compression.ZLIB, Compression.LZMA])
+def test_compression_shrinks_repetitive_data(compression):
+    raw, _, size = encode(DATA, Compression.NONE, 0)
+    blob, _, _ = encode(DATA, compression, 0)
+    assert size == len(raw)
+    assert len(blob) < len(raw) / 10
+
+
+def test_data_below_threshold_is_not_compressed():
+    blob, applied, size = encode({"data": 1}, Compression.ZLIB, 4096)
+    assert applied is Compression.NONE
+    assert len(blob) == size
+
+
+def test_non_ascii_text_round_trips():
+    data = {"romaji": "Shingeki no Kyojin", "native": "進撃の巨人"}
+    blob, applied, _ = encode(data, Compression.NONE, 0)
+    assert decode(blob, applied) == data
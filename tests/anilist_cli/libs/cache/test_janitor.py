@@ -0,0 +1,26 @@
+import threading
+
+from anilist_cli.libs.cache.janitor import CacheJanitor
+
+
+def test_janitor_keeps_sweeping_after_a_failure():
+    calls = []
+    done = threading.Event()
+
+    def sweep():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        done.set()
+
+    janitor = CacheJanitor(sweep, interval=0.01)
+    assert done.wait(2)
+    janitor.stop()
+
+
+def test_stop_ends_the_thread_without_sweeping():
+    calls = []
+    janitor = CacheJanitor(lambda: calls.append(None), interval=60)
+    janitor.stop()
+    assert not janitor._thread.is_alive()
+    assert calls == []
@@ -0,0 +1,78 @@
+import time
+
+from anilist_cli.libs.cache.memory_cache import MemoryCache
+
+FUTURE = round(time.time() * 1000) + 60000
+
+
+def test_get_returns_stored_data():
+    cache = MemoryCache()
+    cache.set("a", {"data": 1}, 10, FUTURE)
+    assert cache.get("a") == {"data": 1}
+    assert cache.stats.hits == 1
+
+
+def test_miss_is_counted():
+    cache = MemoryCache()
+    assert cache.get("a") is None
+    assert cache.stats.misses == 1
+
+
+def test_expired_entry_is_dropped():
+    cache = MemoryCache()
+    cache.set("a", {"data": 1}, 10, 0)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_entry_count_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1, 1, FUTURE)
+    cache.set("b", 2, 1, FUTURE)
+    cache.get("a")
+    cache.set("c", 3, 1, FUTURE)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = MemoryCache(max_bytes=100)
+    cache.set("a", 1, 60, FUTURE)
+    cache.set("b", 2, 60, FUTURE)
+    assert cache.get("a") is None
+    assert cache.size == 60
+
+
+def test_entry_larger_than_budget_is_not_stored():
+    cache = MemoryCache(max_bytes=100)
+    cache.set("a", 1, 101, FUTURE)
+    assert len(cache) == 0
+
+
+def test_replacing_an_entry_updates_size():
+    cache = MemoryCache()
+    cache.set("a", 1, 60, FUTURE)
+    cache.set("a", 2, 40, FUTURE)
+    assert cache.size == 40
+    assert cache.get("a") == 2
+
+
+def test_invalidate_removes_tagged_entries():
+    cache = MemoryCache()
+    cache.set("a", 1, 1, FUTURE, {"media:1"})
+    cache.set("b", 2, 1, FUTURE, {"media:1", "media:2"})
+    cache.set("c", 3, 1, FUTURE, {"media:3"})
+    assert cache.invalidate({"media:1"}) == 2
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lookup_returns_expired_entries_within_grace():
+    cache = MemoryCache()
+    cache.set("key", {"data": 1}, 10, round(time.time() * 1000) - 1000)
+    assert cache.lookup("key", grace=60000) == ({"data": 1}, True)
+    assert cache.lookup("key") is None
+    assert len(cache) == 0
@@ -0,0 +1,303 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from anilist_cli.libs.cache.codec import Compression
+from anilist_cli.libs.cache.session_cache import SessionCache, cache_key
+
+QUERY = "query { Page { media { id } } }"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_get_returns_none_on_miss(cache):
+    assert cache.get(QUERY, {"page": 1}, None) is None
+
+
+def test_set_then_get_round_trips(cache):
+    assert cache.set(QUERY, {"page": 1}, "user", {"data": 1}) is True
+    assert cache.get(QUERY, {"page": 1}, "user") == {"data": 1}
+
+
+def test_set_returns_false_when_fresh_entry_exists(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+    assert cache.set(QUERY, {"page": 1}, None, {"data": 2}) is False
+
+
+def test_set_replaces_expired_entry(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), ttl=-1)
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+    cache.time_to_live = 60000
+    assert cache.set(QUERY, {"page": 1}, None, {"data": 2}) is True
+    assert cache.get(QUERY, {"page": 1}, None) == {"data": 2}
+    cache.close()
+
+
+def test_invalidate_evicts_only_tagged_entries(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+    cache.set(QUERY, {"page": 2}, None, {"data": 2}, {"media:2"})
+    cache.invalidate({"media:1", "list:user"})
+    assert cache.get(QUERY, {"page": 1}, None) is None
+    assert cache.get(QUERY, {"page": 2}, None) == {"data": 2}
+
+
+def test_invalidate_reaches_disk_tier(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+    cache.memory.clear()
+    cache.invalidate({"media:1"})
+    assert cache.get(QUERY, {"page": 1}, None) is None
+
+
+def test_replacing_an_entry_replaces_its_tags(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), ttl=-1)
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+    cache.time_to_live = 60000
+    cache.set(QUERY, {"page": 1}, None, {"data": 2}, {"media:2"})
+    cache.invalidate({"media:1"})
+    assert cache.get(QUERY, {"page": 1}, None) == {"data": 2}
+    cache.close()
+
+
+def test_invalidated_entry_refilled_from_disk_keeps_its_tags(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+    cache.memory.clear()
+    cache.get(QUERY, {"page": 1}, None)
+    cache.invalidate({"media:1"})
+    assert cache.get(QUERY, {"page": 1}, None) is None
+
+
+def test_patch_rewrites_tagged_entries(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+    cache.set(QUERY, {"page": 2}, None, {"data": 2}, {"media:2"})
+    cache.patch({"media:1"}, lambda variables, data: {"data": data["data"] + 10})
+    assert cache.get(QUERY, {"page": 1}, None) == {"data": 11}
+    assert cache.get(QUERY, {"page": 2}, None) == {"data": 2}
+    cache.memory.clear()
+    assert cache.get(QUERY, {"page": 1}, None) == {"data": 11}
+
+
+def test_patch_evicts_entries_the_patcher_rejects(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+    cache.patch({"media:1"}, lambda variables, data: None)
+    assert cache.get(QUERY, {"page": 1}, None) is None
+
+
+def test_patched_entry_keeps_its_tags(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+    cache.patch({"media:1"}, lambda variables, data: data)
+    cache.invalidate({"media:1"})
+    assert cache.get(QUERY, {"page": 1}, None) is None
+
+
+def test_patch_rewrites_stale_entries_within_the_grace(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), grace=60000)
+    key = cache_key(QUERY, {"page": 1}, None)
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"}, ttl=-1000)
+    cache.patch({"media:1"}, lambda variables, data: {"data": 11})
+    entry = cache.disk_get(key, grace=60000)
+    cache.close()
+    assert entry is not None
+    assert entry.data == {"data": 11}
+
+
+def test_clear_evicts_everything(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+    cache.clear()
+    assert cache.get(QUERY, {"page": 1}, None) is None
+
+
+def test_outdated_schema_is_dropped(tmp_path):
+    path = tmp_path / "cache.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cache (query TEXT, variables TEXT, version INTEGER)")
+    conn.commit()
+    conn.close()
+
+    cache = SessionCache(str(path))
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+    assert cache.get(QUERY, {"page": 1}, None) == {"data": 1}
+    cache.close()
+
+
+def test_expired_entry_misses(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), ttl=-1)
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+    assert cache.get(QUERY, {"page": 1}, None) is None
+    cache.close()
+
+
+def test_variable_order_does_not_change_the_key(cache):
+    cache.set(QUERY, {"page": 1, "perPage": 20}, None, {"data": 1})
+    assert cache.get(QUERY, {"perPage": 20, "page": 1}, None) == {"data": 1}
+
+
+def test_cache_key_is_a_64_bit_integer():
+    key = cache_key(QUERY, {"page": 1, "perPage": 20}, "user")
+    assert isinstance(key, int)
+    assert -(2**63) <= key < 2**63
+    assert key == cache_key(QUERY, {"perPage": 20, "page": 1}, "user")
+
+
+def test_cache_key_separates_users_and_queries():
+    keys = {
+        cache_key(QUERY, {"page": 1}, None),
+        cache_key(QUERY, {"page": 1}, "user"),
+        cache_key(QUERY + " ", {"page": 1}, None),
+        cache_key(QUERY, {"page": 2}, None),
+    }
+    assert len(keys) == 4
+
+
+def test_users_do_not_share_entries(cache):
+    cache.set(QUERY, {"page": 1}, "user", {"data": 1})
+    assert cache.get(QUERY, {"page": 1}, None) is None
+
+
+def test_query_documents_are_stored_once(cache):
+    for page in range(5):
+        cache.set(QUERY, {"page": page}, None, {"data": page})
+
+    with cache.db as conn:
+        documents = conn.execute("SELECT document FROM queries").fetchall()
+
+    assert [row["document"] for row in documents] == [QUERY]
+
+
+@pytest.mark.parametrize("compression", [Compression.ZLIB, Compression.LZMA])
+def test_large_responses_are_stored_compressed(tmp_path, compression):
+    cache = SessionCache(str(tmp_path / "cache.db"), compression=compression)
+    data = {"data": {"description": "Lorem ipsum dolor sit amet. " * 500}}
+    cache.set(QUERY, {"page": 1}, None, data)
+    cache.memory.clear()
+
+    with cache.db as conn:
+        row = conn.execute("SELECT data, compression, size FROM cache").fetchone()
+
+    assert row["compression"] == compression.value
+    assert len(row["data"]) < row["size"]
+    assert cache.get(QUERY, {"page": 1}, None) == data
+    cache.close()
+
+
+def test_patch_keeps_compressed_entries_readable(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), compress_threshold=0)
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, {"media:1"})
+    cache.patch({"media:1"}, lambda variables, data: {"data": data["data"] + 1})
+    cache.memory.clear()
+    assert cache.get(QUERY, {"page": 1}, None) == {"data": 2}
+    cache.close()
+
+
+def test_memory_tier_answers_repeated_lookups(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+    first = cache.get(QUERY, {"page": 1}, None)
+    assert cache.get(QUERY, {"page": 1}, None) is first
+    assert cache.stats["memory"].hits == 2
+    assert cache.stats["disk"].hits == 0
+
+
+def test_disk_tier_refills_memory_tier(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+    cache.memory.clear()
+    assert cache.get(QUERY, {"page": 1}, None) == {"data": 1}
+    assert cache.get(QUERY, {"page": 1}, None) == {"data": 1}
+    assert cache.stats["disk"].hits == 1
+    assert cache.stats["memory"].hits == 1
+    assert cache.stats["memory"].misses == 1
+
+
+def test_connection_is_reused_within_a_thread(cache):
+    with cache.db as first:
+        pass
+    with cache.db as second:
+        pass
+    assert first is second
+
+
+def test_each_thread_gets_its_own_connection(cache):
+    connections = []
+
+    def worker():
+        with cache.db as conn:
+            connections.append(conn)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    with cache.db as conn:
+        assert conn is not connections[0]
+
+
+def _rows(cache):
+    with cache.db as conn:
+        return conn.execute("SELECT count(*) FROM cache").fetchone()[0]
+
+
+def test_get_does_not_delete_expired_entries(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), ttl=-1, sweep_interval=None)
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+    assert cache.get(QUERY, {"page": 1}, None) is None
+    assert _rows(cache) == 1
+    cache.sweep()
+    assert _rows(cache) == 0
+    cache.close()
+
+
+def test_sweep_evicts_least_recently_accessed_over_max_rows(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), max_rows=2, sweep_interval=None)
+    for page in range(3):
+        cache.set(QUERY, {"page": page}, None, {"data": page})
+        time.sleep(0.002)
+    cache.get(QUERY, {"page": 0}, None)
+    cache.sweep()
+    cache.memory.clear()
+
+    assert _rows(cache) == 2
+    assert cache.get(QUERY, {"page": 0}, None) == {"data": 0}
+    assert cache.get(QUERY, {"page": 1}, None) is None
+    assert cache.get(QUERY, {"page": 2}, None) == {"data": 2}
+    cache.close()
+
+
+def test_sweep_evicts_least_recently_accessed_over_max_bytes(tmp_path):
+    cache = SessionCache(
+        str(tmp_path / "cache.db"), max_bytes=2500, sweep_interval=None
+    )
+    for page in range(3):
+        cache.set(QUERY, {"page": page}, None, {"data": "x" * 1000})
+        time.sleep(0.002)
+    cache.sweep()
+
+    assert _rows(cache) == 2
+    cache.memory.clear()
+    assert cache.get(QUERY, {"page": 0}, None) is None
+    cache.close()
+
+
+def test_janitor_sweeps_in_the_background(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.db"), ttl=-1, sweep_interval=0.01)
+    cache.set(QUERY, {"page": 1}, None, {"data": 1})
+
+    deadline = time.monotonic() + 2
+    while _rows(cache) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert _rows(cache) == 0
+    cache.close()
+    assert not cache.janitor._thread.is_alive()
+
+
+def test_set_honours_the_time_to_live_of_the_entry(cache):
+    cache.set(QUERY, {"page": 1}, None, {"data": 1}, ttl=-1)
+    cache.set(QUERY, {"page": 2}, None, {"data": 2}, ttl=60000)
+    cache.memory.clear()
+    assert cache.get(QUERY, {"page": 1}, None) is None
+    assert cache.get(QUERY, {"page": 2}, None) == {"data": 2}
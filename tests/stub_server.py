@@ -0,0 +1,43 @@
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+class StubServer:
+    """
+    Local stand-in for the AniList graphQL endpoint that replays a queued
+    sequence of responses, then keeps answering with the default response
+
+    Attributes:
+    responses: list of (status, body, headers) tuples still to be replayed
+    default: (status, body, headers) tuple answered once the queue is empty
+    requests: list of JSON payloads received
+    url: str url of the endpoint once started
+    """
+
+    def __init__(
+        self,
+        responses: list[tuple[int, dict, dict]] | None = None,
+        default: tuple[int, dict, dict] = (200, {"data": {}}, {}),
+    ) -> None:
+        self.responses = list(responses or [])
+        self.default = default
+        self.requests: list[dict] = []
+        self.url = ""
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        self._server = TestServer(app)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests.append(await request.json())
+        status, body, headers = (
+            self.responses.pop(0) if self.responses else self.default
+        )
+        return web.json_response(body, status=status, headers=headers)
+
+    async def __aenter__(self) -> "StubServer":
+        await self._server.start_server()
+        self.url = str(self._server.make_url("/"))
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._server.close()